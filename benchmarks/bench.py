@@ -0,0 +1,834 @@
+"""
+Benchmarks for the public functions of landsurvey.
+
+Every function exported from landsurvey/__init__.py is run on seeded synthetic
+datasets of 1e3, 1e5 and 1e7 points, and its throughput (points per second) and
+peak memory are compared with the baseline stored in benchmarks/baseline.json.
+Functions which also accept PointArrays are benchmarked in both forms, the array
+form named with an [array] suffix.
+
+Scalar forms run in a python loop, so they are timed on the first --scalar-limit
+points of each dataset. Some cases have a largest size they are run at, to keep the
+memory of the 1e7 datasets in check.
+
+Usage:
+
+    python benchmarks/bench.py                      # compare with the baseline
+    python benchmarks/bench.py --sizes 1000 100000  # only the smaller datasets
+    python benchmarks/bench.py --only gauss_kruger  # cases starting with a name
+    python benchmarks/bench.py --threshold 0.25     # allow a 25% regression
+    python benchmarks/bench.py --update             # write a new baseline
+
+The import time of the package is measured in fresh interpreters, for a script which
+only uses dms2dec, one which projects arrays with numpy, and one which uses every
+public name (the cost of importing every submodule). These are recorded as import[...]
+results, in imports per second.
+
+The exit status is 1 if any function is slower or uses more memory than the baseline
+by more than the threshold, or if a public function has no benchmark. Peak memory is
+measured with tracemalloc, so is not measured on python 2.
+
+Throughput depends on the machine, so the baseline should be rewritten with --update
+on the machine the benchmarks are compared on. The default threshold of 50% allows
+for the run to run variation of shared and virtual machines.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import subprocess
+import timeit
+import types
+import zlib
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import landsurvey as ls
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+SIZES = [1000, 100000, 10000000]
+
+# Public names which are not functions to benchmark
+EXEMPT = ['Settings', 'DMS', 'QUADRANT', 'GRADIAN', 'RADIAN', 'CompiledProjection', 'disable_profiling',
+          'profiling_enabled', 'profiled', 'reset_profile', 'profile_stats', 'profile_report']
+
+# Peak memory increases smaller than this are noise
+MEMORY_SLACK = 64 * 1024
+
+GDA94 = ls.Projection(6378137.0, 298.257222101, 0.9996, 500000.0, 10000000.0)
+
+
+class Dataset:
+    """ Seeded synthetic survey data of n points, generated one column at a time
+    """
+    def __init__(self, n):
+        self.n = n
+        self._columns = {}
+
+    def column(self, name, low, high):
+        if name not in self._columns:
+            rng = np.random.RandomState((zlib.crc32(name.encode('ascii')) + self.n) % (2 ** 32))
+            self._columns[name] = rng.uniform(low, high, self.n)
+        return self._columns[name]
+
+    def dms(self, name, low=0.0, high=360.0):
+        return ls.dec2dms_array(self.column(name, low, high))
+
+    @property
+    def x(self):
+        return self.column('x', 500000.0, 510000.0)
+
+    @property
+    def y(self):
+        return self.column('y', 7000000.0, 7010000.0)
+
+    @property
+    def z(self):
+        return self.column('z', 10.0, 200.0)
+
+    @property
+    def points(self):
+        return ls.PointArray(self.x, self.y, self.z)
+
+    @property
+    def bearings(self):
+        return self.dms('bearings')
+
+    @property
+    def distances(self):
+        return self.column('distances', 1.0, 500.0)
+
+    @property
+    def zenith_angles(self):
+        return self.dms('zenith_angles', 80.0, 100.0)
+
+    @property
+    def latitudes(self):
+        return self.dms('latitudes', -38.0, -30.0)
+
+    @property
+    def longitudes(self):
+        return self.dms('longitudes', 144.0, 150.0)
+
+
+CASES = {}
+
+
+def case(name, scalar=False, max_size=None):
+    """ Register a benchmark case
+
+        The decorated function builds its input from a Dataset and the number of points
+        to use, and returns a callable which runs the benchmarked function on them, or a
+        (callable, cleanup) tuple if files must be removed afterwards.
+
+        Args:
+            name (str): public function name, with [array] for the PointArray form
+            scalar (bool): the case loops in python so only runs on --scalar-limit points
+            max_size (int): largest dataset the case is run on, None for all
+    """
+    def register(build):
+        build.scalar = scalar
+        build.max_size = max_size
+        CASES[name] = build
+        return build
+    return register
+
+
+def _point(data, i):
+    return ls.Point3d(data.x[i], data.y[i], data.z[i])
+
+
+@case('dms2dec', scalar=True)
+def _dms2dec(data, n):
+    values = data.bearings[:n].tolist()
+    return lambda: [ls.dms2dec(value) for value in values]
+
+
+@case('dec2dms', scalar=True)
+def _dec2dms(data, n):
+    values = data.column('decimal', 0.0, 360.0)[:n].tolist()
+    return lambda: [ls.dec2dms(value) for value in values]
+
+
+@case('bearing_to_radians', scalar=True)
+def _bearing_to_radians(data, n):
+    values = data.bearings[:n].tolist()
+    return lambda: [ls.bearing_to_radians(value) for value in values]
+
+
+@case('radians_to_bearing', scalar=True)
+def _radians_to_bearing(data, n):
+    values = data.column('radians', 0.0, 2 * math.pi)[:n].tolist()
+    return lambda: [ls.radians_to_bearing(value) for value in values]
+
+
+@case('enable_profiling', scalar=True)
+def _enable_profiling(data, n):
+    # dms2dec with every call recorded, the overhead of profiling a scalar function
+    values = data.bearings[:n].tolist()
+    ls.enable_profiling()
+
+    def cleanup():
+        ls.disable_profiling()
+        ls.reset_profile()
+    return (lambda: [ls.dms2dec(value) for value in values]), cleanup
+
+
+@case('dms2dec_array')
+def _dms2dec_array(data, n):
+    values = data.bearings
+    return lambda: ls.dms2dec_array(values)
+
+
+@case('dec2dms_array')
+def _dec2dms_array(data, n):
+    values = data.column('decimal', 0.0, 360.0)
+    return lambda: ls.dec2dms_array(values)
+
+
+@case('bearing_to_radians_array')
+def _bearing_to_radians_array(data, n):
+    values = data.bearings
+    return lambda: ls.bearing_to_radians_array(values)
+
+
+@case('radians_to_bearing_array')
+def _radians_to_bearing_array(data, n):
+    values = data.column('radians', 0.0, 2 * math.pi)
+    return lambda: ls.radians_to_bearing_array(values)
+
+
+@case('bearing_codec', scalar=True)
+def _bearing_codec(data, n):
+    return lambda: [ls.bearing_codec() for i in range(n)]
+
+
+@case('use_bearing_codec', scalar=True)
+def _use_bearing_codec(data, n):
+    def run():
+        for i in range(n):
+            ls.use_bearing_codec(ls.DMS)
+        ls.use_bearing_codec(None)
+    return run
+
+
+@case('join2d', scalar=True)
+def _join2d(data, n):
+    pnts = [_point(data, i) for i in range(n)]
+    return lambda: [ls.join2d(pnts[i - 1], pnts[i]) for i in range(n)]
+
+
+@case('join2d[array]')
+def _join2d_array(data, n):
+    pnts = data.points
+    others = ls.PointArray(data.x[::-1], data.y[::-1])
+    return lambda: ls.join2d(pnts, others)
+
+
+@case('rad2d', scalar=True)
+def _rad2d(data, n):
+    pnt = ls.Point2d(500000.0, 7000000.0)
+    shots = list(zip(data.bearings[:n].tolist(), data.distances[:n].tolist()))
+    return lambda: [ls.rad2d(pnt, b, d) for b, d in shots]
+
+
+@case('rad2d[array]')
+def _rad2d_array(data, n):
+    pnts = data.points
+    bearings = data.bearings
+    return lambda: ls.rad2d(pnts, bearings, data.distances)
+
+
+@case('rad2d_batch')
+def _rad2d_batch(data, n):
+    pnt = ls.Point2d(500000.0, 7000000.0)
+    bearings = data.bearings
+    return lambda: ls.rad2d_batch(pnt, bearings, data.distances)
+
+
+@case('rad3d', scalar=True)
+def _rad3d(data, n):
+    pnt = ls.Point3d(500000.0, 7000000.0, 50.0)
+    shots = list(zip(data.bearings[:n].tolist(), data.distances[:n].tolist(), data.zenith_angles[:n].tolist()))
+    return lambda: [ls.rad3d(pnt, b, d, za, 1.5, 1.7) for b, d, za in shots]
+
+
+@case('rad3d[array]')
+def _rad3d_array(data, n):
+    pnts = data.points
+    bearings = data.bearings
+    zenith_angles = data.zenith_angles
+    return lambda: ls.rad3d(pnts, bearings, data.distances, zenith_angles, 1.5, 1.7)
+
+
+@case('rad3d_batch')
+def _rad3d_batch(data, n):
+    pnt = ls.Point3d(500000.0, 7000000.0, 50.0)
+    bearings = data.bearings
+    zenith_angles = data.zenith_angles
+    return lambda: ls.rad3d_batch(pnt, bearings, data.distances, zenith_angles, 1.5, 1.7)
+
+
+@case('reduced_level', scalar=True)
+def _reduced_level(data, n):
+    shots = list(zip(data.distances[:n].tolist(), data.zenith_angles[:n].tolist()))
+    return lambda: [ls.reduced_level(50.0, 1.5, d, za, 1.7) for d, za in shots]
+
+
+def _intersection_points(data):
+    pnt_a = ls.PointArray(data.x, data.y)
+    pnt_b = ls.PointArray(data.x + data.column('dx', 50.0, 150.0), data.y + data.column('dy', -50.0, 50.0))
+    return pnt_a, pnt_b
+
+
+def _intersection_bearings(data):
+    return (ls.dec2dms_array(data.column('bearing_a', 10.0, 80.0)),
+            ls.dec2dms_array(data.column('bearing_b', 280.0, 350.0)))
+
+
+@case('bearing_bearing_intersection', scalar=True)
+def _bearing_bearing_intersection(data, n):
+    pnt_a, pnt_b = _intersection_points(data)
+    bearing_a, bearing_b = _intersection_bearings(data)
+    shots = list(zip(pnt_a[:n].to_points(), pnt_b[:n].to_points(), bearing_a[:n].tolist(), bearing_b[:n].tolist()))
+    return lambda: [ls.bearing_bearing_intersection(a, b, ba, bb) for a, b, ba, bb in shots]
+
+
+@case('bearing_bearing_intersection[array]')
+def _bearing_bearing_intersection_array_form(data, n):
+    pnt_a, pnt_b = _intersection_points(data)
+    bearing_a, bearing_b = _intersection_bearings(data)
+    return lambda: ls.bearing_bearing_intersection(pnt_a, pnt_b, bearing_a, bearing_b)
+
+
+@case('bearing_bearing_intersection_array')
+def _bearing_bearing_intersection_array(data, n):
+    pnt_a, pnt_b = _intersection_points(data)
+    bearing_a, bearing_b = _intersection_bearings(data)
+    return lambda: ls.bearing_bearing_intersection_array(pnt_a, pnt_b, bearing_a, bearing_b)
+
+
+@case('distance_distance_intersection', scalar=True)
+def _distance_distance_intersection(data, n):
+    pnt_a, pnt_b = _intersection_points(data)
+    dist = data.column('dist', 120.0, 200.0)
+    shots = list(zip(pnt_a[:n].to_points(), pnt_b[:n].to_points(), dist[:n].tolist()))
+    return lambda: [ls.distance_distance_intersection(a, b, d, d) for a, b, d in shots]
+
+
+@case('distance_distance_intersection[array]')
+def _distance_distance_intersection_array_form(data, n):
+    pnt_a, pnt_b = _intersection_points(data)
+    dist = data.column('dist', 120.0, 200.0)
+    return lambda: ls.distance_distance_intersection(pnt_a, pnt_b, dist, dist)
+
+
+@case('distance_distance_intersection_array')
+def _distance_distance_intersection_array(data, n):
+    pnt_a, pnt_b = _intersection_points(data)
+    dist = data.column('dist', 120.0, 200.0)
+    return lambda: ls.distance_distance_intersection_array(pnt_a, pnt_b, dist, dist)
+
+
+def _line_points(data):
+    pnt_a, pnt_b = _intersection_points(data)
+    pnt_c = ls.PointArray(data.x + data.column('cx', 0.0, 100.0), data.y - 60.0)
+    pnt_d = ls.PointArray(data.x + data.column('dx', 0.0, 100.0), data.y + 60.0)
+    # lines a-b and c-d, in the a, c, b, d order of two_line_intersection
+    return pnt_a, pnt_c, pnt_b, pnt_d
+
+
+@case('two_line_intersection', scalar=True)
+def _two_line_intersection(data, n):
+    lines = list(zip(*[pnts[:n].to_points() for pnts in _line_points(data)]))
+    return lambda: [ls.two_line_intersection(a, b, c, d) for a, b, c, d in lines]
+
+
+@case('two_line_intersection[array]')
+def _two_line_intersection_array_form(data, n):
+    pnts = _line_points(data)
+    return lambda: ls.two_line_intersection(*pnts)
+
+
+@case('two_line_intersection_array')
+def _two_line_intersection_array(data, n):
+    pnts = _line_points(data)
+    return lambda: ls.two_line_intersection_array(*pnts)
+
+
+@case('segment_intersections', max_size=1000000)
+def _segment_intersections(data, n):
+    # 20m segments at the same density whatever the number of segments
+    extent = math.sqrt(n) * 10.0
+    starts = ls.PointArray(data.column('sx', 0.0, extent), data.column('sy', 0.0, extent))
+    angle = data.column('angle', 0.0, 2 * math.pi)
+    ends = ls.PointArray(starts.x + 20.0 * np.sin(angle), starts.y + 20.0 * np.cos(angle))
+    return lambda: ls.segment_intersections(starts, ends)
+
+
+@case('gauss_kruger', scalar=True)
+def _gauss_kruger(data, n):
+    coordinates = list(zip(data.latitudes[:n].tolist(), data.longitudes[:n].tolist()))
+    return lambda: [ls.gauss_kruger(lat, lon, 147.0, GDA94) for lat, lon in coordinates]
+
+
+@case('gauss_kruger_array')
+def _gauss_kruger_array(data, n):
+    latitudes = data.latitudes
+    longitudes = data.longitudes
+    return lambda: ls.gauss_kruger_array(latitudes, longitudes, 147.0, GDA94)
+
+
+@case('gauss_kruger_parallel')
+def _gauss_kruger_parallel(data, n):
+    latitudes = data.latitudes
+    longitudes = data.longitudes
+    return lambda: ls.gauss_kruger_parallel(latitudes, longitudes, 147.0, GDA94, chunk_size=100000)
+
+
+@case('gauss_kruger_inverse_array')
+def _gauss_kruger_inverse_array(data, n):
+    easting = data.column('easting', 300000.0, 700000.0)
+    northing = data.column('northing', 5800000.0, 6700000.0)
+    return lambda: ls.gauss_kruger_inverse_array(easting, northing, 147.0, GDA94)
+
+
+@case('compile_projection', scalar=True)
+def _compile_projection(data, n):
+    return lambda: [ls.compile_projection(GDA94) for i in range(n)]
+
+
+@case('Projection', scalar=True)
+def _projection(data, n):
+    return lambda: [ls.Projection(6378137.0, 298.257222101, 0.9996, 500000.0, 10000000.0) for i in range(n)]
+
+
+@case('Point2d', scalar=True)
+def _point2d(data, n):
+    coordinates = list(zip(data.x[:n].tolist(), data.y[:n].tolist()))
+    return lambda: [ls.Point2d(x, y) for x, y in coordinates]
+
+
+@case('Point3d', scalar=True)
+def _point3d(data, n):
+    coordinates = list(zip(data.x[:n].tolist(), data.y[:n].tolist(), data.z[:n].tolist()))
+    return lambda: [ls.Point3d(x, y, z) for x, y, z in coordinates]
+
+
+@case('PointArray')
+def _point_array(data, n):
+    # the columns of an n x 3 array are strided, so they are copied, then half the points are masked out
+    xyz = np.column_stack([data.x, data.y, data.z])
+    keep = data.column('keep', 0.0, 1.0) < 0.5
+    return lambda: ls.PointArray(xyz[:, 0], xyz[:, 1], xyz[:, 2])[keep]
+
+
+@case('PointArray.from_points', scalar=True)
+def _point_array_from_points(data, n):
+    pnts = data.points[:n].to_points()
+    return lambda: ls.PointArray.from_points(pnts)
+
+
+def _resection_data(data, n):
+    """ Four targets observed from each of n stations, with unoriented directions
+    """
+    station = np.column_stack([data.x[:n], data.y[:n]])
+    rng = np.random.RandomState(n % 100000)
+    targets = station[:, None, :] + rng.uniform(-150.0, 150.0, (n, 4, 2))
+    dx = targets[:, :, 0] - station[:, None, 0]
+    dy = targets[:, :, 1] - station[:, None, 1]
+    directions = ls.radians_to_bearing_array((np.arctan2(dx, dy) - 1.0) % (2 * math.pi))
+    return np.concatenate([targets, np.hypot(dx, dy)[:, :, None], directions[:, :, None]], axis=2)
+
+
+@case('freestation_2point', scalar=True)
+def _freestation_2point(data, n):
+    # the two point setup from the tests, moved onto each station
+    setup = np.array([[11813.150, 54078.732, 18.147, 188.2100], [11834.832, 54079.154, 4.334, 329.1659]])
+    setups = [setup + [x, y, 0.0, 0.0] for x, y in zip(data.x[:n] - 11831.105, data.y[:n] - 54081.366)]
+    return lambda: [ls.freestation_2point(setup) for setup in setups]
+
+
+@case('freestation', scalar=True)
+def _freestation(data, n):
+    setups = _resection_data(data, n)
+    return lambda: [ls.freestation(setup) for setup in setups]
+
+
+@case('freestation_batch', max_size=1000000)
+def _freestation_batch(data, n):
+    setups = _resection_data(data, n)
+    return lambda: ls.freestation_batch(setups)
+
+
+def _field_file(data):
+    lines = ['STN,STN1,500000.000,7000000.000,50.000,1.565', 'BS,BM1,500100.000,7000100.000,0.0000']
+    shots = zip(data.bearings.tolist(), data.distances.tolist(), data.zenith_angles.tolist())
+    lines.extend('OBS,P%d,%.4f,%.3f,%.4f,1.700' % (i, b, d, za) for i, (b, d, za) in enumerate(shots))
+    return lines
+
+
+@case('read_field_file', max_size=1000000)
+def _read_field_file(data, n):
+    lines = _field_file(data)
+    return lambda: [chunk for chunk in ls.read_field_file(lines)]
+
+
+@case('reduce_field_file', max_size=1000000)
+def _reduce_field_file(data, n):
+    lines = _field_file(data)
+    return lambda: [points for points in ls.reduce_field_file(lines)]
+
+
+@case('adjust_traverse')
+def _adjust_traverse(data, n):
+    pnt = ls.Point2d(500000.0, 7000000.0)
+    bearings = data.bearings
+    return lambda: ls.adjust_traverse(pnt, bearings, data.distances, pnt)
+
+
+@case('adjust_traverses')
+def _adjust_traverses(data, n):
+    # traverses of 10 legs
+    offsets = np.arange(0, n, 10)
+    starts = ls.PointArray(data.x[:len(offsets)], data.y[:len(offsets)])
+    bearings = data.bearings
+    return lambda: ls.adjust_traverses(starts, bearings, data.distances, offsets)
+
+
+@case('reduce_level_run')
+def _reduce_level_run(data, n):
+    return lambda: ls.reduce_level_run(100.0, 1.5, data.distances, data.zenith_angles, 1.6)
+
+
+@case('reduce_level_runs')
+def _reduce_level_runs(data, n):
+    # runs of 10 legs
+    offsets = np.arange(0, n, 10)
+    return lambda: ls.reduce_level_runs(data.z[:len(offsets)], 1.5, data.distances, data.zenith_angles, 1.6,
+                                        offsets)
+
+
+def _lines(data):
+    pnt1 = ls.PointArray(data.column('easting', 300000.0, 700000.0), data.column('northing', 5800000.0, 6700000.0),
+                         data.z)
+    pnt2 = ls.PointArray(pnt1.x + data.column('dx', -500.0, 500.0), pnt1.y + data.column('dy', -500.0, 500.0), data.z)
+    return pnt1, pnt2
+
+
+@case('point_scale_factor')
+def _point_scale_factor(data, n):
+    pnts = _lines(data)[0]
+    return lambda: ls.point_scale_factor(pnts, 147.0, GDA94)
+
+
+@case('line_scale_factor', max_size=1000000)
+def _line_scale_factor(data, n):
+    pnt1, pnt2 = _lines(data)
+    return lambda: ls.line_scale_factor(pnt1, pnt2, 147.0, GDA94)
+
+
+@case('combined_scale_factor', max_size=1000000)
+def _combined_scale_factor(data, n):
+    pnt1, pnt2 = _lines(data)
+    return lambda: ls.combined_scale_factor(pnt1, pnt2, 147.0, GDA94, 20.0)
+
+
+@case('setup_scale_factor', scalar=True)
+def _setup_scale_factor(data, n):
+    # shots from 100 setups, so most calls are cache hits
+    stations = _lines(data)[0][:100].to_points()
+    return lambda: [ls.setup_scale_factor(stations[i % 100], 147.0, GDA94) for i in range(n)]
+
+
+@case('ground_to_grid')
+def _ground_to_grid(data, n):
+    distances = data.distances
+    return lambda: ls.ground_to_grid(distances, 0.99975)
+
+
+@case('grid_to_ground')
+def _grid_to_ground(data, n):
+    distances = data.distances
+    return lambda: ls.grid_to_ground(distances, 0.99975)
+
+
+def _point_file(data, build):
+    """ Run a case on a point file of the dataset written to a temporary directory
+    """
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'points.lspt')
+    points = ls.PointArray(data.x, data.y, data.z, np.array(['P%d' % i for i in range(data.n)], dtype=object))
+    run = build(path, points)
+
+    def cleanup():
+        shutil.rmtree(directory, ignore_errors=True)
+    return run, cleanup
+
+
+@case('write_point_file')
+def _write_point_file(data, n):
+    return _point_file(data, lambda path, points: lambda: ls.write_point_file(path, points, GDA94))
+
+
+@case('open_point_file')
+def _open_point_file(data, n):
+    def build(path, points):
+        ls.write_point_file(path, points, GDA94)
+        # open and project the points, reading the x and y columns from the file
+        return lambda: ls.join2d(ls.open_point_file(path), ls.Point2d(505000.0, 7005000.0))
+    return _point_file(data, build)
+
+
+@case('PointFile.to_point_array')
+def _point_file_to_point_array(data, n):
+    def build(path, points):
+        ls.write_point_file(path, points, GDA94)
+        return lambda: ls.open_point_file(path).to_point_array()
+    return _point_file(data, build)
+
+
+def _polygons(data):
+    # lots of 5 vertices
+    return ls.PolygonArray(data.x, data.y, np.arange(0, data.n, 5))
+
+
+@case('PolygonArray')
+def _polygon_array(data, n):
+    x, y, offsets = data.x, data.y, np.arange(0, n, 5)
+    return lambda: ls.PolygonArray(x, y, offsets)
+
+
+@case('PolygonArray.from_rings', scalar=True)
+def _polygon_array_from_rings(data, n):
+    rings = [data.points[i:i + 5] for i in range(0, n, 5)]
+    return lambda: ls.PolygonArray.from_rings(rings)
+
+
+@case('polygon_area')
+def _polygon_area(data, n):
+    polygons = _polygons(data)
+    return lambda: ls.polygon_area(polygons)
+
+
+@case('polygon_perimeter')
+def _polygon_perimeter(data, n):
+    polygons = _polygons(data)
+    return lambda: ls.polygon_perimeter(polygons)
+
+
+@case('polygon_centroid')
+def _polygon_centroid(data, n):
+    polygons = _polygons(data)
+    return lambda: ls.polygon_centroid(polygons)
+
+
+@case('polygon_closing')
+def _polygon_closing(data, n):
+    polygons = _polygons(data)
+    return lambda: ls.polygon_closing(polygons)
+
+
+@case('PointIndex', max_size=1000000)
+def _point_index(data, n):
+    pnts = data.points
+    return lambda: ls.PointIndex(pnts)
+
+
+@case('PointIndex.insert', scalar=True)
+def _point_index_insert(data, n):
+    pnts = data.points[:n].to_points()
+
+    def run():
+        index = ls.PointIndex(cell_size=50.0)
+        for pnt in pnts:
+            index.insert(pnt)
+    return run
+
+
+@case('PointIndex.nearest', scalar=True, max_size=1000000)
+def _point_index_nearest(data, n):
+    index = ls.PointIndex(data.points)
+    pnts = data.points[:n].to_points()
+    return lambda: [index.nearest(pnt, 5) for pnt in pnts]
+
+
+@case('PointIndex.within_radius', scalar=True, max_size=1000000)
+def _point_index_within_radius(data, n):
+    index = ls.PointIndex(data.points)
+    pnts = data.points[:n].to_points()
+    return lambda: [index.within_radius(pnt, 50.0) for pnt in pnts]
+
+
+# Scripts timed by measure_import
+IMPORTS = {
+    'import[dms2dec]': 'import landsurvey; landsurvey.dms2dec(10.3)',
+    'import[gauss_kruger_array]': 'import landsurvey; landsurvey.gauss_kruger_array',
+    'import[all]': 'import landsurvey; [getattr(landsurvey, name) for name in landsurvey.__all__]',
+}
+
+
+def measure_import(statement, repeat=10):
+    """ Time a script in a new python interpreter, including the interpreter start up
+
+        Returns:
+            throughput: runs per second from the fastest run
+    """
+    env = dict(os.environ)
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+    env['PYTHONPATH'] = os.pathsep.join([root] + [path for path in [env.get('PYTHONPATH')] if path])
+
+    best = float('inf')
+    for i in range(repeat):
+        start = timeit.default_timer()
+        subprocess.check_call([sys.executable, '-c', statement], env=env)
+        best = min(best, timeit.default_timer() - start)
+    return 1 / best
+
+
+def missing_cases():
+    """ Names exported by the landsurvey package which have no benchmark case
+    """
+    names = [name for name in dir(ls) if not name.startswith('_') and name not in EXEMPT and
+             not isinstance(getattr(ls, name), types.ModuleType)]
+    return sorted(name for name in names if not any(case == name or case.startswith(name + '[') or
+                                                    case.startswith(name + '.') for case in CASES))
+
+
+def measure(build, data, n, min_time=0.2, repeat=3):
+    """ Time the callable from build and record its peak memory
+
+        Returns:
+            throughput: points per second from the fastest run
+            peak_memory: largest number of bytes allocated during a run, or None
+    """
+    run = build(data, n)
+    cleanup = None
+    if isinstance(run, tuple):
+        run, cleanup = run
+
+    try:
+        best = float('inf')
+        elapsed = 0.0
+        runs = 0
+        while runs < repeat or elapsed < min_time:
+            start = timeit.default_timer()
+            run()
+            seconds = timeit.default_timer() - start
+            best = min(best, seconds)
+            elapsed += seconds
+            runs += 1
+
+        peak_memory = None
+        if tracemalloc is not None:
+            tracemalloc.start()
+            run()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    finally:
+        if cleanup is not None:
+            cleanup()
+
+    return n / max(best, 1e-9), peak_memory
+
+
+def compare(name, size, result, baseline, threshold):
+    """ Regression messages for a result against its baseline
+    """
+    failures = []
+    if result['throughput'] < baseline['throughput'] * (1 - threshold):
+        failures.append('%s at %d points: throughput %.4g/s is below the baseline %.4g/s' %
+                        (name, size, result['throughput'], baseline['throughput']))
+
+    memory = result.get('peak_memory')
+    baseline_memory = baseline.get('peak_memory')
+    if memory is not None and baseline_memory is not None:
+        if memory > baseline_memory * (1 + threshold) and memory - baseline_memory > MEMORY_SLACK:
+            failures.append('%s at %d points: peak memory %d bytes is above the baseline %d bytes' %
+                            (name, size, memory, baseline_memory))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the landsurvey public functions')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='dataset sizes in points')
+    parser.add_argument('--only', nargs='+', help='only run cases whose names start with these')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='allowed fractional regression in throughput or peak memory (default 0.5)')
+    parser.add_argument('--scalar-limit', type=int, default=10000,
+                        help='points run through the scalar (python loop) forms (default 10000)')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline json file')
+    parser.add_argument('--update', action='store_true', help='write the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    failures = ['%s has no benchmark' % name for name in missing_cases()]
+
+    baseline = {'results': {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    for size in args.sizes:
+        for name in sorted(CASES):
+            build = CASES[name]
+            if args.only and not any(name.startswith(only) for only in args.only):
+                continue
+            if build.max_size is not None and size > build.max_size:
+                continue
+
+            # a fresh dataset for each case so only the columns it uses are held in memory
+            n = min(size, args.scalar_limit) if build.scalar else size
+            throughput, peak_memory = measure(build, Dataset(size), n)
+            result = {'throughput': throughput, 'peak_memory': peak_memory}
+            results.setdefault(name, {})[str(size)] = result
+
+            print('%-45s %10d %14.4g/s %12s' % (name, size, throughput,
+                                                 '-' if peak_memory is None else '%.1fMB' % (peak_memory / 1e6)))
+            sys.stdout.flush()
+
+            previous = baseline['results'].get(name, {}).get(str(size))
+            if previous is not None and not args.update:
+                failures.extend(compare(name, size, result, previous, args.threshold))
+
+    for name in sorted(IMPORTS):
+        if args.only and not any(name.startswith(only) for only in args.only):
+            continue
+        result = {'throughput': measure_import(IMPORTS[name]), 'peak_memory': None}
+        results[name] = {'1': result}
+        print('%-45s %10d %14.4g/s %12s' % (name, 1, result['throughput'], '-'))
+        sys.stdout.flush()
+
+        previous = baseline['results'].get(name, {}).get('1')
+        if previous is not None and not args.update:
+            failures.extend(compare(name, 1, result, previous, args.threshold))
+
+    if args.update:
+        for name, sizes in results.items():
+            baseline['results'].setdefault(name, {}).update(sizes)
+        baseline['environment'] = {'python': platform.python_version(), 'numpy': np.__version__,
+                                   'machine': platform.machine(), 'processor': platform.processor()}
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print('baseline written to %s' % args.baseline)
+
+    for failure in failures:
+        print('FAIL: %s' % failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,72 @@
-from .conversion import dms2dec, dec2dms, bearing_to_radians, radians_to_bearing, Settings
-from .calc import join2d, rad2d, rad3d, bearing_bearing_intersection, distance_distance_intersection, \
-    two_line_intersection, reduced_level
-from .geo import gauss_kruger
-from .classes import Projection, Point2d, Point3d
-from .resection import freestation_2point
+"""
+Land surveying function library.
+
+Submodules are imported on first use of one of their names, so a script which only
+calls dms2dec does not pay for importing numpy and the projection, resection and file
+modules. The public names are the same as importing every submodule.
+"""
+import importlib
+import sys
+import types
+
+# Public names of each submodule
+_exports = {
+    'conversion': ['dms2dec', 'dec2dms', 'bearing_to_radians', 'radians_to_bearing', 'Settings', 'dms2dec_array',
+                   'dec2dms_array', 'bearing_to_radians_array', 'radians_to_bearing_array', 'bearing_codec',
+                   'use_bearing_codec', 'DMS', 'QUADRANT', 'GRADIAN', 'RADIAN'],
+    'calc': ['join2d', 'rad2d', 'rad3d', 'rad2d_batch', 'rad3d_batch', 'bearing_bearing_intersection',
+             'distance_distance_intersection', 'two_line_intersection', 'bearing_bearing_intersection_array',
+             'distance_distance_intersection_array', 'two_line_intersection_array', 'segment_intersections',
+             'reduced_level'],
+    'geo': ['gauss_kruger', 'gauss_kruger_array', 'gauss_kruger_inverse_array', 'compile_projection',
+            'CompiledProjection'],
+    'parallel': ['gauss_kruger_parallel'],
+    'classes': ['Projection', 'Point2d', 'Point3d', 'PointArray'],
+    'resection': ['freestation_2point', 'freestation', 'freestation_batch'],
+    'fieldfile': ['read_field_file', 'reduce_field_file'],
+    'traverse': ['adjust_traverse', 'adjust_traverses'],
+    'levelling': ['reduce_level_run', 'reduce_level_runs'],
+    'pointfile': ['write_point_file', 'open_point_file', 'PointFile'],
+    'scalefactor': ['point_scale_factor', 'line_scale_factor', 'combined_scale_factor', 'setup_scale_factor',
+                    'ground_to_grid', 'grid_to_ground'],
+    'spatial': ['PointIndex'],
+    'polygon': ['PolygonArray', 'polygon_area', 'polygon_perimeter', 'polygon_centroid', 'polygon_closing'],
+    'profiling': ['enable_profiling', 'disable_profiling', 'profiling_enabled', 'profiled', 'reset_profile',
+                  'profile_stats', 'profile_report'],
+}
+
+# Submodule of every public name
+_modules = dict((name, module) for module, names in _exports.items() for name in names)
+
+__all__ = sorted(_modules)
+
+
+class _LazyPackage(types.ModuleType):
+    """ The package module, which imports a submodule when one of its names is first used
+
+        The name is then stored on the package, so later lookups are ordinary attribute
+        lookups.
+    """
+    def __getattr__(self, name):
+        if name in _modules:
+            value = getattr(importlib.import_module('.' + _modules[name], __name__), name)
+        elif name in _exports:
+            value = importlib.import_module('.' + name, __name__)
+        else:
+            raise AttributeError("module %r has no attribute %r" % (__name__, name))
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(name for name in self.__dict__ if name.startswith('__')) | set(_modules) | set(_exports))
+
+
+try:
+    sys.modules[__name__].__class__ = _LazyPackage
+except TypeError:
+    # Modules of python 2 can not change class, so the package is replaced by a copy.
+    # The original is kept, as python 2 clears the globals of a module when it is freed.
+    _package = _LazyPackage(__name__, __doc__)
+    _package.__dict__.update(sys.modules[__name__].__dict__)
+    _package._original = sys.modules[__name__]
+    sys.modules[__name__] = _package
@@ -0,0 +1,4 @@
+import sys
+from .landsurvey import main
+
+sys.exit(main())
@@ -0,0 +1,32 @@
+"""
+Lazy import of numpy for the modules used by scalar code.
+
+conversion, calc and classes hold a stand in for numpy as np, which imports numpy the
+first time one of its attributes is used and then puts numpy itself in the module, so
+scalar functions such as dms2dec and join2d work without importing numpy at all.
+"""
+import sys
+
+
+class _LazyNumpy(object):
+    def __init__(self, module):
+        self._module = module
+
+    def __getattr__(self, name):
+        import numpy
+        sys.modules[self._module].np = numpy
+        return getattr(numpy, name)
+
+
+def lazy_numpy(module):
+    """ Stand in for numpy in the module of the given name
+    """
+    return _LazyNumpy(module)
+
+
+def is_ndarray(value):
+    """ isinstance(value, numpy.ndarray), without importing numpy, as nothing can be an
+        array before numpy has been imported
+    """
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and isinstance(value, numpy.ndarray)
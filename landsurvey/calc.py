@@ -1,21 +1,40 @@
 import math
-from conversion import dms2dec, dec2dms, radians_to_bearing, bearing_to_radians
+from ._lazy import lazy_numpy, is_ndarray
+from .conversion import dms2dec, dec2dms, dms2dec_array, bearing_codec
 
+np = lazy_numpy(__name__)
 
-def join2d(pnt1, pnt2):
+
+def _is_array(*pnts):
+    """ True if any of the points holds columns of values (e.g. a PointArray) and numpy must be used
+    """
+    for pnt in pnts:
+        if is_ndarray(pnt.x):
+            return True
+    return False
+
+
+def join2d(pnt1, pnt2, codec=None):
     """ Calculate bearing and distance from point 1 to point 2
 
         Args:
-            pnt1 (Point2d class): first point
-            pnt2 (Point2d class): second point
+            pnt1 (Point2d or PointArray class): first point
+            pnt2 (Point2d or PointArray class): second point
+            codec: bearing codec, defaults to Settings['bearing']
 
         Returns:
             distance: the distance between points
             bearing: the bearing in degrees, minutes, seconds (dd.mmss)
     """
+    codec = bearing_codec(codec)
     delta_n = pnt2.y - pnt1.y
     delta_e = pnt2.x - pnt1.x
 
+    if _is_array(pnt1, pnt2):
+        distance = np.hypot(delta_e, delta_n)
+        bearing = np.arctan2(delta_e, delta_n) % (2 * math.pi)
+        return distance, codec.from_radians_array(bearing)
+
     distance = math.sqrt(math.pow(delta_n, 2) + math.pow(delta_e, 2))
 
     bearing = math.degrees(math.atan2(delta_e, delta_n)) % 360
@@ -24,23 +43,50 @@ def join2d(pnt1, pnt2):
         bearing += 360
 
     bearing = math.radians(bearing)
-    return distance, radians_to_bearing(bearing)
+    return distance, codec.from_radians(bearing)
 
 
-def rad2d(pnt, bearing, distance):
+def rad2d(pnt, bearing, distance, codec=None):
     """ Calculate the new point x,y given initial starting point, bearing and distance
 
         Args:
-            pnt (Point2d class):  The starting point
+            pnt (Point2d or PointArray class):  The starting point
             bearing (floating point): The bearing in degrees, minutes, seconds (dd.mmss)
             distance (floating point): The distance
+            codec: bearing codec, defaults to Settings['bearing']
 
         Returns:
              x: x value of new point
              y: y value of new point
     """
-    x = pnt.x + distance * math.sin(bearing_to_radians(bearing))
-    y = pnt.y + distance * math.cos(bearing_to_radians(bearing))
+    if _is_array(pnt):
+        return rad2d_batch(pnt, bearing, distance, codec)
+
+    radians = bearing_codec(codec).to_radians(bearing)
+    x = pnt.x + distance * math.sin(radians)
+    y = pnt.y + distance * math.cos(radians)
+
+    return x, y
+
+
+def rad2d_batch(pnt, bearings, distances, codec=None):
+    """ Calculate x,y of many points radiated from one starting point in one vectorised pass
+
+        Args:
+            pnt (Point2d or PointArray class): The starting point
+            bearings (array like): bearings in degrees, minutes, seconds (dd.mmss)
+            distances (array like): distances
+            codec: bearing codec, defaults to Settings['bearing']
+
+        Returns:
+            x: array of x values of the new points
+            y: array of y values of the new points
+    """
+    radians = bearing_codec(codec).to_radians_array(bearings)
+    distances = np.asarray(distances, dtype=np.float64)
+
+    x = pnt.x + distances * np.sin(radians)
+    y = pnt.y + distances * np.cos(radians)
 
     return x, y
 
@@ -65,44 +111,87 @@ def reduced_level(rla, hi, sd, za, ht):
     return rlb
 
 
-def rad3d(pnt, bearing, slope_distance, zenith_angle, height_instrument, height_target):
+def rad3d(pnt, bearing, slope_distance, zenith_angle, height_instrument, height_target, codec=None):
     """ Calculate x,y,z given inital starting point and 3d vector
 
         Args:
-            pnt (Point3d class): 3d point with x, y and z
+            pnt (Point3d or PointArray class): 3d point with x, y and z
             bearing: the bearing in degrees, minutes, seconds (dd.mmss)
             slope_distance: measured slope distance
             zenith_angle: zenith angle in degrees, minutes and seconds (dd.mmss)
             height_instrument: height of instrument
             height_target: height of target
+            codec: bearing codec, defaults to Settings['bearing']
 
         Returns:
             x: x value of new point
             y: y value of new point
             z: z value of new point
     """
-    horizontal_distance = slope_distance * math.sin(math.radians(dms2dec(zenith_angle)))
-    x = pnt.x + horizontal_distance * math.sin(bearing_to_radians(bearing))
-    y = pnt.y + horizontal_distance * math.cos(bearing_to_radians(bearing))
-    z = pnt.z + height_instrument + (slope_distance * math.cos(math.radians(dms2dec(zenith_angle)))) - height_target
+    if _is_array(pnt):
+        return rad3d_batch(pnt, bearing, slope_distance, zenith_angle, height_instrument, height_target, codec)
+
+    radians = bearing_codec(codec).to_radians(bearing)
+    zenith_angle = math.radians(dms2dec(zenith_angle))
+    horizontal_distance = slope_distance * math.sin(zenith_angle)
+    x = pnt.x + horizontal_distance * math.sin(radians)
+    y = pnt.y + horizontal_distance * math.cos(radians)
+    z = pnt.z + height_instrument + (slope_distance * math.cos(zenith_angle)) - height_target
     return x, y, z
 
 
-def bearing_bearing_intersection(pnt_a, pnt_b, bearing_a, bearing_b):
+def rad3d_batch(pnt, bearings, slope_distances, zenith_angles, height_instrument, heights_target, codec=None):
+    """ Calculate x,y,z of many points radiated from one instrument setup in one vectorised pass
+
+        Every bearing and zenith angle is converted once and the coordinates of all
+        shots are computed together.
+
+        Args:
+            pnt (Point3d or PointArray class): the instrument station with x, y and z
+            bearings (array like): bearings in degrees, minutes, seconds (dd.mmss)
+            slope_distances (array like): measured slope distances
+            zenith_angles (array like): zenith angles in degrees, minutes and seconds (dd.mmss)
+            height_instrument (float or array like): height of instrument
+            heights_target (float or array like): height of target for each shot
+            codec: bearing codec, defaults to Settings['bearing']
+
+        Returns:
+            x: array of x values of the new points
+            y: array of y values of the new points
+            z: array of z values of the new points
+    """
+    radians = bearing_codec(codec).to_radians_array(bearings)
+    zenith_angles = np.radians(dms2dec_array(zenith_angles))
+    slope_distances = np.asarray(slope_distances, dtype=np.float64)
+
+    horizontal_distances = slope_distances * np.sin(zenith_angles)
+    x = pnt.x + horizontal_distances * np.sin(radians)
+    y = pnt.y + horizontal_distances * np.cos(radians)
+    z = pnt.z + height_instrument + slope_distances * np.cos(zenith_angles) - heights_target
+    return x, y, z
+
+
+def bearing_bearing_intersection(pnt_a, pnt_b, bearing_a, bearing_b, codec=None):
     """ Calculate point c using a two bearings intersection:
 
         Args:
-            pnt_a (Point2d class): point a
-            pnt_b (Point2d class): point b
+            pnt_a (Point2d or PointArray class): point a
+            pnt_b (Point2d or PointArray class): point b
             bearing_a: bearing from a to c in degrees, minutes, seconds (dd.mmss)
             bearing_b: bearing from b to c in degrees, minutes, seconds (dd.mmss)
+            codec: bearing codec, defaults to Settings['bearing']
 
         Returns:
-            x: x position of c
-            y: y position of c
+            x: x position of c, NaN for parallel bearings of PointArray input
+            y: y position of c, NaN for parallel bearings of PointArray input
     """
-    bc = math.tan(bearing_to_radians(bearing_b))
-    ac = math.tan(bearing_to_radians(bearing_a))
+    if _is_array(pnt_a, pnt_b):
+        (x, y, valid) = bearing_bearing_intersection_array(pnt_a, pnt_b, bearing_a, bearing_b, codec)
+        return x, y
+
+    codec = bearing_codec(codec)
+    bc = math.tan(codec.to_radians(bearing_b))
+    ac = math.tan(codec.to_radians(bearing_a))
     y = pnt_a.y + ((pnt_b.y - pnt_a.y) * bc - (pnt_b.x - pnt_a.x))/(bc - ac)
     x = pnt_a.x + (y - pnt_a.y) * ac
 
@@ -116,8 +205,8 @@ def distance_distance_intersection(pnt_a, pnt_b, dist_ac, dist_bc):
         up to the end user to decide which one they want.
 
         Args:
-            pnt_a (Point2d class): point a
-            pnt_b (Point2d class): point b
+            pnt_a (Point2d or PointArray class): point a
+            pnt_b (Point2d or PointArray class): point b
             dist_ac: distance from a to c
             dist_bc: distance from b to c
 
@@ -127,7 +216,11 @@ def distance_distance_intersection(pnt_a, pnt_b, dist_ac, dist_bc):
             x2: second x position of c
             y2: second y position of c
     """
-    d2 = math.pow((pnt_b.x - pnt_a.x),2) + math.pow((pnt_b.y-pnt_a.y),2)
+    if _is_array(pnt_a, pnt_b):
+        (x1, y1, x2, y2, valid) = distance_distance_intersection_array(pnt_a, pnt_b, dist_ac, dist_bc)
+        return x1, y1, x2, y2
+
+    d2 = (pnt_b.x - pnt_a.x) * (pnt_b.x - pnt_a.x) + (pnt_b.y - pnt_a.y) * (pnt_b.y - pnt_a.y)
     d = math.sqrt(d2)
     s = (dist_ac + dist_bc + d)/2
     K = math.sqrt(s * (s-dist_bc) * (s - dist_ac) * (s - d))
@@ -145,22 +238,28 @@ def distance_distance_intersection(pnt_a, pnt_b, dist_ac, dist_bc):
 
 
 def two_line_intersection(pnt_a, pnt_b, pnt_c, pnt_d):
-    """ Calculate the intersection of two lines given four points a, b, c, d
+    """ Calculate the intersection of line a-c with line b-d given four points a, b, c, d
 
         If the lines do not intersect, then the string "NA" is returned for both x and y
-        otherwise the intersection points x, y are returned
+        otherwise the intersection points x, y are returned. For PointArray input NaN
+        is returned for each pair of lines that do not intersect.
 
         Args:
-            pnt_a (Point class): point a
-            pnt_b (Point class): point b
-            pnt_c (Point class): point c
-            pnt_d (Point class): point d
+            pnt_a (Point class): point a, the start of the first line
+            pnt_b (Point class): point b, the start of the second line
+            pnt_c (Point class): point c, the end of the first line
+            pnt_d (Point class): point d, the end of the second line
 
         Returns:
             x: x-intersection or 'NA'
             y: y-intersection or 'NA'
     """
-    denominator = (pnt_a.x - pnt_b.x) * (pnt_c.y - pnt_d.y) - (pnt_a.y - pnt_b.y) * (pnt_c.x - pnt_d.x)
+    # Arrays of lines give NaN where the lines do not intersect
+    if _is_array(pnt_a, pnt_b, pnt_c, pnt_d):
+        (x, y, valid) = two_line_intersection_array(pnt_a, pnt_b, pnt_c, pnt_d)
+        return x, y
+
+    denominator = (pnt_c.x - pnt_a.x) * (pnt_d.y - pnt_b.y) - (pnt_c.y - pnt_a.y) * (pnt_d.x - pnt_b.x)
 
     # If denominator is zero, then the lines do not intersect
     if round(denominator, 3) == 0:
@@ -168,8 +267,237 @@ def two_line_intersection(pnt_a, pnt_b, pnt_c, pnt_d):
         y = "NA"
         return x, y
     else:
-        K = ((pnt_b.x - pnt_a.x) * (pnt_d.y - pnt_b.y) - (pnt_b.y - pnt_a.y) * (pnt_d.x - pnt_b.x))/ \
-            ((pnt_c.x - pnt_a.x) * (pnt_d.y - pnt_b.y) - (pnt_c.y - pnt_a.y) * (pnt_d.x - pnt_b.x))
+        K = ((pnt_b.x - pnt_a.x) * (pnt_d.y - pnt_b.y) - (pnt_b.y - pnt_a.y) * (pnt_d.x - pnt_b.x)) / denominator
         x = pnt_a.x + K * (pnt_c.x - pnt_a.x)
         y = pnt_a.y + K * (pnt_c.y - pnt_a.y)
         return x, y
+
+
+def _columns(*values):
+    """ Broadcast points coordinates or values to float arrays of the same shape
+    """
+    return np.broadcast_arrays(*[np.asarray(value, dtype=np.float64) for value in values])
+
+
+def bearing_bearing_intersection_array(pnt_a, pnt_b, bearings_a, bearings_b, codec=None):
+    """ Calculate point c of many bearing bearing intersections at once
+
+        Args:
+            pnt_a (Point2d or PointArray class): point a
+            pnt_b (Point2d or PointArray class): point b
+            bearings_a (array like): bearings from a to c
+            bearings_b (array like): bearings from b to c
+            codec: bearing codec, defaults to Settings['bearing']
+
+        Returns:
+            x: x position of c, NaN where the bearings are parallel
+            y: y position of c, NaN where the bearings are parallel
+            valid: boolean array, False where the bearings are parallel
+    """
+    codec = bearing_codec(codec)
+    (ax, ay, bx, by, bearings_a, bearings_b) = _columns(pnt_a.x, pnt_a.y, pnt_b.x, pnt_b.y,
+                                                         codec.to_radians_array(bearings_a),
+                                                         codec.to_radians_array(bearings_b))
+
+    # Solve a + t * (sin(bearing_a), cos(bearing_a)) = b + u * (sin(bearing_b), cos(bearing_b))
+    denominator = np.sin(bearings_a - bearings_b)
+    valid = np.abs(denominator) > 1e-12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = ((bx - ax) * np.cos(bearings_b) - (by - ay) * np.sin(bearings_b)) / denominator
+    x = np.where(valid, ax + t * np.sin(bearings_a), np.nan)
+    y = np.where(valid, ay + t * np.cos(bearings_a), np.nan)
+    return x, y, valid
+
+
+def distance_distance_intersection_array(pnt_a, pnt_b, dists_ac, dists_bc):
+    """ Calculate both solutions for point c of many distance distance intersections at once
+
+        Args:
+            pnt_a (Point2d or PointArray class): point a
+            pnt_b (Point2d or PointArray class): point b
+            dists_ac (array like): distances from a to c
+            dists_bc (array like): distances from b to c
+
+        Returns:
+            x1: first x position of c, NaN where the circles do not meet
+            y1: first y position of c, NaN where the circles do not meet
+            x2: second x position of c, NaN where the circles do not meet
+            y2: second y position of c, NaN where the circles do not meet
+            valid: boolean array, False where the circles do not meet or a and b coincide
+    """
+    (ax, ay, bx, by, dist_ac, dist_bc) = _columns(pnt_a.x, pnt_a.y, pnt_b.x, pnt_b.y, dists_ac, dists_bc)
+
+    d2 = (bx - ax) * (bx - ax) + (by - ay) * (by - ay)
+    d = np.sqrt(d2)
+    s = (dist_ac + dist_bc + d) / 2
+    area2 = s * (s - dist_bc) * (s - dist_ac) * (s - d)
+    valid = (area2 >= 0) & (d2 > 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        K = np.sqrt(np.where(valid, area2, np.nan))
+        along = (dist_ac * dist_ac - dist_bc * dist_bc) / (2 * d2)
+        across_x = 2 * (by - ay) * K / d2
+        across_y = 2 * (bx - ax) * K / d2
+        mid_x = (bx + ax) / 2 + (bx - ax) * along
+        mid_y = (by + ay) / 2 + (by - ay) * along
+
+    return mid_x + across_x, mid_y - across_y, mid_x - across_x, mid_y + across_y, valid
+
+
+def two_line_intersection_array(pnt_a, pnt_b, pnt_c, pnt_d):
+    """ Calculate the intersections of many pairs of lines a-c and b-d at once
+
+        The lines are paired as in two_line_intersection.
+
+        Args:
+            pnt_a (Point2d or PointArray class): point a, the start of the first line
+            pnt_b (Point2d or PointArray class): point b, the start of the second line
+            pnt_c (Point2d or PointArray class): point c, the end of the first line
+            pnt_d (Point2d or PointArray class): point d, the end of the second line
+
+        Returns:
+            x: x-intersection, NaN where the lines are parallel
+            y: y-intersection, NaN where the lines are parallel
+            valid: boolean array, False where the lines are parallel
+    """
+    (ax, ay, bx, by, cx, cy, dx, dy) = _columns(pnt_a.x, pnt_a.y, pnt_b.x, pnt_b.y,
+                                                pnt_c.x, pnt_c.y, pnt_d.x, pnt_d.y)
+
+    denominator = (cx - ax) * (dy - by) - (cy - ay) * (dx - bx)
+    valid = np.round(denominator, 3) != 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        K = ((bx - ax) * (dy - by) - (by - ay) * (dx - bx)) / denominator
+        x = np.where(valid, ax + K * (cx - ax), np.nan)
+        y = np.where(valid, ay + K * (cy - ay), np.nan)
+    return x, y, valid
+
+
+def _sweep(low, high):
+    """ Sweep order of a set of intervals, and the number of later intervals in that order
+        which start before each one ends
+    """
+    order = np.argsort(low, kind='mergesort')
+    stop = np.searchsorted(low[order], high[order], side='right')
+    return order, stop - np.arange(1, len(low) + 1)
+
+
+def segment_intersections(starts, ends, touching=True, block_size=1000000):
+    """ Find every pair of intersecting segments in a set of line segments
+
+        The segments are swept along x or y, whichever gives fewer candidate pairs, in
+        order of their smallest coordinate. Each segment is only tested against the
+        segments which start before it ends along the sweep and whose ranges across the
+        sweep overlap it. The time is O(N log N + P) where P is the number of pairs whose
+        ranges overlap along the sweep axis, so a fabric of short segments, or long
+        segments stacked along one axis, is checked in about O(N log N + K) rather than
+        the N squared calls of two_line_intersection. P is still near N squared when
+        most segments are long enough to span the extent in both x and y.
+
+        Crossing segments are tested with the same round(denominator, 3) == 0 check for
+        parallel lines as two_line_intersection. Collinear segments which overlap are
+        reported twice, at each end of the shared part, and once if they only meet at an
+        end point.
+
+        Args:
+            starts (PointArray class): start point of every segment
+            ends (PointArray class): end point of every segment
+            touching (bool): if False, segments which only meet at a shared end point
+                (e.g. adjoining boundary lines) are not reported
+            block_size (int): maximum number of candidate pairs tested at once
+
+        Returns:
+            x: x of every intersection
+            y: y of every intersection
+            first: index of the first segment of every intersection
+            second: index of the second segment of every intersection, always greater
+                than first. Results are sorted by first, second, x then y.
+    """
+    x1 = np.asarray(starts.x, dtype=np.float64)
+    y1 = np.asarray(starts.y, dtype=np.float64)
+    x2 = np.asarray(ends.x, dtype=np.float64)
+    y2 = np.asarray(ends.y, dtype=np.float64)
+    n = len(x1)
+
+    xmin = np.minimum(x1, x2)
+    xmax = np.maximum(x1, x2)
+    ymin = np.minimum(y1, y2)
+    ymax = np.maximum(y1, y2)
+
+    # Sweep order, and the number of later segments in that order overlapping each one
+    (order, counts) = _sweep(xmin, xmax)
+    (y_order, y_counts) = _sweep(ymin, ymax)
+    if y_counts.sum() < counts.sum():
+        (order, counts) = (y_order, y_counts)
+        (across_min, across_max) = (xmin, xmax)
+    else:
+        (across_min, across_max) = (ymin, ymax)
+    total = np.cumsum(counts)
+
+    results = []
+    start = 0
+    while start < n:
+        # Take as many sweep positions as fit in one block of candidate pairs
+        done = total[start - 1] if start > 0 else 0
+        end = max(start + 1, int(np.searchsorted(total, done + block_size, side='right')))
+        block = counts[start:end]
+
+        position = np.repeat(np.arange(start, end), block)
+        within = np.arange(len(position)) - np.repeat(np.cumsum(block) - block, block)
+        i = order[position]
+        j = order[position + 1 + within]
+        start = end
+
+        overlap = (across_min[i] <= across_max[j]) & (across_min[j] <= across_max[i])
+        i = i[overlap]
+        j = j[overlap]
+
+        rx = x2[i] - x1[i]
+        ry = y2[i] - y1[i]
+        sx = x2[j] - x1[j]
+        sy = y2[j] - y1[j]
+        qx = x1[j] - x1[i]
+        qy = y1[j] - y1[i]
+        denominator = rx * sy - ry * sx
+        parallel = np.round(denominator, 3) == 0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (qx * sy - qy * sx) / denominator
+            u = (qx * ry - qy * rx) / denominator
+        hit = ~parallel & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+
+        # Shared part of collinear segments, as positions along the first segment
+        collinear = parallel & (np.round(qx * ry - qy * rx, 3) == 0)
+        length2 = rx * rx + ry * ry
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t0 = (qx * rx + qy * ry) / length2
+            t1 = t0 + (sx * rx + sy * ry) / length2
+        low = np.maximum(np.minimum(t0, t1), 0)
+        high = np.minimum(np.maximum(t0, t1), 1)
+        point = collinear & (low == high)
+        span = collinear & (low < high)
+
+        if not touching:
+            # lines which do not overlap can only meet at the shared end point
+            for ax, ay in ((x1, y1), (x2, y2)):
+                for bx, by in ((x1, y1), (x2, y2)):
+                    shared = (ax[i] == bx[j]) & (ay[i] == by[j])
+                    hit &= ~shared
+                    point &= ~shared
+
+        index = np.concatenate((np.flatnonzero(hit), np.flatnonzero(point), np.repeat(np.flatnonzero(span), 2)))
+        t = np.concatenate((t[hit], low[point], np.column_stack((low, high))[span].ravel()))
+        results.append((x1[i][index] + t * rx[index], y1[i][index] + t * ry[index], i[index], j[index]))
+
+    if not results:
+        empty = np.empty(0, dtype=np.intp)
+        return np.empty(0), np.empty(0), empty, empty
+
+    x = np.concatenate([result[0] for result in results])
+    y = np.concatenate([result[1] for result in results])
+    i = np.concatenate([result[2] for result in results])
+    j = np.concatenate([result[3] for result in results])
+
+    first = np.minimum(i, j)
+    second = np.maximum(i, j)
+    order = np.lexsort((y, x, second, first))
+    return x[order], y[order], first[order], second[order]
@@ -1,3 +1,8 @@
+from ._lazy import lazy_numpy
+
+np = lazy_numpy(__name__)
+
+
 class Projection:
     def __init__(self, a, invf, m0, false_easting, false_northing):
         self.a = a # ellipsoid semi-major axis
@@ -7,25 +12,113 @@ class Projection:
         self.false_northing = false_northing # false northing
 
 
-class Point2d:
+class Point2d(object):
+    """ 2d point with an optional code
+
+        Uses __slots__ so no per-instance __dict__ is created, and always has a
+        code attribute (None when no code is given). Unpacks like a tuple:
+        x, y = point
+    """
+    __slots__ = ('x', 'y', 'code')
+
     def __init__(self, x, y, code=None):
-        if code is None:
-            self.x = x
-            self.y = y
-        else:
-            self.x = x
-            self.y = y
-            self.code = code
+        self.x = x
+        self.y = y
+        self.code = code
+
+    def __iter__(self):
+        return iter((self.x, self.y))
+
+    def __repr__(self):
+        return "Point2d(%r, %r, %r)" % (self.x, self.y, self.code)
 
 
-class Point3d:
+class Point3d(object):
+    """ 3d point with an optional code
+
+        Uses __slots__ so no per-instance __dict__ is created, and always has a
+        code attribute (None when no code is given). Unpacks like a tuple:
+        x, y, z = point
+    """
+    __slots__ = ('x', 'y', 'z', 'code')
+
     def __init__(self, x, y, z, code=None):
-        if code is None:
-            self.x = x
-            self.y = y
-            self.z = z
-        else:
-            self.x = x
-            self.y = y
-            self.z = z
-            self.code = code
+        self.x = x
+        self.y = y
+        self.z = z
+        self.code = code
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __repr__(self):
+        return "Point3d(%r, %r, %r, %r)" % (self.x, self.y, self.z, self.code)
+
+
+class PointArray:
+    """ Columnar store for many points
+
+        Holds contiguous float64 x, y and (optionally) z columns and an optional code
+        column instead of one Point2d/Point3d object per point. Indexing with an
+        integer returns a Point2d/Point3d, while slices, index arrays and boolean masks
+        return a new PointArray.
+
+        Args:
+            x (array like): x values
+            y (array like): y values
+            z (array like): z values or None for 2d points
+            code (array like): code of every point or None
+    """
+    def __init__(self, x, y, z=None, code=None):
+        self.x = np.ascontiguousarray(np.ravel(x), dtype=np.float64)
+        self.y = np.ascontiguousarray(np.ravel(y), dtype=np.float64)
+        self.z = None if z is None else np.ascontiguousarray(np.ravel(z), dtype=np.float64)
+        self.code = None if code is None else np.asarray(np.ravel(code), dtype=object)
+
+        for column in (self.y, self.z, self.code):
+            if column is not None and len(column) != len(self.x):
+                raise ValueError("PointArray columns must all be the same length")
+
+    @classmethod
+    def from_points(cls, points):
+        """ Create a PointArray from a sequence of Point2d or Point3d objects
+
+            The result is 3d only if every point has a z value, and has a code
+            column only if at least one point has a code.
+        """
+        points = list(points)
+        x = np.fromiter((pnt.x for pnt in points), dtype=np.float64, count=len(points))
+        y = np.fromiter((pnt.y for pnt in points), dtype=np.float64, count=len(points))
+
+        z = None
+        if points and all(hasattr(pnt, 'z') for pnt in points):
+            z = np.fromiter((pnt.z for pnt in points), dtype=np.float64, count=len(points))
+
+        code = [pnt.code for pnt in points]
+        if all(c is None for c in code):
+            code = None
+
+        return cls(x, y, z, code)
+
+    def to_points(self):
+        """ Convert to a list of Point2d or Point3d objects
+        """
+        return [self[i] for i in range(len(self))]
+
+    def __len__(self):
+        return len(self.x)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            code = None if self.code is None else self.code[index]
+            if self.z is None:
+                return Point2d(float(self.x[index]), float(self.y[index]), code)
+            return Point3d(float(self.x[index]), float(self.y[index]), float(self.z[index]), code)
+
+        return PointArray(self.x[index], self.y[index],
+                          None if self.z is None else self.z[index],
+                          None if self.code is None else self.code[index])
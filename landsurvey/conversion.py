@@ -2,27 +2,53 @@
 # 1 = degrees, minutes, seconds (dd.mmss)
 # 2 = North American quadrants (Ndd.mmssE)
 # 3 = gradians
+# 4 = radians
+#
+# Settings applies to the whole process. Functions which take bearings also accept a
+# codec argument (DMS, QUADRANT, GRADIAN or RADIAN) and use_bearing_codec binds a codec
+# to the current thread, so different threads can work in different conventions.
 
 import math
+import threading
+from ._lazy import lazy_numpy
+
+np = lazy_numpy(__name__)
 
 Settings = {}
 Settings['bearing'] = 1
 
 
-def bearing_to_radians(bearing):
-    """ Converts bearing to radians based on Settings['bearing']
+class DmsCodec:
+    """ Bearings in degrees, minutes, seconds (dd.mmss)
     """
+    def to_radians(self, bearing):
+        return math.radians(dms2dec(bearing))
+
+    def from_radians(self, radians):
+        return dec2dms(math.degrees(radians))
+
+    def to_radians_array(self, bearings):
+        return np.radians(dms2dec_array(bearings))
+
+    def from_radians_array(self, radians):
+        return dec2dms_array(np.degrees(radians))
+
+    def parse_array(self, fields):
+        """ Convert text fields to the array type to_radians_array expects
+        """
+        return np.array(fields, dtype=np.float64)
 
-    # degrees, minutes, seconds
-    if Settings['bearing'] == 1:
-        radians = math.radians(dms2dec(bearing))
-        return radians
 
-    # quadrants
-    if Settings['bearing'] == 2:
+class QuadrantCodec:
+    """ Bearings as North American quadrants (Ndd.mmssE)
+    """
+    def to_radians(self, bearing):
+        text = bearing
         bearing = list(bearing)
         quad1 = bearing.pop(0) # Grab the first quadrant off front
         quad2 = bearing.pop(-1) # Grab second quadrant off back
+        if quad1 not in ('N', 'S') or quad2 not in ('E', 'W'):
+            raise ValueError("%r is not a quadrant bearing" % (text,))
         bearing = float(''.join(bearing)) # Convert remaining to a float number
         dec = dms2dec(bearing) # Convert to decimal degrees
 
@@ -40,23 +66,7 @@ def bearing_to_radians(bearing):
 
         return radians
 
-    # gradians
-    if Settings['bearing'] == 3:
-        radians = bearing * (math.pi/200)
-        return radians
-
-
-def radians_to_bearing(radians):
-    """ Converts radians to bearings based on Settings['bearing']
-    """
-
-    # degrees, minutes, seconds
-    if Settings['bearing'] == 1:
-        bearing = dec2dms(math.degrees(radians))
-        return bearing
-
-    # quadrants
-    if Settings['bearing'] == 2:
+    def from_radians(self, radians):
         bearing = math.degrees(radians)
         if bearing >= 0 and bearing <= 90:
             quad1 = 'N'
@@ -86,11 +96,143 @@ def radians_to_bearing(radians):
             bearing = quad1 + str(bearing) + quad2
             return bearing
 
-    # gradians
-    if Settings['bearing'] == 3:
-        bearing = radians * (200/math.pi)
+    def to_radians_array(self, bearings):
+        bearings = np.asarray(bearings).astype(np.str_)
+        quad1 = bearings.astype('U1')  # Grab the first quadrant off front
+        quad2 = np.char.lstrip(bearings, 'NS0123456789.')  # Grab second quadrant off back
+        invalid = ((quad1 != 'N') & (quad1 != 'S')) | ((quad2 != 'E') & (quad2 != 'W'))
+        if np.any(invalid):
+            raise ValueError("%r is not a quadrant bearing" % (bearings[invalid][0],))
+        dec = dms2dec_array(np.char.strip(bearings, 'NSEW').astype(np.float64))  # Convert to decimal degrees
+
+        north = quad1 == 'N'
+        east = quad2 == 'E'
+        radians = np.where(north & east, np.radians(dec),
+                  np.where(~north & east, np.radians(180 - dec),
+                  np.where(~north & ~east, np.radians(180 + dec), np.radians(360 - dec))))
+        return radians
+
+    def from_radians_array(self, radians):
+        bearing = np.degrees(np.asarray(radians, dtype=np.float64))
+        ne = (bearing >= 0) & (bearing <= 90)
+        se = ~ne & (bearing >= 90) & (bearing <= 180)
+        sw = ~ne & ~se & (bearing >= 180) & (bearing <= 270)
+        nw = ~ne & ~se & ~sw & (bearing >= 270) & (bearing <= 360)
+
+        dms = dec2dms_array(np.select([ne, se, sw, nw], [bearing, 180 - bearing, bearing - 180, 360 - bearing]))
+        quad1 = np.where(ne | nw, 'N', 'S')
+        quad2 = np.where(ne | se, 'E', 'W')
+        # format with str so the text matches from_radians exactly
+        dms = np.array(list(map(str, dms.ravel().tolist())), dtype=np.str_).reshape(dms.shape)
+        bearings = np.array(np.char.add(np.char.add(quad1, dms), quad2), dtype=object)
+
+        # bearings outside 0-360 degrees have no quadrant
+        bearings[~(ne | se | sw | nw)] = None
+        return bearings
+
+    def parse_array(self, fields):
+        """ Convert text fields to the array type to_radians_array expects
+        """
+        return np.array(fields, dtype=np.str_)
+
+
+class GradianCodec:
+    """ Bearings in gradians
+    """
+    def to_radians(self, bearing):
+        return bearing * (math.pi/200)
+
+    def from_radians(self, radians):
+        return radians * (200/math.pi)
+
+    def to_radians_array(self, bearings):
+        return np.asarray(bearings, dtype=np.float64) * (math.pi/200)
+
+    def from_radians_array(self, radians):
+        return np.asarray(radians, dtype=np.float64) * (200/math.pi)
+
+    def parse_array(self, fields):
+        """ Convert text fields to the array type to_radians_array expects
+        """
+        return np.array(fields, dtype=np.float64)
+
+
+class RadianCodec:
+    """ Bearings in radians
+    """
+    def to_radians(self, bearing):
         return bearing
 
+    def from_radians(self, radians):
+        return radians
+
+    def to_radians_array(self, bearings):
+        return np.asarray(bearings, dtype=np.float64)
+
+    def from_radians_array(self, radians):
+        return np.asarray(radians, dtype=np.float64)
+
+    def parse_array(self, fields):
+        """ Convert text fields to the array type to_radians_array expects
+        """
+        return np.array(fields, dtype=np.float64)
+
+
+DMS = DmsCodec()
+QUADRANT = QuadrantCodec()
+GRADIAN = GradianCodec()
+RADIAN = RadianCodec()
+
+# Codecs for each Settings['bearing'] value
+_codecs = {1: DMS, 2: QUADRANT, 3: GRADIAN, 4: RADIAN}
+
+# Codec bound to each thread with use_bearing_codec
+_thread_codec = threading.local()
+
+
+def bearing_codec(codec=None):
+    """ Return the bearing codec to use
+
+        Args:
+            codec: a codec object, a Settings['bearing'] number or None. None uses the codec
+                bound to this thread by use_bearing_codec, otherwise Settings['bearing']
+
+        Returns:
+            codec: the codec object
+    """
+    if codec is None:
+        codec = getattr(_thread_codec, 'codec', None)
+        if codec is None:
+            return _codecs[Settings['bearing']]
+        return codec
+    if isinstance(codec, int):
+        return _codecs[codec]
+    return codec
+
+
+def use_bearing_codec(codec):
+    """ Bind a bearing codec to the current thread
+
+        Functions called from this thread without a codec argument use it instead of
+        Settings['bearing']. Pass None to go back to Settings['bearing'].
+
+        Args:
+            codec: a codec object, a Settings['bearing'] number or None
+    """
+    _thread_codec.codec = None if codec is None else bearing_codec(codec)
+
+
+def bearing_to_radians(bearing, codec=None):
+    """ Converts bearing to radians based on Settings['bearing'] or the given codec
+    """
+    return bearing_codec(codec).to_radians(bearing)
+
+
+def radians_to_bearing(radians, codec=None):
+    """ Converts radians to bearings based on Settings['bearing'] or the given codec
+    """
+    return bearing_codec(codec).from_radians(radians)
+
 def dms2dec(dms):
     """ Convert dd.mmss to decimal degrees
     """
@@ -121,3 +263,69 @@ def dec2dms(decdeg):
     seconds = (((decdeg - degrees) * 3600) - minutes * 60)
     dms = degrees + float(minutes)/100 + seconds/10000
     return dms*sign
+
+
+def bearing_to_radians_array(bearings, codec=None):
+    """ Converts an array of bearings to radians based on Settings['bearing'] or the given codec
+
+        Gives identical results to calling bearing_to_radians on every element,
+        but converts the whole array in one call.
+
+        Args:
+            bearings (array like): dd.mmss values, quadrant strings (Ndd.mmssE), gradians or radians
+            codec: bearing codec, see bearing_codec
+
+        Returns:
+            radians: array of radians
+    """
+    return bearing_codec(codec).to_radians_array(bearings)
+
+
+def radians_to_bearing_array(radians, codec=None):
+    """ Converts an array of radians to bearings based on Settings['bearing'] or the given codec
+
+        Gives identical results to calling radians_to_bearing on every element,
+        but converts the whole array in one call.
+
+        Args:
+            radians (array like): angles in radians
+            codec: bearing codec, see bearing_codec
+
+        Returns:
+            bearings: array of dd.mmss values, quadrant strings (Ndd.mmssE), gradians or radians
+    """
+    return bearing_codec(codec).from_radians_array(radians)
+
+
+def dms2dec_array(dms):
+    """ Convert an array of dd.mmss to decimal degrees
+
+        Gives identical results to calling dms2dec on every element, including
+        negative angles.
+    """
+    dms = np.asarray(dms, dtype=np.float64)
+    sign = np.where(dms < 0, -1.0, 1.0)
+    dms = dms * sign
+
+    degrees = np.trunc(dms)
+    minutes = np.trunc((dms*100)-degrees*100)
+    seconds = (((dms-degrees)*100) - minutes) * 100
+    decdeg = degrees + minutes/60 + seconds/3600
+    return decdeg*sign
+
+
+def dec2dms_array(decdeg):
+    """ Convert an array of decimal degrees to dd.mmss
+
+        Gives identical results to calling dec2dms on every element, including
+        negative angles.
+    """
+    decdeg = np.asarray(decdeg, dtype=np.float64)
+    sign = np.where(decdeg < 0, -1.0, 1.0)
+    decdeg = decdeg * sign
+
+    degrees = np.trunc(decdeg)
+    minutes = np.trunc((decdeg*60) - degrees*60)
+    seconds = (((decdeg - degrees) * 3600) - minutes * 60)
+    dms = degrees + minutes/100 + seconds/10000
+    return dms*sign
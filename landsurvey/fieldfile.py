@@ -0,0 +1,176 @@
+"""
+Streaming reader for raw total station field files.
+
+The field file is plain text with one comma separated record per line. Blank lines
+and lines starting with # are ignored. Angles use the Settings['bearing'] convention,
+or the codec passed to the reader, except zenith angles which are always dd.mmss.
+
+    STN,code,x,y,z,hi
+        Start a new setup on a station of known coordinates with height of instrument hi.
+
+    BS,code,x,y,reading
+        Backsight to a point of known coordinates. The horizontal circle reading is
+        used to orient every following observation of the setup. Without a backsight
+        the circle readings are taken to be bearings.
+
+    OBS,code,reading,slope_distance,zenith_angle,ht
+        Observation of a point with horizontal circle reading, slope distance,
+        zenith angle and height of target.
+
+Example:
+
+    STN,STN1,255.751,176.286,42.623,1.565
+    BS,BM1,301.245,299.215,0.0000
+    OBS,TOE,240.2520,11.682,93.2230,1.690
+    OBS,CREST,160.2520,15.162,101.4430,1.690
+"""
+import math
+import numpy as np
+from .conversion import bearing_codec
+from .classes import Point2d, Point3d, PointArray
+from .calc import join2d, rad3d_batch
+
+
+class Setup:
+    """ An instrument setup read from a field file
+
+        Args:
+            station (Point3d class): the occupied station
+            hi: height of instrument
+    """
+    def __init__(self, station, hi):
+        self.station = station
+        self.hi = hi
+        self.backsight = None  # backsight point
+        self.orientation = 0.0  # orientation correction in radians
+
+
+class ObservationChunk:
+    """ A block of observations from one setup held as arrays
+    """
+    def __init__(self, codes, readings, slope_distances, zenith_angles, heights_target):
+        self.codes = np.array(codes, dtype=object)
+        self.readings = readings  # in the convention of the bearing codec
+        self.slope_distances = np.array(slope_distances, dtype=np.float64)
+        self.zenith_angles = np.array(zenith_angles, dtype=np.float64)
+        self.heights_target = np.array(heights_target, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.codes)
+
+
+def _chunk(observations, codec):
+    """ Build an ObservationChunk from a list of OBS record fields
+    """
+    codes, readings, slope_distances, zenith_angles, heights_target = zip(*observations)
+    return ObservationChunk(codes, codec.parse_array(readings), slope_distances, zenith_angles, heights_target)
+
+
+def _open(source):
+    """ Return an iterator over the lines of a path or open file, and whether it must be closed
+    """
+    if isinstance(source, (str, type(u''))):
+        return open(source), True
+    return iter(source), False
+
+
+def read_field_file(source, chunk_size=10000, codec=None):
+    """ Lazily read a field file yielding setups and chunks of observations
+
+        Only one chunk of observations is held in memory at a time, so files of any
+        size can be read.
+
+        Args:
+            source: path to the field file, an open file or any iterable of lines
+            chunk_size (int): maximum number of observations in each chunk
+            codec: bearing codec, defaults to Settings['bearing']
+
+        Returns:
+            generator of (setup, chunk) tuples where setup is a Setup and chunk is an
+            ObservationChunk. Consecutive chunks from the same setup share the Setup.
+    """
+    codec = bearing_codec(codec)
+    lines, close = _open(source)
+    setup = None
+    observations = []
+
+    try:
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            fields = [field.strip() for field in line.split(',')]
+            record = fields[0].upper()
+
+            try:
+                if record == 'STN':
+                    if observations:
+                        yield setup, _chunk(observations, codec)
+                        observations = []
+                    station = Point3d(float(fields[2]), float(fields[3]), float(fields[4]), fields[1])
+                    setup = Setup(station, float(fields[5]))
+
+                elif record == 'BS':
+                    if setup is None:
+                        raise ValueError("backsight before station record")
+                    if observations:
+                        yield setup, _chunk(observations, codec)
+                        observations = []
+                    backsight = Point2d(float(fields[2]), float(fields[3]), fields[1])
+                    reading = codec.parse_array([fields[4]])[0]
+                    (distance, bearing) = join2d(setup.station, backsight, codec)
+
+                    # Setups are immutable once chunks have been yielded, so start a new one
+                    setup = Setup(setup.station, setup.hi)
+                    setup.backsight = backsight
+                    setup.orientation = codec.to_radians(bearing) - codec.to_radians(reading)
+
+                elif record == 'OBS':
+                    if setup is None:
+                        raise ValueError("observation before station record")
+                    observations.append((fields[1], fields[2], float(fields[3]), float(fields[4]),
+                                         float(fields[5])))
+                    if len(observations) >= chunk_size:
+                        yield setup, _chunk(observations, codec)
+                        observations = []
+
+                else:
+                    raise ValueError("unknown record type %s" % fields[0])
+
+            except (IndexError, ValueError) as err:
+                raise ValueError("line %d: %s" % (line_number, err))
+
+        if observations:
+            yield setup, _chunk(observations, codec)
+    finally:
+        if close:
+            lines.close()
+
+
+def reduce_field_file(source, chunk_size=10000, codec=None):
+    """ Lazily read and reduce a field file to coordinates
+
+        Each chunk of observations is oriented with the backsight of its setup and
+        reduced with rad3d_batch as the file streams, so memory use does not grow with
+        the size of the file.
+
+        Args:
+            source: path to the field file, an open file or any iterable of lines
+            chunk_size (int): maximum number of observations in each chunk
+            codec: bearing codec, defaults to Settings['bearing']
+
+        Returns:
+            generator of (setup, points) tuples where points is a PointArray of the
+            reduced x, y, z with the observation codes
+    """
+    codec = bearing_codec(codec)
+    for setup, chunk in read_field_file(source, chunk_size, codec):
+        bearings = chunk.readings
+        if setup.orientation != 0:
+            radians = codec.to_radians_array(bearings) + setup.orientation
+            bearings = codec.from_radians_array(np.mod(radians, 2 * math.pi))
+
+        (x, y, z) = rad3d_batch(setup.station, bearings, chunk.slope_distances, chunk.zenith_angles,
+                                setup.hi, chunk.heights_target, codec)
+        yield setup, PointArray(x, y, z, chunk.codes)
@@ -1,61 +1,168 @@
+import cmath
 import math
-from conversion import bearing_to_radians
+from .conversion import bearing_codec
+import numpy as np
 
 
-def gauss_kruger(latitude, longitude, central_meridian, proj):
+class CompiledProjection:
+    """ Projection with every ellipsoid and Kruger series constant precomputed
+
+        Built once from a Projection so that gauss_kruger only has to evaluate the
+        latitude and longitude dependent terms for each point. Use compile_projection
+        rather than creating these directly so that instances are shared.
+    """
+    def __init__(self, proj):
+        self.a = proj.a  # ellipsoid semi-major axis
+        self.invf = proj.invf  # 1/f
+        self.m0 = proj.m0  # central scale factor
+        self.false_easting = proj.false_easting  # false easting
+        self.false_northing = proj.false_northing  # false northing
+
+        # Calculate geometrical constants
+        a = proj.a
+        self.f = f = 1.0/proj.invf
+        self.b = b = a * (1-f)  # semi - minor axis
+
+        # Eccentricity
+        self.e2 = e2 = 2 * f - f * f  # = f*(2-f) = (a^2-b^2)/a^2
+        self.e = math.sqrt(e2)
+
+        # Compute 3rd flattening and powers
+        self.n = n = (a - b)/(a + b)
+        n2 = n * n
+        n3 = n * n2
+        n4 = n2 * n2
+        n5 = n3 * n2
+        n6 = n2 * n4
+        n7 = n4 * n3
+        n8 = n4 * n4
+
+        # Rectifying Radius A
+        self.A = (a/(1+n)) * (1+(1.0/4.0) * n2 + (1.0/64) * n4 + (1.0/256) * n6 + (25.0/16384) * n8)
+
+        # Compute the coefficients a2..a16
+        self.alpha = (
+            (1.0/2) * n - (2.0/3) * n2 + (5.0/16) * n3 + (41.0/180) * n4 - (127.0/288) * n5 + (7891.0/37800) * n6 +
+            (72161.0/387072) * n7 - (18975107.0/50803200) * n8,
+            (13.0/48) * n2 - (3.0/5) * n3 + (557.0/1440) * n4 + (281.0/630) * n5 - (1983433.0/1935360) * n6 +
+            (13769.0/28800) * n7 + (148003883.0/174182400) * n8,
+            (61.0/240) * n3 - (103.0/140) * n4 + (15061.0/26880) * n5 + (167603.0/181440) * n6 -
+            (67102379.0/29030400) * n7 + (79682431.0/79833600) * n8,
+            (49561.0/161280) * n4 - (179.0/168) * n5 + (6601661.0/7257600) * n6 + (97445.0/49896) * n7 -
+            (40176129013.0/7664025600) * n8,
+            (34729.0/80640) * n5 - (3418889.0/1995840) * n6 + (14644087.0/9123840) * n7 +
+            (2605413599.0/622702080) * n8,
+            (212378941.0/319334400) * n6 - (30705481.0/10378368) * n7 + (175214326799.0/58118860800) * n8,
+            (1522256789.0/1383782400) * n7 - (16759934899.0/3113510400) * n8,
+            (1424729850961.0/743921418240) * n8)
+
+        # Compute the coefficients b2..b16 of the inverse series
+        self.beta = (
+            (1.0/2) * n - (2.0/3) * n2 + (37.0/96) * n3 - (1.0/360) * n4 - (81.0/512) * n5 + (96199.0/604800) * n6 -
+            (5406467.0/38707200) * n7 + (7944359.0/67737600) * n8,
+            (1.0/48) * n2 + (1.0/15) * n3 - (437.0/1440) * n4 + (46.0/105) * n5 - (1118711.0/3870720) * n6 +
+            (51841.0/1209600) * n7 + (24749483.0/348364800) * n8,
+            (17.0/480) * n3 - (37.0/840) * n4 - (209.0/4480) * n5 + (5569.0/90720) * n6 +
+            (9261899.0/58060800) * n7 - (6457463.0/17740800) * n8,
+            (4397.0/161280) * n4 - (11.0/504) * n5 - (830251.0/7257600) * n6 + (466511.0/2494800) * n7 +
+            (324154477.0/7664025600) * n8,
+            (4583.0/161280) * n5 - (108847.0/3991680) * n6 - (8005831.0/63866880) * n7 +
+            (22894433.0/124540416) * n8,
+            (20648693.0/638668800) * n6 - (16363163.0/518918400) * n7 - (2204645983.0/12915302400) * n8,
+            (219941297.0/5535129600) * n7 - (497323811.0/12454041600) * n8,
+            (191773887257.0/3719607091200) * n8)
+
+
+# Registry of compiled projections keyed by the projection parameters
+_compiled_projections = {}
+
+
+def compile_projection(proj):
+    """ Return the CompiledProjection for a projection definition
+
+        Compiled projections are cached, so every Projection with the same ellipsoid,
+        scale factor and false origin (e.g. all MGA or UTM zones) shares one instance.
+
+        Args:
+            proj (Projection or CompiledProjection class): projection definition
+
+        Returns:
+            compiled: CompiledProjection holding the derived constants
+    """
+    if isinstance(proj, CompiledProjection):
+        return proj
+
+    key = (proj.a, proj.invf, proj.m0, proj.false_easting, proj.false_northing)
+    compiled = _compiled_projections.get(key)
+    if compiled is None:
+        compiled = CompiledProjection(proj)
+        _compiled_projections[key] = compiled
+    return compiled
+
+
+# Orders of the Kruger series which can be used. Accuracy is the largest difference
+# in easting or northing from the 8th order series (the coefficients are always
+# computed to n^8) for latitudes up to 80 degrees on the GRS80 ellipsoid:
+#
+#   order   3 degrees from the CM   20 degrees from the CM   30 degrees from the CM
+#     4         0.05 micrometre         0.7 micrometre            5 micrometre
+#     6         rounding (~4e-9 m)      rounding                  rounding
+#     8         reference
+SERIES_ORDERS = (4, 6, 8)
+
+
+def _series_coefficients(coefficients, order):
+    if order not in SERIES_ORDERS:
+        raise ValueError("order must be one of %s" % (SERIES_ORDERS,))
+    return coefficients[:order]
+
+
+def _kruger_series(coefficients, zeta, cos_2zeta, sin_2zeta):
+    """ Sum a Kruger series by Clenshaw summation
+
+        Works on complex numbers or numpy complex arrays. Only cos(2 zeta) and
+        sin(2 zeta) are needed, the higher multiples come from the recurrence.
+
+        Returns:
+            series: zeta + sum of c_k sin(2k zeta)
+            derivative: 1 + sum of 2k c_k cos(2k zeta)
+    """
+    two_cos = 2 * cos_2zeta
+    b1 = b2 = 0
+    d1 = d2 = 0
+    for k in range(len(coefficients), 0, -1):
+        coefficient = coefficients[k - 1]
+        b1, b2 = coefficient + two_cos * b1 - b2, b1
+        d1, d2 = 2 * k * coefficient + two_cos * d1 - d2, d1
+    return zeta + b1 * sin_2zeta, 1 + d1 * cos_2zeta - d2
+
+
+def gauss_kruger(latitude, longitude, central_meridian, proj, codec=None, order=8):
     """ Convert lat,long to projected coordinates
+
+        Latitude, longitude and central meridian use Settings['bearing'] unless a codec is given.
+        order selects the 4th, 6th or 8th order Kruger series, see SERIES_ORDERS for the
+        accuracy of each.
     """
     # Change lat/long to decimal degrees and convert to radians
-    rlat = bearing_to_radians(latitude)
-    rlong = bearing_to_radians(longitude)
-    rcentral_meridian = bearing_to_radians(central_meridian)
-
-    a = proj.a
-    invf = proj.invf
-    m0 = proj.m0
-    false_easting = proj.false_easting
-    false_northing = proj.false_northing
-
-    # Calculate geometrical constants
-    f = 1.0/invf
-    b = a * (1-f)  # semi - minor axis
-
-    # Eccentricity
-    e2 = 2 * f - f * f  # = f*(2-f) = (a^2-b^2)/a^2
-    e = math.sqrt(e2)
-
-    # Compute 3rd flattening and powers
-    n = (a - b)/(a + b)
-    n2 = n * n
-    n3 = n * n2
-    n4 = n2 * n2
-    n5 = n3 * n2
-    n6 = n2 * n4
-    n7 = n4 * n3
-    n8 = n4 * n4
-
-    # Rectifying Radius A
-    A = (a/(1+n)) * (1+(1.0/4.0) * n2 + (1.0/64) * n4 + (1.0/256) * n6 + (25.0/16384) * n8)
+    codec = bearing_codec(codec)
+    rlat = codec.to_radians(latitude)
+    rlong = codec.to_radians(longitude)
+    rcentral_meridian = codec.to_radians(central_meridian)
+
+    c = compile_projection(proj)
+    a = c.a
+    m0 = c.m0
+    e = c.e
+    e2 = c.e2
+    A = c.A
+    alpha = _series_coefficients(c.alpha, order)
 
     # Calculate conformal latitude
     sigma = math.sinh( e*math.atanh(( e * math.tan(rlat)) / (math.sqrt( 1 + math.tan(rlat) * math.tan(rlat)))))
     conformal_lat = math.tan(rlat) * math.sqrt(1 + sigma * sigma) - sigma * \
                                                                    math.sqrt(1 + math.tan(rlat) * math.tan(rlat))
 
-    # Compute the coefficients
-    a2 = (1.0/2) * n - (2.0/3) * n2 + (5.0/16) * n3 + (41.0/180) * n4 - (127.0/288) * n5 + (7891.0/37800) * n6 +\
-         (72161.0/387072) * n7 - (18975107.0/50803200) * n8
-    a4 = (13.0/48) * n2 - (3.0/5) * n3 + (557.0/1440) * n4 + (281.0/630) * n5 - (1983433.0/1935360) * n6 + \
-         (13769.0/28800) * n7 + (148003883.0/174182400) * n8
-    a6 = (61.0/240) * n3 - (103.0/140) * n4 + (15061.0/26880) * n5 + (167603.0/181440) * n6 - \
-         (67102379.0/29030400) * n7 + (79682431.0/79833600) * n8
-    a8 = (49561.0/161280) * n4 - (179.0/168) * n5 + (6601661.0/7257600) * n6 + (97445.0/49896) * \
-                                                                               n7 - (40176129013.0/7664025600) * n8
-    a10 = (34729.0/80640)* n5-(3418889.0/1995840)* n6+(14644087.0/9123840)* n7+(2605413599.0/622702080) * n8
-    a12 = (212378941.0/319334400) * n6 - (30705481.0/10378368) * n7 + (175214326799.0/58118860800) * n8
-    a14 = (1522256789.0/1383782400) * n7 - (16759934899.0/3113510400) * n8
-    a16 = (1424729850961.0/743921418240) * n8
-
     # Find w by subtracting central meridian from longitude
     w = rlong - rcentral_meridian # Converted to radians
 
@@ -63,64 +170,177 @@ def gauss_kruger(latitude, longitude, central_meridian, proj):
     u = a * math.atan( conformal_lat/math.cos(w))
     v = a * math.asinh(math.sin(w) / (math.sqrt( conformal_lat * conformal_lat + math.cos(w) * math.cos( w))))
 
-    # Calculate partial solutions for x and y to make calcs easier
-    x1 = math.cos(2 * (u / a)) * math.sinh(2 * (v / a))
-    x2 = math.cos(4 * (u / a)) * math.sinh(4 * (v / a))
-    x3 = math.cos(6 * (u / a)) * math.sinh(6 * (v / a))
-    x4 = math.cos(8 * (u / a)) * math.sinh(8 * (v / a))
-    x5 = math.cos(10 * (u / a)) * math.sinh(10 * (v / a))
-    x6 = math.cos(12 * (u / a)) * math.sinh(12 * (v / a))
-    x7 = math.cos(14 * (u / a)) * math.sinh(14 * (v / a))
-    x8 = math.cos(16 * (u / a)) * math.sinh(16 * (v / a))
-
-    y1 = math.sin(2 * (u / a)) * math.cosh(2 * (v / a))
-    y2 = math.sin(4 * (u / a)) * math.cosh(4 * (v / a))
-    y3 = math.sin(6 * (u / a)) * math.cosh(6 * (v / a))
-    y4 = math.sin(8 * (u / a)) * math.cosh(8 * (v / a))
-    y5 = math.sin(10 * (u / a)) * math.cosh(10 * (v / a))
-    y6 = math.sin(12 * (u / a)) * math.cosh(12 * (v / a))
-    y7 = math.sin(14 * (u / a)) * math.cosh(14 * (v / a))
-    y8 = math.sin(16 * (u / a)) * math.cosh(16 * (v / a))
-
-    # Calculate partial solutions for q and p to make calcs easier
-    q1 = math.sin(2 * (u / a)) * math.sinh(2 * (v / a))
-    q2 = math.sin(4 * (u / a)) * math.sinh(4 * (v / a))
-    q3 = math.sin(6 * (u / a)) * math.sinh(6 * (v / a))
-    q4 = math.sin(8 * (u / a)) * math.sinh(8 * (v / a))
-    q5 = math.sin(10 * (u / a)) * math.sinh(10 * (v / a))
-    q6 = math.sin(12 * (u / a)) * math.sinh(12 * (v / a))
-    q7 = math.sin(14 * (u / a)) * math.sinh(14 * (v / a))
-    q8 = math.sin(16 * (u / a)) * math.sinh(16 * (v / a))
-
-    p1 = math.cos(2 * (u / a)) * math.cosh(2 * (v / a))
-    p2 = math.cos(4 * (u / a)) * math.cosh(4 * (v / a))
-    p3 = math.cos(6 * (u / a)) * math.cosh(6 * (v / a))
-    p4 = math.cos(8 * (u / a)) * math.cosh(8 * (v / a))
-    p5 = math.cos(10 * (u / a)) * math.cosh(10 * (v / a))
-    p6 = math.cos(12 * (u / a)) * math.cosh(12 * (v / a))
-    p7 = math.cos(14 * (u / a)) * math.cosh(14 * (v / a))
-    p8 = math.cos(16 * (u / a)) * math.cosh(16 * (v / a))
-
-    # Calculate q and p for calculating point scale factor
-    q = - (2 * a2 * q1 + 4 * a4 * q2 + 6* a6* q3 + 8 * a8 * q4 +
-           10 * a10 * q5 + 12 * a12 * q6 + 14 * a14 * q7 + 16 * a16 * q8)
-    p = 1 + (2 * a2 * p1 + 4 * a4 * p2 + 6 * a6 * p3 + 8 * a8 *
-             p4 + 10 * a10 * p5 + 12 * a12 * p6 + 14 * a14 * p7 + 16 * a16 * p8)
+    # Sum the series for Y + iX and its derivative p + iq on the complex gauss-Schreiber coordinate
+    zeta = complex(u / a, v / a)
+    (series, derivative) = _kruger_series(alpha, zeta, cmath.cos(2 * zeta), cmath.sin(2 * zeta))
+    q = derivative.imag
+    p = derivative.real
 
     # Calculate point scale factor m
     m = m0 * (A / a)*math.sqrt(q * q + p * p) * (math.sqrt(1+(math.tan(rlat)*math.tan(rlat))) *
         math.sqrt(1 - e2*(math.sin(rlat)*math.sin(rlat))))/\
         math.sqrt(conformal_lat * conformal_lat+math.cos(w)*math.cos(w))
 
-    grid_conv = math.atan(q / p)+math.atan((conformal_lat*math.tan(w))/math.sqrt(1 + conformal_lat * conformal_lat))*\
+    # Calculate grid convergence, the grid bearing of true north
+    grid_conv = (math.atan(q / p)-math.atan((conformal_lat*math.tan(w))/math.sqrt(1 + conformal_lat * conformal_lat)))*\
                 180/math.pi
 
     # Calculate coordinates
-    X = A*((v / a) + a2 * x1 + a4 * x2 + a6 * x3 + a8 * x4 + a10 * x5 + a12 * x6 + a14 * x7 + a16 * x8)
-    Y = A*((u / a) + a2 * y1 + a4 * y2 + a6 * y3 + a8 * y4 + a10 * y5 + a12 * y6 + a14 * y7 + a16 * y8)
+    X = A * series.imag
+    Y = A * series.real
+
+    # Calculate scaled coordinates with false easting and northing
+    easting = c.false_easting + m0 * X
+    northing = c.false_northing + m0 * Y
+
+    return easting, northing, m, grid_conv
+
+
+def gauss_kruger_array(latitude, longitude, central_meridian, proj, codec=None, order=8):
+    """ Convert arrays of lat,long to projected coordinates
+
+        Vectorised form of gauss_kruger. Every latitude/longitude dependent term is
+        evaluated on whole arrays, so millions of points can be projected without a
+        Python level loop.
+
+        Args:
+            latitude (array like): latitudes in the Settings['bearing'] convention
+            longitude (array like): longitudes in the Settings['bearing'] convention
+            central_meridian (array like or float): central meridian of each point
+            proj (Projection or CompiledProjection class): projection definition
+            codec: bearing codec for the angles, defaults to Settings['bearing']
+            order (int): order of the Kruger series, 4, 6 or 8 (see SERIES_ORDERS)
+
+        Returns:
+            easting: array of eastings
+            northing: array of northings
+            m: array of point scale factors
+            grid_conv: array of grid convergences in decimal degrees
+    """
+    # Change lat/long to decimal degrees and convert to radians
+    codec = bearing_codec(codec)
+    rlat = codec.to_radians_array(latitude)
+    rlong = codec.to_radians_array(longitude)
+    rcentral_meridian = codec.to_radians_array(central_meridian)
+
+    c = compile_projection(proj)
+    a = c.a
+    m0 = c.m0
+    e = c.e
+    e2 = c.e2
+    A = c.A
+    alpha = _series_coefficients(c.alpha, order)
+
+    # Calculate conformal latitude
+    tan_lat = np.tan(rlat)
+    sec_lat = np.sqrt(1 + tan_lat * tan_lat)
+    sigma = np.sinh(e * np.arctanh((e * tan_lat) / sec_lat))
+    conformal_lat = tan_lat * np.sqrt(1 + sigma * sigma) - sigma * sec_lat
+
+    # Find w by subtracting central meridian from longitude
+    w = rlong - rcentral_meridian
+    cos_w = np.cos(w)
+
+    # Compute the gauss-Schreiber coordinates, already divided by a
+    u = np.arctan(conformal_lat / cos_w)
+    v = np.arcsinh(np.sin(w) / np.sqrt(conformal_lat * conformal_lat + cos_w * cos_w))
+
+    # Sum the series for Y + iX and its derivative p + iq on the complex gauss-Schreiber coordinate
+    zeta = u + 1j * v
+    (series, derivative) = _kruger_series(alpha, zeta, np.cos(2 * zeta), np.sin(2 * zeta))
+    X = A * series.imag
+    Y = A * series.real
+    q = derivative.imag
+    p = derivative.real
+
+    # Calculate point scale factor m
+    m = m0 * (A / a) * np.sqrt(q * q + p * p) * (sec_lat * np.sqrt(1 - e2 * np.sin(rlat) ** 2)) / \
+        np.sqrt(conformal_lat * conformal_lat + cos_w * cos_w)
+
+    # Calculate grid convergence, the grid bearing of true north
+    grid_conv = np.degrees(np.arctan(q / p) -
+                           np.arctan((conformal_lat * np.tan(w)) / np.sqrt(1 + conformal_lat * conformal_lat)))
 
     # Calculate scaled coordinates with false easting and northing
-    easting = false_easting + m0 * X
-    northing = false_northing + m0 * Y
+    easting = c.false_easting + m0 * X
+    northing = c.false_northing + m0 * Y
 
     return easting, northing, m, grid_conv
+
+
+def gauss_kruger_inverse_array(easting, northing, central_meridian, proj, tolerance=1e-12, max_iterations=10,
+                               codec=None, order=8):
+    """ Convert arrays of projected coordinates to lat,long
+
+        Inverse of gauss_kruger_array using the same Projection parameters and the
+        Kruger series of the given order. The conformal latitude is converted back to latitude
+        by Newton iteration on every point at once.
+
+        Args:
+            easting (array like): eastings
+            northing (array like): northings
+            central_meridian (array like or float): central meridian of each point
+                in the Settings['bearing'] convention
+            proj (Projection or CompiledProjection class): projection definition
+            tolerance (float): convergence limit for tan(latitude)
+            max_iterations (int): maximum number of Newton iterations
+            codec: bearing codec for the angles, defaults to Settings['bearing']
+            order (int): order of the Kruger series, 4, 6 or 8 (see SERIES_ORDERS)
+
+        Returns:
+            latitude: array of latitudes in the Settings['bearing'] convention
+            longitude: array of longitudes in the Settings['bearing'] convention
+            m: array of point scale factors
+            grid_conv: array of grid convergences in decimal degrees
+    """
+    codec = bearing_codec(codec)
+    c = compile_projection(proj)
+    e = c.e
+    e2 = c.e2
+    beta = [-coefficient for coefficient in _series_coefficients(c.beta, order)]
+
+    # Remove the false origin and central scale factor and normalise by A
+    xi = (np.asarray(northing, dtype=np.float64) - c.false_northing) / (c.m0 * c.A)
+    eta = (np.asarray(easting, dtype=np.float64) - c.false_easting) / (c.m0 * c.A)
+
+    # Sum the inverse series for the gauss-Schreiber coordinates and its derivative p + iq
+    zeta = xi + 1j * eta
+    (series, derivative) = _kruger_series(beta, zeta, np.cos(2 * zeta), np.sin(2 * zeta))
+    xi_gs = series.real
+    eta_gs = series.imag
+    q = derivative.imag
+    p = derivative.real
+
+    # Conformal latitude and longitude difference from the central meridian
+    cos_xi_gs = np.cos(xi_gs)
+    sinh_eta_gs = np.sinh(eta_gs)
+    conformal_lat = np.sin(xi_gs) / np.sqrt(sinh_eta_gs * sinh_eta_gs + cos_xi_gs * cos_xi_gs)
+    w = np.arctan2(sinh_eta_gs, cos_xi_gs)
+
+    # Newton iteration for tan(latitude) starting from the conformal latitude
+    tan_lat = conformal_lat.copy()
+    for i in range(max_iterations):
+        sec_lat = np.sqrt(1 + tan_lat * tan_lat)
+        sigma = np.sinh(e * np.arctanh((e * tan_lat) / sec_lat))
+        conformal_i = tan_lat * np.sqrt(1 + sigma * sigma) - sigma * sec_lat
+
+        delta = (conformal_lat - conformal_i) / np.sqrt(1 + conformal_i * conformal_i) * \
+            (1 + (1 - e2) * tan_lat * tan_lat) / ((1 - e2) * sec_lat)
+        tan_lat += delta
+        if np.all(np.abs(delta) < tolerance):
+            break
+
+    rlat = np.arctan(tan_lat)
+    rlong = codec.to_radians_array(central_meridian) + w
+
+    # Calculate point scale factor m
+    sec_lat = np.sqrt(1 + tan_lat * tan_lat)
+    m = c.m0 * (c.A / c.a) / np.sqrt(q * q + p * p) * (sec_lat * np.sqrt(1 - e2 * np.sin(rlat) ** 2)) / \
+        np.sqrt(conformal_lat * conformal_lat + np.cos(w) ** 2)
+
+    # Calculate grid convergence, the grid bearing of true north. The derivative of the
+    # inverse series is the reciprocal of the forward one, so its argument changes sign
+    grid_conv = -np.degrees(np.arctan(q / p) +
+                            np.arctan(conformal_lat * np.tan(w) / np.sqrt(1 + conformal_lat * conformal_lat)))
+
+    return codec.from_radians_array(rlat), codec.from_radians_array(rlong), m, grid_conv
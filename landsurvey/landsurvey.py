@@ -1,14 +1,425 @@
 # -*- coding: utf-8 -*-
 """
+Command line batch processor, installed as the landsurvey command.
+
+The input is read, processed and written a chunk at a time, so files of any size are
+processed in constant memory. Input is a CSV file, or - for standard input, and the
+point operations also read point files (see pointfile.py). Output is CSV, written to
+a file or - for standard output. Blank lines and lines starting with # are skipped,
+and angles use the --bearing convention except zenith angles, which are always dd.mmss.
+
+    landsurvey project POINTS OUTPUT --central-meridian 147
+        Project geographic points. Input rows are code,longitude,latitude[,height]
+        (x is the longitude and y the latitude of point files), output rows are
+        code,easting,northing[,height],m,grid_conv.
+
+    landsurvey join POINTS OUTPUT [--station x,y]
+        Bearing and distance to every point from the station, or from the previous
+        point without one. Input rows are code,x,y[,z], output rows code,bearing,distance.
+
+    landsurvey radiate OBSERVATIONS OUTPUT --station x,y,z --hi 1.5
+        Coordinates of observations from a station. Input rows are
+        code,bearing,slope_distance,zenith_angle,ht, output rows code,x,y,z. With
+        --field-file the input is a field file (see fieldfile.py) instead.
+
+    landsurvey reduce-levels LEGS OUTPUT --start-level 100 [--end-level 100.5]
+        Adjusted reduced levels of a trigonometric height run. Input rows are
+        code,hi,slope_distance,zenith_angle,ht, output rows code,level. The misclose
+        is found in a first pass over the file, so the input can not be standard input.
+
+Progress and throughput are written to standard error unless --quiet is given.
+
 Created on Thu Mar 31 12:45:30 2016
 
 @author: derek.carter
 """
-import math 
- 
+import argparse
+import itertools
+import os
+import sys
+import timeit
+import numpy as np
+from .conversion import bearing_codec, Settings
+from .classes import Projection, Point2d, Point3d, PointArray
+from .calc import join2d, rad3d_batch
+from .geo import gauss_kruger_array
+from .levelling import reduce_level_run
+from .fieldfile import reduce_field_file
+from .pointfile import open_point_file, _MAGIC
+
+GDA94 = Projection(6378137.0, 298.257222101, 0.9996, 500000.0, 10000000.0)
+
+COORDINATE = '%.4f'
+ANGLE = '%.8f'
+
+
+class Progress:
+    """ Points processed, throughput and percentage of the input read, on standard error
+
+        Args:
+            total: size of the input, in the units of the positions passed to update, or None
+            quiet (bool): show nothing
+            stream: file to write to, defaults to sys.stderr
+            interval (float): seconds between updates of the readout
+    """
+    def __init__(self, total=None, quiet=False, stream=None, interval=0.5):
+        self.total = total
+        self.quiet = quiet
+        self.stream = sys.stderr if stream is None else stream
+        self.interval = interval
+        self.points = 0
+        self.start = self.shown = timeit.default_timer()
+
+    def update(self, points, position=None):
+        self.points += points
+        now = timeit.default_timer()
+        if not self.quiet and now - self.shown >= self.interval:
+            self.shown = now
+            self._show(now, position)
+
+    def finish(self):
+        if not self.quiet:
+            self._show(timeit.default_timer(), self.total)
+            self.stream.write('\n')
+            self.stream.flush()
+
+    def _show(self, now, position):
+        rate = self.points / max(now - self.start, 1e-9)
+        line = '\r%d points  %.4g points/s' % (self.points, rate)
+        if self.total and position is not None:
+            line += '  %5.1f%%' % min(100.0, 100.0 * position / self.total)
+        self.stream.write(line)
+        self.stream.flush()
+
+
+class _Lines:
+    """ The lines of a text input, counting the characters read for the progress
+    """
+    def __init__(self, path):
+        self.f = sys.stdin if path == '-' else open(path)
+        self.total = None if path == '-' else os.path.getsize(path)
+        self.position = 0
+
+    def __iter__(self):
+        for line in self.f:
+            self.position += len(line)
+            yield line
+
+    def read(self, count):
+        """ The next count lines, or fewer at the end of the input
+        """
+        lines = list(itertools.islice(self.f, count))
+        self.position += sum(map(len, lines))
+        return lines
+
+    def close(self):
+        if self.f is not sys.stdin:
+            self.f.close()
+
+
+def _is_point_file(path):
+    if path == '-':
+        return False
+    with open(path, 'rb') as f:
+        return f.read(len(_MAGIC)) == _MAGIC
+
+
+def _bad_line(lines, line_number, counts):
+    """ Raise ValueError for the first line of a block with the wrong number of fields
+    """
+    for i, line in enumerate(lines, line_number + 1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            found = line.count(',') + 1
+            if found not in counts:
+                raise ValueError("line %d: expected %s fields, found %d" %
+                                 (i, ' or '.join(str(count) for count in counts), found))
+            counts = (found,)
+
+
+def _csv_chunks(lines, chunk_size, counts, header=False):
+    """ Columns of the rows of a CSV input, read chunk_size lines at a time
+
+        The lines of a chunk are joined and split once, rather than line by line.
+
+        Args:
+            lines (_Lines class): the input
+            chunk_size (int): lines read at a time
+            counts (tuple): allowed numbers of fields in a row, every row must have as many
+                fields as the first
+            header (bool): skip the first line
+
+        Returns:
+            generator of lists of columns, each a list of the text fields
+    """
+    line_number = 0
+    if header:
+        line_number += len(lines.read(1))
+    while True:
+        block = lines.read(chunk_size)
+        rows = [line.strip() for line in block]
+        rows = [row for row in rows if row and not row.startswith('#')]
+        if rows:
+            commas = [row.count(',') for row in rows]
+            width = commas[0] + 1
+            if width not in counts or min(commas) != max(commas):
+                _bad_line(block, line_number, counts)
+            counts = (width,)
+
+            text = ','.join(rows)
+            fields = text.split(',')
+            if ' ' in text or '\t' in text:
+                fields = [field.strip() for field in fields]
+            yield [fields[i::width] for i in range(width)]
+        line_number += len(block)
+        if len(block) < chunk_size:
+            return
+
+
+def _codes(column):
+    return np.array(column, dtype=object)
+
+
+def _floats(column):
+    return np.array(column, dtype=np.float64)
+
+
+def _point_chunks(args, progress):
+    """ PointArray chunks of a CSV of code,x,y[,z] rows or of a point file
+    """
+    if _is_point_file(args.input):
+        points = open_point_file(args.input)
+        progress.total = len(points)
+        for start in range(0, len(points), args.chunk_size):
+            stop = min(start + args.chunk_size, len(points))
+            yield points[start:stop], stop
+        return
+
+    lines = _Lines(args.input)
+    progress.total = lines.total
+    try:
+        for columns in _csv_chunks(lines, args.chunk_size, (3, 4), args.header):
+            z = _floats(columns[3]) if len(columns) > 3 else None
+            yield PointArray(_floats(columns[1]), _floats(columns[2]), z, _codes(columns[0])), lines.position
+    finally:
+        lines.close()
+
+
+def _write(out, formats, *columns):
+    """ Write columns as CSV rows, with empty fields for codes of None
+    """
+    values = []
+    for fmt, column in zip(formats, columns):
+        column = list(column) if fmt == '%s' else np.asarray(column).tolist()
+        if fmt == '%s' and None in column:
+            column = ['' if code is None else code for code in column]
+        values.append(column)
+    if values and len(values[0]):
+        out.write('\n'.join(map((','.join(formats)).__mod__, zip(*values))) + '\n')
+
+
+def _angle_format(values):
+    return '%s' if np.asarray(values).dtype == object else ANGLE
+
+
+def _code_column(points):
+    return [None] * len(points) if points.code is None else points.code
+
+
+def _project(args, codec, out, progress):
+    proj = GDA94 if args.projection is None else Projection(*args.projection)
+    for points, position in _point_chunks(args, progress):
+        (easting, northing, m, grid_conv) = gauss_kruger_array(points.y, points.x, args.central_meridian, proj,
+                                                               codec)
+        if points.z is None:
+            _write(out, ('%s', COORDINATE, COORDINATE, '%.10f', ANGLE), _code_column(points), easting, northing,
+                   m, grid_conv)
+        else:
+            _write(out, ('%s', COORDINATE, COORDINATE, COORDINATE, '%.10f', ANGLE), _code_column(points),
+                   easting, northing, points.z, m, grid_conv)
+        progress.update(len(points), position)
+
+
+def _join(args, codec, out, progress):
+    previous = None
+    for points, position in _point_chunks(args, progress):
+        codes = _code_column(points)
+        if args.station is not None:
+            start = Point2d(args.station[0], args.station[1])
+        elif previous is None:
+            # the first point has no previous point to join from
+            start = PointArray(points.x[:-1], points.y[:-1])
+            previous = (points.x[-1], points.y[-1])
+            points = PointArray(points.x[1:], points.y[1:])
+            codes = codes[1:]
+        else:
+            start = PointArray(np.append(previous[0], points.x[:-1]), np.append(previous[1], points.y[:-1]))
+            previous = (points.x[-1], points.y[-1])
+
+        (distance, bearing) = join2d(start, points, codec)
+        _write(out, ('%s', _angle_format(bearing), COORDINATE), codes, bearing, distance)
+        progress.update(len(points), position)
+
+
+def _radiate(args, codec, out, progress):
+    lines = _Lines(args.input)
+    progress.total = lines.total
+    try:
+        if args.field_file:
+            for setup, points in reduce_field_file(lines, args.chunk_size, codec):
+                _write(out, ('%s', COORDINATE, COORDINATE, COORDINATE), points.code, points.x, points.y, points.z)
+                progress.update(len(points), lines.position)
+            return
+
+        if args.station is None or len(args.station) != 3 or args.hi is None:
+            raise ValueError("radiate needs --station x,y,z and --hi, or --field-file")
+        station = Point3d(*args.station)
+        for columns in _csv_chunks(lines, args.chunk_size, (5,), args.header):
+            (x, y, z) = rad3d_batch(station, codec.parse_array(columns[1]), _floats(columns[2]),
+                                    _floats(columns[3]), args.hi, _floats(columns[4]), codec)
+            _write(out, ('%s', COORDINATE, COORDINATE, COORDINATE), columns[0], x, y, z)
+            progress.update(len(x), lines.position)
+    finally:
+        lines.close()
+
+
+def _leg_chunks(args):
+    """ (codes, hi, slope distances, zenith angles, ht) of every chunk of legs
+    """
+    lines = _Lines(args.input)
+    try:
+        for columns in _csv_chunks(lines, args.chunk_size, (5,), args.header):
+            yield (columns[0],) + tuple(_floats(column) for column in columns[1:]), lines.position
+    finally:
+        lines.close()
+
+
+def _reduce_levels(args, codec, out, progress):
+    if args.input == '-':
+        raise ValueError("reduce-levels reads its input twice, so can not read standard input")
+
+    # First pass for the misclose, length and number of legs of the run. A run reduced
+    # from 0 which closes on 0 has a misclose of its total rise.
+    rise = length = 0.0
+    legs = 0
+    for legs_chunk, position in _leg_chunks(args):
+        (levels, chunk_rise, chunk_length) = reduce_level_run(0.0, *legs_chunk[1:])
+        rise += chunk_rise
+        length += chunk_length
+        legs += len(levels)
+    end_level = args.start_level if args.end_level is None else args.end_level
+    misclose = args.start_level + rise - end_level
+
+    # Second pass. Each chunk is adjusted onto its share of the run's correction at its
+    # last leg, which distributes the misclose linearly, as for the whole run.
+    progress.total = os.path.getsize(args.input)
+    raw = level = args.start_level
+    travelled = 0.0
+    done = 0
+    for legs_chunk, position in _leg_chunks(args):
+        (levels, chunk_rise, chunk_length) = reduce_level_run(0.0, *legs_chunk[1:])
+        travelled += chunk_length
+        done += len(levels)
+        raw += chunk_rise
+        if args.method == 'distance':
+            fraction = travelled / length if length > 0 else 0.0
+        else:
+            fraction = done / float(legs)
+
+        (levels, chunk_misclose, chunk_length) = reduce_level_run(level, *legs_chunk[1:],
+                                                                  end_level=raw - fraction * misclose,
+                                                                  method=args.method)
+        level = levels[-1]
+        _write(out, ('%s', COORDINATE), legs_chunk[0], levels)
+        progress.update(len(levels), position)
+
+    if not args.quiet:
+        sys.stderr.write('misclose %.4f over %.3f (%d legs)\n' % (misclose, length, legs))
+
+
+def _numbers(text):
+    return [float(value) for value in text.split(',')]
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='landsurvey', description='Stream survey data through a calculation a '
+                                                                    'chunk at a time.')
+    commands = parser.add_subparsers(dest='command')
+
+    def command(name, function, help, columns):
+        sub = commands.add_parser(name, help=help, description='%s. %s' % (help.capitalize(), columns))
+        sub.set_defaults(function=function)
+        sub.add_argument('input', help='input CSV file, or - for standard input')
+        sub.add_argument('output', help='output CSV file, or - for standard output')
+        sub.add_argument('--chunk-size', type=int, default=100000, help='rows processed at a time (default 100000)')
+        sub.add_argument('--bearing', type=int, choices=[1, 2, 3, 4],
+                         help='bearing convention, as Settings[\'bearing\'] (default %d)' % Settings['bearing'])
+        sub.add_argument('--header', action='store_true', help='skip the first line of the input')
+        sub.add_argument('--quiet', action='store_true', help='no progress readout')
+        return sub
+
+    sub = command('project', _project, 'project geographic points to grid coordinates',
+                  'Input rows are code,longitude,latitude[,height] or a point file, output rows are '
+                  'code,easting,northing[,height],m,grid_conv.')
+    sub.add_argument('--central-meridian', type=float, required=True, help='central meridian of the zone')
+    sub.add_argument('--projection', type=_numbers, help='a,invf,m0,false_easting,false_northing (default GDA94 '
+                                                         'MGA)')
+
+    sub = command('join', _join, 'bearing and distance to every point',
+                  'Input rows are code,x,y[,z] or a point file, output rows are code,bearing,distance.')
+    sub.add_argument('--station', type=_numbers, help='x,y to join from, instead of the previous point')
+
+    sub = command('radiate', _radiate, 'coordinates of observations from a station',
+                  'Input rows are code,bearing,slope_distance,zenith_angle,ht, or a field file, output rows '
+                  'are code,x,y,z.')
+    sub.add_argument('--station', type=_numbers, help='x,y,z of the station')
+    sub.add_argument('--hi', type=float, help='height of instrument')
+    sub.add_argument('--field-file', action='store_true', help='the input is a field file')
+
+    sub = command('reduce-levels', _reduce_levels, 'adjusted reduced levels of a height run',
+                  'Input rows are code,hi,slope_distance,zenith_angle,ht, output rows are code,level.')
+    sub.add_argument('--start-level', type=float, required=True, help='reduced level at the start')
+    sub.add_argument('--end-level', type=float, help='known reduced level at the end (default the start level)')
+    sub.add_argument('--method', choices=['distance', 'setups'], default='distance',
+                     help='distribute the misclose by distance or setups (default distance)')
+    return parser
+
+
+def main(argv=None):
+    """ Run the landsurvey command
 
+        Args:
+            argv (list): command line arguments, defaults to sys.argv[1:]
 
+        Returns:
+            int: exit status
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'function', None) is None:
+        parser.error('a command is required')
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be at least 1')
 
+    codec = bearing_codec(args.bearing)
+    progress = Progress(quiet=args.quiet)
+    out = None
+    try:
+        out = sys.stdout if args.output == '-' else open(args.output, 'w')
+        args.function(args, codec, out, progress)
+    except (IOError, OSError, ValueError) as err:
+        sys.stderr.write('landsurvey: error: %s\n' % err)
+        if out is not None and out is not sys.stdout:
+            # do not leave an empty or partly written output behind
+            out.close()
+            os.remove(args.output)
+        return 1
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+    progress.finish()
+    return 0
 
 
-    
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Reduction and adjustment of trigonometric height runs.
+
+Each leg of a run is observed forward, from the instrument over a point of known level
+to a target on the next point, so the rise of the leg is
+
+    hi + slope_distance * cos(zenith_angle) - ht
+
+as for the z of rad3d. This is the opposite sign to calc.reduced_level, which has the
+instrument over the unknown point and the target on the known point, and so gives
+rla - (hi + slope_distance * cos(zenith_angle) - ht). The same observations give
+levels mirrored about the start level in the two. reduced_level reduces a leg of a run
+backwards: reduced_level(levels[i], hi[i], sd[i], za[i], ht[i]) is levels[i - 1].
+"""
+import numpy as np
+from .conversion import dms2dec_array
+
+
+def reduce_level_runs(start_levels, heights_instrument, slope_distances, zenith_angles, heights_target, offsets,
+                      end_levels=None, method='distance'):
+    """ Reduce and adjust a batch of independent trigonometric height runs in one call
+
+        Each leg is observed from the instrument over one point to a target on the
+        next, so the rise of the leg is hi + slope_distance * cos(zenith_angle) - ht
+        and the reduced levels along a run are its start level plus the cumulative
+        sum of the rises. The legs of every run are stored one after the other and
+        offsets gives the index of the first leg of each run. The misclose on the
+        known end level is distributed in proportion to the horizontal distance
+        travelled or equally over the setups.
+
+        Args:
+            start_levels (array like or float): reduced level at the start of each run
+            heights_instrument (array like or float): height of instrument of every leg
+            slope_distances (array like): slope distance of every leg
+            zenith_angles (array like): zenith angle of every leg in degrees, minutes, seconds (dd.mmss)
+            heights_target (array like or float): height of target of every leg
+            offsets (array like): index of the first leg of each run
+            end_levels (array like or float): known reduced level at the end of each run, or
+                None for runs which close back on their start level
+            method (str): 'distance' or 'setups'
+
+        Returns:
+            levels: adjusted reduced level at the end of every leg
+            misclose: misclose (computed - known end level) of each run
+            length: horizontal length of each run
+    """
+    if method not in ('distance', 'setups'):
+        raise ValueError("method must be 'distance' or 'setups'")
+
+    slope_distances = np.asarray(slope_distances, dtype=np.float64)
+    zenith_angles = np.radians(dms2dec_array(zenith_angles))
+    offsets = np.asarray(offsets, dtype=np.intp)
+    nruns = len(offsets)
+
+    # Number of legs in each run
+    counts = np.diff(np.append(offsets, len(slope_distances)))
+    if np.any(counts < 1):
+        raise ValueError("every run must have at least one leg")
+
+    start_levels = np.broadcast_to(np.asarray(start_levels, dtype=np.float64), (nruns,))
+    if end_levels is None:
+        end_levels = start_levels
+    end_levels = np.broadcast_to(np.asarray(end_levels, dtype=np.float64), (nruns,))
+
+    # Rise and horizontal distance of every leg
+    rises = np.asarray(heights_instrument, dtype=np.float64) + slope_distances * np.cos(zenith_angles) - \
+        np.asarray(heights_target, dtype=np.float64)
+    distances = slope_distances * np.sin(zenith_angles)
+
+    # Cumulative levels within each run in one pass
+    levels = np.cumsum(rises)
+    before = np.concatenate(([0.0], levels))[offsets]
+    levels += np.repeat(start_levels - before, counts)
+
+    misclose = levels[np.append(offsets[1:], len(levels)) - 1] - end_levels
+    length = np.add.reduceat(distances, offsets)
+
+    # Fraction of the misclose removed at the end of every leg
+    if method == 'distance':
+        travelled = np.cumsum(distances)
+        travelled -= np.repeat(np.concatenate(([0.0], travelled))[offsets], counts)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.nan_to_num(travelled / np.repeat(length, counts))
+    else:
+        setups = np.arange(1, len(levels) + 1) - np.repeat(offsets, counts)
+        fraction = setups / np.repeat(counts, counts).astype(np.float64)
+
+    levels -= fraction * np.repeat(misclose, counts)
+    return levels, misclose, length
+
+
+def reduce_level_run(start_level, heights_instrument, slope_distances, zenith_angles, heights_target,
+                     end_level=None, method='distance'):
+    """ Reduce and adjust a single trigonometric height run
+
+        Args:
+            start_level (float): reduced level at the start of the run
+            heights_instrument (array like or float): height of instrument of every leg
+            slope_distances (array like): slope distance of every leg
+            zenith_angles (array like): zenith angle of every leg in degrees, minutes, seconds (dd.mmss)
+            heights_target (array like or float): height of target of every leg
+            end_level (float): known reduced level at the end, or None if the run closes on its start
+            method (str): 'distance' or 'setups'
+
+        Returns:
+            levels: adjusted reduced level at the end of every leg
+            misclose: misclose (computed - known end level)
+            length: horizontal length of the run
+    """
+    levels, misclose, length = reduce_level_runs(start_level, heights_instrument, slope_distances, zenith_angles,
+                                                 heights_target, [0], end_level, method)
+    return levels, misclose[0], length[0]
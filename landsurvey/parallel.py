@@ -0,0 +1,112 @@
+"""
+Parallel projection of very large coordinate arrays.
+
+The latitudes and longitudes are copied once into shared memory (multiprocessing
+RawArray) which the worker processes map with numpy, so chunks are passed to the
+workers as (start, stop) index pairs rather than pickled arrays. Each worker
+projects its chunks with gauss_kruger_array and writes the results straight into
+shared output arrays at the same positions, so the output is in the input order
+however the chunks are scheduled.
+"""
+import multiprocessing
+import numpy as np
+from .conversion import bearing_codec
+from .geo import gauss_kruger_array, compile_projection
+
+_OUTPUTS = ('easting', 'northing', 'm', 'grid_conv')
+
+# Shared arrays and projection parameters of the current worker process
+_worker = {}
+
+
+def _shared_array(values):
+    """ Copy values into a new shared float64 RawArray
+    """
+    shared = multiprocessing.RawArray('d', len(values))
+    np.frombuffer(shared, dtype=np.float64)[:] = values
+    return shared
+
+
+def _init_worker(arrays, central_meridian, proj, codec, order):
+    _worker.clear()
+    _worker.update((name, np.frombuffer(shared, dtype=np.float64)) for name, shared in arrays.items())
+    _worker['central_meridian'] = central_meridian
+    _worker['proj'] = proj
+    _worker['codec'] = codec
+    _worker['order'] = order
+
+
+def _project_chunk(bounds):
+    """ Project one chunk of the shared input into the shared output
+    """
+    start, stop = bounds
+    central_meridian = _worker['central_meridian']
+    if central_meridian is None:
+        central_meridian = _worker['central_meridians'][start:stop]
+
+    results = gauss_kruger_array(_worker['latitude'][start:stop], _worker['longitude'][start:stop],
+                                 central_meridian, _worker['proj'], _worker['codec'], _worker['order'])
+    for name, values in zip(_OUTPUTS, results):
+        _worker[name][start:stop] = values
+    return stop - start
+
+
+def gauss_kruger_parallel(latitude, longitude, central_meridian, proj, workers=None, chunk_size=1000000,
+                          codec=None, order=8):
+    """ Convert arrays of lat,long to projected coordinates using a pool of processes
+
+        Gives the same results as gauss_kruger_array, bit for bit, in the same order.
+
+        Args:
+            latitude (array like): latitudes in the Settings['bearing'] convention
+            longitude (array like): longitudes in the Settings['bearing'] convention
+            central_meridian (array like or float): central meridian of each point
+            proj (Projection or CompiledProjection class): projection definition
+            workers (int): number of worker processes, defaults to the number of cpus
+            chunk_size (int): number of points projected by a worker at a time
+            codec: bearing codec for the angles, defaults to Settings['bearing']
+            order (int): order of the Kruger series, 4, 6 or 8
+
+        Returns:
+            easting: array of eastings
+            northing: array of northings
+            m: array of point scale factors
+            grid_conv: array of grid convergences in decimal degrees
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    # Resolve the codec here as a thread bound codec is not seen by the workers
+    codec = bearing_codec(codec)
+    proj = compile_projection(proj)
+    latitude = np.asarray(latitude, dtype=np.float64).ravel()
+    longitude = np.asarray(longitude, dtype=np.float64).ravel()
+    n = len(latitude)
+
+    if workers <= 1 or n <= chunk_size:
+        return gauss_kruger_array(latitude, longitude, central_meridian, proj, codec, order)
+
+    arrays = {'latitude': _shared_array(latitude), 'longitude': _shared_array(longitude)}
+    if np.ndim(central_meridian) > 0:
+        arrays['central_meridians'] = _shared_array(np.broadcast_to(np.asarray(central_meridian,
+                                                                               dtype=np.float64), (n,)))
+        central_meridian = None
+    for name in _OUTPUTS:
+        arrays[name] = multiprocessing.RawArray('d', n)
+
+    chunks = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+    pool = multiprocessing.Pool(min(workers, len(chunks)), _init_worker,
+                                (arrays, central_meridian, proj, codec, order))
+    try:
+        for count in pool.imap_unordered(_project_chunk, chunks):
+            pass
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    return tuple(np.frombuffer(arrays[name], dtype=np.float64) for name in _OUTPUTS)
@@ -0,0 +1,184 @@
+"""
+Compact binary point file opened by memory mapping.
+
+Job points stored as CSV have to be parsed every time a script starts. A point file
+holds the same points as fixed width binary columns, so it is opened with
+np.memmap and only the pages which are actually used are read from disk.
+
+The file is little endian:
+
+    header (128 bytes)
+        magic b'LSPT', format version (uint16), number of points (uint64),
+        has z (uint8), code width in bytes (uint16), bearing convention
+        (Settings['bearing'] code, uint8), has projection (uint8), then the
+        projection a, invf, m0, false easting and false northing (float64)
+    x column (float64 per point)
+    y column (float64 per point)
+    z column (float64 per point), if the points are 3d
+    code column (utf-8, code width bytes per point, padded with nulls), if the
+        points have codes. An empty code is read back as None.
+"""
+import struct
+import numpy as np
+from .conversion import bearing_codec, _codecs
+from .classes import Projection, Point2d, Point3d, PointArray
+
+_MAGIC = b'LSPT'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHQBHBB5d')
+_HEADER_SIZE = 128
+
+
+def _encode(code):
+    if code is None:
+        return b''
+    if isinstance(code, bytes):
+        return code
+    return type(u'')(code).encode('utf-8')
+
+
+def _decode(values):
+    """ Object array of codes from fixed width bytes, with None for empty codes
+    """
+    if bytes is str:
+        return np.array([value or None for value in values.tolist()], dtype=object)
+    return np.array([value.decode('utf-8') or None for value in values.tolist()], dtype=object)
+
+
+class PointFile:
+    """ A point file opened by memory mapping
+
+        x, y and z are read only np.memmap columns so they can be passed straight to
+        the calc and geo functions, and slicing or indexing reads only the points
+        asked for. The code column is only decoded when code is used.
+
+        Attributes:
+            x: memory mapped x column
+            y: memory mapped y column
+            z: memory mapped z column, or None for 2d points
+            projection (Projection class): projection of the points, or None
+            codec: bearing codec of the job, from the Settings['bearing'] convention stored in the file
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER_SIZE)
+        if len(header) < _HEADER_SIZE:
+            raise ValueError("%s is not a point file" % path)
+
+        (magic, version, count, has_z, code_width, convention, has_projection,
+         a, invf, m0, false_easting, false_northing) = _HEADER.unpack(header[:_HEADER.size])
+        if magic != _MAGIC:
+            raise ValueError("%s is not a point file" % path)
+        if version != _VERSION:
+            raise ValueError("unsupported point file version %d" % version)
+
+        self.path = path
+        self.codec = bearing_codec(convention)
+        self.projection = Projection(a, invf, m0, false_easting, false_northing) if has_projection else None
+        self._count = count
+
+        offset = _HEADER_SIZE
+        columns = ['x', 'y'] + (['z'] if has_z else [])
+        for name in columns:
+            setattr(self, name, self._map(np.dtype('<f8'), offset))
+            offset += 8 * count
+        if not has_z:
+            self.z = None
+
+        self._codes = self._map(np.dtype('S%d' % code_width), offset) if code_width else None
+        self._decoded = None
+
+    def _map(self, dtype, offset):
+        if self._count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=(self._count,))
+
+    @property
+    def code(self):
+        """ Object array of the point codes, or None if the file has no codes
+        """
+        if self._codes is not None and self._decoded is None:
+            self._decoded = _decode(self._codes)
+        return None if self._codes is None else self._decoded
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            code = None
+            if self._codes is not None:
+                code = _decode(self._codes[index:index + 1 or None])[0]
+            if self.z is None:
+                return Point2d(float(self.x[index]), float(self.y[index]), code)
+            return Point3d(float(self.x[index]), float(self.y[index]), float(self.z[index]), code)
+
+        return PointArray(self.x[index], self.y[index],
+                          None if self.z is None else self.z[index],
+                          None if self._codes is None else _decode(self._codes[index]))
+
+    def to_point_array(self):
+        """ Read every point into a PointArray
+        """
+        return self[:]
+
+
+def write_point_file(path, points, projection=None, codec=None, code_width=None):
+    """ Write points to a point file
+
+        Args:
+            path (str): file to write
+            points: PointArray, PointFile or sequence of Point2d/Point3d objects
+            projection (Projection class): projection of the points, or None
+            codec: bearing codec of the job, defaults to Settings['bearing']. Must be
+                one of the Settings['bearing'] conventions.
+            code_width (int): bytes stored for each code, defaults to the longest code.
+                Longer codes raise ValueError.
+    """
+    if not isinstance(points, (PointArray, PointFile)):
+        points = PointArray.from_points(points)
+
+    codec = bearing_codec(codec)
+    conventions = [key for key, value in _codecs.items() if value is codec]
+    if not conventions:
+        raise ValueError("codec must be one of the Settings['bearing'] conventions")
+
+    codes = None
+    if points.code is not None:
+        codes = [_encode(code) for code in points.code]
+        longest = max([len(code) for code in codes] + [1])
+        if code_width is None:
+            code_width = longest
+        elif longest > code_width:
+            raise ValueError("code longer than code_width %d bytes" % code_width)
+    else:
+        code_width = 0
+
+    params = (0.0, 0.0, 0.0, 0.0, 0.0)
+    if projection is not None:
+        params = (projection.a, projection.invf, projection.m0, projection.false_easting,
+                  projection.false_northing)
+
+    header = _HEADER.pack(_MAGIC, _VERSION, len(points), points.z is not None, code_width, conventions[0],
+                          projection is not None, *params)
+
+    with open(path, 'wb') as f:
+        f.write(header + b'\0' * (_HEADER_SIZE - len(header)))
+        for column in (points.x, points.y, points.z):
+            if column is not None:
+                np.asarray(column, dtype='<f8').tofile(f)
+        if codes is not None:
+            np.array(codes, dtype='S%d' % code_width).tofile(f)
+
+
+def open_point_file(path):
+    """ Open a point file by memory mapping
+
+        Returns:
+            PointFile: the lazily loaded points
+    """
+    return PointFile(path)
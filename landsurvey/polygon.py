@@ -0,0 +1,165 @@
+import math
+import numpy as np
+from .conversion import bearing_codec
+from .classes import PointArray
+
+
+class PolygonArray:
+    """ Columnar store for many polygons
+
+        The vertices of every ring are stored one after the other in flat x and y
+        columns, and offsets gives the index of the first vertex of each ring, as for
+        the legs of adjust_traverses. A ring is closed by the line from its last
+        vertex back to its first, so the first vertex is not repeated. Indexing with an
+        integer returns the vertices of a ring as a PointArray.
+
+        Args:
+            x (array like): x of every vertex
+            y (array like): y of every vertex
+            offsets (array like): index of the first vertex of each ring
+            code (array like): code of every ring or None
+    """
+    def __init__(self, x, y, offsets, code=None):
+        self.x = np.ascontiguousarray(np.ravel(x), dtype=np.float64)
+        self.y = np.ascontiguousarray(np.ravel(y), dtype=np.float64)
+        self.offsets = np.ascontiguousarray(np.ravel(offsets), dtype=np.intp)
+        self.code = None if code is None else np.asarray(np.ravel(code), dtype=object)
+
+        if len(self.y) != len(self.x):
+            raise ValueError("PolygonArray x and y must be the same length")
+        if self.code is not None and len(self.code) != len(self.offsets):
+            raise ValueError("PolygonArray must have one code for each ring")
+        if len(self.offsets) and self.offsets[0] != 0:
+            raise ValueError("the first ring must start at offset 0")
+        if np.any(np.diff(np.append(self.offsets, len(self.x))) < 3):
+            raise ValueError("every ring must have at least 3 vertices")
+
+    @classmethod
+    def from_rings(cls, rings, code=None):
+        """ Create a PolygonArray from a sequence of rings
+
+            Each ring is a PointArray, or a sequence of Point2d/Point3d objects or
+            (x, y) pairs.
+        """
+        xs = []
+        ys = []
+        for ring in rings:
+            if not isinstance(ring, PointArray):
+                ring = np.array([tuple(vertex)[:2] for vertex in ring], dtype=np.float64).reshape(-1, 2)
+                ring = PointArray(ring[:, 0], ring[:, 1])
+            xs.append(ring.x)
+            ys.append(ring.y)
+
+        counts = [len(x) for x in xs]
+        offsets = np.cumsum([0] + counts[:-1]) if counts else []
+        return cls(np.concatenate(xs) if xs else [], np.concatenate(ys) if ys else [], offsets, code)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        index = range(len(self))[index]
+        stop = self.offsets[index + 1] if index + 1 < len(self) else len(self.x)
+        return PointArray(self.x[self.offsets[index]:stop], self.y[self.offsets[index]:stop])
+
+
+def _rings(polygons):
+    """ Vertices and next vertices of every ring, relative to the first vertex of the ring
+
+        Coordinates are taken relative to each ring so the cross products of the shoelace
+        formula do not lose precision to large grid coordinates.
+
+        Returns:
+            x, y: vertex coordinates relative to the first vertex of the ring
+            next_x, next_y: relative coordinates of the following vertex, the first for the last
+            origin_x, origin_y: first vertex of each ring
+    """
+    offsets = polygons.offsets
+    counts = np.diff(np.append(offsets, len(polygons.x)))
+    origin_x = polygons.x[offsets]
+    origin_y = polygons.y[offsets]
+    x = polygons.x - np.repeat(origin_x, counts)
+    y = polygons.y - np.repeat(origin_y, counts)
+
+    following = np.arange(1, len(x) + 1)
+    following[np.append(offsets[1:], len(x)) - 1] = offsets
+    return x, y, x[following], y[following], origin_x, origin_y
+
+
+def polygon_area(polygons, signed=False):
+    """ Area of every ring by the shoelace formula
+
+        Args:
+            polygons (PolygonArray class): the rings
+            signed (bool): return signed areas, positive for anticlockwise rings
+
+        Returns:
+            area: area of every ring
+    """
+    if not len(polygons):
+        return np.zeros(0)
+    (x, y, next_x, next_y, origin_x, origin_y) = _rings(polygons)
+    area = np.add.reduceat(x * next_y - next_x * y, polygons.offsets) / 2
+    return area if signed else np.abs(area)
+
+
+def polygon_perimeter(polygons):
+    """ Perimeter of every ring, including the closing line
+
+        Args:
+            polygons (PolygonArray class): the rings
+
+        Returns:
+            perimeter: perimeter of every ring
+    """
+    if not len(polygons):
+        return np.zeros(0)
+    (x, y, next_x, next_y, origin_x, origin_y) = _rings(polygons)
+    return np.add.reduceat(np.hypot(next_x - x, next_y - y), polygons.offsets)
+
+
+def polygon_centroid(polygons):
+    """ Centroid (centre of area) of every ring
+
+        Args:
+            polygons (PolygonArray class): the rings
+
+        Returns:
+            x: x of the centroid of every ring, nan for rings of zero area
+            y: y of the centroid of every ring, nan for rings of zero area
+    """
+    if not len(polygons):
+        return np.zeros(0), np.zeros(0)
+    (x, y, next_x, next_y, origin_x, origin_y) = _rings(polygons)
+    cross = x * next_y - next_x * y
+    twice_area = np.add.reduceat(cross, polygons.offsets)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centroid_x = np.add.reduceat((x + next_x) * cross, polygons.offsets) / (3 * twice_area)
+        centroid_y = np.add.reduceat((y + next_y) * cross, polygons.offsets) / (3 * twice_area)
+    return origin_x + centroid_x, origin_y + centroid_y
+
+
+def polygon_closing(polygons, codec=None):
+    """ Distance and bearing of the closing line of every ring, from its last vertex to its first
+
+        Args:
+            polygons (PolygonArray class): the rings
+            codec: bearing codec, defaults to Settings['bearing']
+
+        Returns:
+            distance: length of the closing line of every ring
+            bearing: bearing of the closing line of every ring
+    """
+    codec = bearing_codec(codec)
+    if not len(polygons):
+        return np.zeros(0), codec.from_radians_array(np.zeros(0))
+    last = np.append(polygons.offsets[1:], len(polygons.x)) - 1
+    delta_e = polygons.x[polygons.offsets] - polygons.x[last]
+    delta_n = polygons.y[polygons.offsets] - polygons.y[last]
+    distance = np.hypot(delta_e, delta_n)
+    bearing = np.arctan2(delta_e, delta_n) % (2 * math.pi)
+    return distance, codec.from_radians_array(bearing)
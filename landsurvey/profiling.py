@@ -0,0 +1,206 @@
+"""
+Opt-in profiling of the public functions of landsurvey.
+
+Profiling is off by default and then costs nothing, as no function is wrapped.
+enable_profiling replaces every public function of the package, and the public
+methods of its classes and bearing codecs, with a wrapper which records the number
+of calls, the wall time and the number of input points. The wrapper is put in every
+landsurvey module which refers to the function, so calls made inside the library
+are recorded too, and disable_profiling puts the original functions back.
+
+Times include the time of the instrumented functions called inside, so the time of
+gauss_kruger includes its call to bearing_codec, and QuadrantCodec.to_radians is the
+time spent parsing quadrant bearings. The resection solvers also record the number
+of iterations to convergence. Calls which raise an exception are not recorded, nor
+are calls in the worker processes of gauss_kruger_parallel.
+
+    ls.enable_profiling()
+    run_job()
+    ls.disable_profiling()
+    print(ls.profile_report())
+"""
+import contextlib
+import functools
+import inspect
+import sys
+import threading
+import timeit
+import types
+import numpy as np
+
+# Position of the iteration count in the results of the resection solvers
+_ITERATIONS = {'freestation_2point': 3, 'freestation': 3, 'freestation_batch': 2}
+
+# calls, wall time, input points and iterations of every instrumented function
+_stats = {}
+_lock = threading.Lock()
+
+# (owner, attribute, original) of every replaced function while profiling is enabled
+_patched = []
+
+
+def _size(args):
+    """ Number of input points, from the first argument, counting rows of 2d arrays
+    """
+    if not args:
+        return 0
+    value = args[0]
+    if isinstance(value, np.ndarray):
+        return value.shape[0] if value.ndim > 1 else value.size
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    x = getattr(value, 'x', None)
+    if x is not None:
+        return int(np.size(x))
+    return 1
+
+
+def _record(name, elapsed, items, result):
+    iterations = 0
+    if name in _ITERATIONS:
+        iterations = int(np.sum(result[_ITERATIONS[name]]))
+    with _lock:
+        entry = _stats.get(name)
+        if entry is None:
+            entry = _stats[name] = [0, 0.0, 0, 0]
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] += items
+        entry[3] += iterations
+
+
+def _instrument(name, function, method):
+    timer = timeit.default_timer
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = timer()
+        result = function(*args, **kwargs)
+        elapsed = timer() - start
+        _record(name, elapsed, _size(args[1:] if method else args), result)
+        return result
+    return wrapper
+
+
+def _package_modules():
+    prefix = __name__.rsplit('.', 1)[0]
+    return [module for key, module in list(sys.modules.items())
+            if module is not None and (key == prefix or key.startswith(prefix + '.'))]
+
+
+def _targets():
+    """ (name, owner class or None, attribute, function) of every function to instrument
+    """
+    package = sys.modules[__name__.rsplit('.', 1)[0]]
+    classes = []
+    for name in dir(package):
+        value = getattr(package, name)
+        if name.startswith('_') or inspect.ismodule(value):
+            continue
+        if isinstance(value, types.FunctionType):
+            if value.__module__ != __name__:
+                yield name, None, name, value
+            continue
+        cls = value if inspect.isclass(value) else getattr(value, '__class__', None)
+        if cls is not None and cls not in classes and cls.__module__.startswith(package.__name__ + '.'):
+            classes.append(cls)
+
+    for cls in classes:
+        for attribute, member in sorted(vars(cls).items()):
+            if not attribute.startswith('_') and isinstance(member, types.FunctionType):
+                yield '%s.%s' % (cls.__name__, attribute), cls, attribute, member
+
+
+def enable_profiling():
+    """ Start recording the calls of the public functions
+
+        Recorded calls add up over every enable_profiling until reset_profile.
+    """
+    if _patched:
+        return
+    wrappers = {}
+    for name, cls, attribute, function in _targets():
+        wrapper = _instrument(name, function, cls is not None)
+        if cls is None:
+            wrappers[id(function)] = (function, wrapper)
+        else:
+            setattr(cls, attribute, wrapper)
+            _patched.append((cls, attribute, function))
+
+    for module in _package_modules():
+        for attribute, value in list(vars(module).items()):
+            if id(value) in wrappers and wrappers[id(value)][0] is value:
+                setattr(module, attribute, wrappers[id(value)][1])
+                _patched.append((module, attribute, value))
+
+
+def disable_profiling():
+    """ Stop recording and restore the original functions
+    """
+    while _patched:
+        (owner, attribute, function) = _patched.pop()
+        setattr(owner, attribute, function)
+
+
+def profiling_enabled():
+    """ True if calls are being recorded
+    """
+    return bool(_patched)
+
+
+@contextlib.contextmanager
+def profiled():
+    """ Context manager which records the calls made inside it
+
+        Profiling is left enabled on exit if it was enabled on entry.
+    """
+    enabled = profiling_enabled()
+    enable_profiling()
+    try:
+        yield
+    finally:
+        if not enabled:
+            disable_profiling()
+
+
+def reset_profile():
+    """ Forget every recorded call
+    """
+    with _lock:
+        _stats.clear()
+
+
+def profile_stats():
+    """ The recorded calls of every function called while profiling
+
+        Returns:
+            dict: for each function name a dict of calls, time (total wall time in
+                seconds) and items (total number of input points), and iterations (total
+                number of iterations) for the resection solvers
+    """
+    with _lock:
+        stats = {}
+        for name, (calls, elapsed, items, iterations) in _stats.items():
+            stats[name] = {'calls': calls, 'time': elapsed, 'items': items}
+            if name in _ITERATIONS:
+                stats[name]['iterations'] = iterations
+        return stats
+
+
+def profile_report():
+    """ The recorded calls as a table, slowest function first
+
+        Returns:
+            str: one line per function with its calls, total and mean time per call,
+                input points per second and mean iterations per call
+    """
+    lines = ['%-36s %10s %12s %12s %12s %10s' % ('function', 'calls', 'total s', 'per call s', 'items/s',
+                                                   'iterations')]
+    stats = profile_stats()
+    for name in sorted(stats, key=lambda name: (-stats[name]['time'], name)):
+        entry = stats[name]
+        rate = entry['items'] / entry['time'] if entry['time'] > 0 else float('inf')
+        iterations = '%10.2f' % (entry['iterations'] / float(entry['calls'])) if 'iterations' in entry else ''
+        lines.append('%-36s %10d %12.6f %12.3e %12.3e %10s' % (name, entry['calls'], entry['time'],
+                                                               entry['time'] / entry['calls'], rate, iterations))
+    return '\n'.join(lines)
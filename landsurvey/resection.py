@@ -1,14 +1,22 @@
 import math
-from conversion import bearing_to_radians
+from .conversion import bearing_codec
 import numpy as np
 
 
-def freestation_2point(data):
+def freestation_2point(data, codec=None):
     """ Calculate a 2 point freestation(resection) using
         least squares given a bearing/distance to each point from unknown point U.
 
+        See freestation for any number of targets. The two can give different stations
+        for the same data. Here the bearings have a weight of 1/25 (a standard deviation
+        of 5 radians), so the station is fixed by the two distances alone and the side of
+        the line AB is taken from the initial approximation. freestation weights the
+        directions as clockwise readings, which picks the one of the two stations that
+        agrees with the angle observed between the targets.
+
         Args:
             data (np.array): matrix containing two rows of [x, y, horizontal distance, bearing(dms)]
+            codec: bearing codec, defaults to Settings['bearing']
 
         Return:
             xu: x value of unknown point
@@ -16,6 +24,7 @@ def freestation_2point(data):
             v: variance matrix
             cnt: number of iterations till convergence
     """
+    codec = bearing_codec(codec)
     dist_sd = 1/((0.001*0.001))  # distance standard deviation
     ang_sd = 1/(5*5)  # angle standard deviation
 
@@ -52,7 +61,7 @@ def freestation_2point(data):
         a1 = 0
 
     # Calculate the interior angle from resection point A to point B
-    ang_uab = bearing_to_radians(az_b) - bearing_to_radians(az_a)
+    ang_uab = codec.to_radians(az_b) - codec.to_radians(az_a)
     b = math.asin(dist_au * math.sin(ang_uab)/dist_ab)
     a = math.asin(dist_bu * math.sin(ang_uab)/dist_ab)
 
@@ -98,8 +107,8 @@ def freestation_2point(data):
         k2 = dist_bu - bu
 
         # Calculate the k values for angles
-        k3 = bearing_to_radians(az_a) - (math.atan2((xa - xu), (ya - yu)))
-        k4 = bearing_to_radians(az_b) - (math.atan2((xb - xu), (yb - yu)))
+        k3 = codec.to_radians(az_a) - (math.atan2((xa - xu), (ya - yu)))
+        k4 = codec.to_radians(az_b) - (math.atan2((xb - xu), (yb - yu)))
 
         # create the J and K matrices using the calculated values
         j = np.matrix([[j11, j12], [j21, j22], [j31, j32], [j41, j42]])
@@ -118,11 +127,414 @@ def freestation_2point(data):
 
         xu = xu + xdiff  # add the change to the starting x coord
         yu = yu + ydiff  # add the change to the starting y coord
+        v = (j * x) - k  # variance matrix
 
         # if the new adjustment is smaller than 1mm then break out of the loop and finish least squares adjustment
         if math.fabs(xdiff) < 0.001 and math.fabs(ydiff) < 0.001:
-            v = (j * x) - k  # variance matrix
             break
         cnt = cnt + 1
 
     return xu, yu, v, cnt
+
+
+def _cholesky_factor(n, out=None):
+    """ Cholesky factor L of the normal matrix N = L * Lt
+
+        N has shape (..., u, u) so a stack of small systems can be factored at once.
+        A system which is not positive definite gives NaN rather than raising. L is
+        written to out if it is given, so iterations can reuse one array.
+    """
+    u = n.shape[-1]
+    l = np.zeros_like(n) if out is None else out
+    l[...] = 0.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for i in range(u):
+            for j in range(i + 1):
+                s = n[..., i, j] - np.sum(l[..., i, :j] * l[..., j, :j], axis=-1)
+                if i == j:
+                    l[..., i, i] = np.sqrt(s)
+                else:
+                    l[..., i, j] = s / l[..., j, j]
+    return l
+
+
+def _cholesky_substitute(l, b, out=None, work=None):
+    """ Solve L * Lt * x = b given the Cholesky factor L
+
+        l has shape (..., u, u) and b has shape (..., u). x is written to out and the
+        intermediate solution to work if they are given.
+    """
+    u = l.shape[-1]
+    z = np.zeros_like(b) if work is None else work
+    x = np.zeros_like(b) if out is None else out
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # forward substitution L z = b
+        for i in range(u):
+            z[..., i] = (b[..., i] - np.sum(l[..., i, :i] * z[..., :i], axis=-1)) / l[..., i, i]
+
+        # back substitution Lt x = z
+        for i in reversed(range(u)):
+            x[..., i] = (z[..., i] - np.sum(l[..., i + 1:, i] * x[..., i + 1:], axis=-1)) / l[..., i, i]
+    return x
+
+
+def _cholesky_inverse(l):
+    """ Inverse of N = L * Lt given the Cholesky factor L
+    """
+    u = l.shape[-1]
+    identity = np.broadcast_to(np.eye(u), l.shape)
+    columns = [_cholesky_substitute(l, identity[..., :, i]) for i in range(u)]
+    return np.stack(columns, axis=-1)
+
+
+def _wrap(radians):
+    """ Wrap angles to the range -pi to pi
+    """
+    return (radians + math.pi) % (2 * math.pi) - math.pi
+
+
+def _tienstra(xt, yt, directions):
+    """ Closed form resection from directions to three targets (Tienstra's method)
+
+        The last axis of each argument holds the three targets, so many resections can
+        be computed at once.
+    """
+    # interior angles of the triangle of targets
+    def angle_at(i, j, k):
+        return _wrap(np.arctan2(xt[..., k] - xt[..., i], yt[..., k] - yt[..., i]) -
+                     np.arctan2(xt[..., j] - xt[..., i], yt[..., j] - yt[..., i]))
+
+    # angles observed at the unknown station between the targets
+    observed = [_wrap(directions[..., 2] - directions[..., 1]),
+                _wrap(directions[..., 0] - directions[..., 2]),
+                _wrap(directions[..., 1] - directions[..., 0])]
+    triangle = [angle_at(0, 1, 2), angle_at(1, 2, 0), angle_at(2, 0, 1)]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weights = [1 / (1 / np.tan(triangle[i]) - 1 / np.tan(observed[i])) for i in range(3)]
+        total = sum(weights)
+        xu = sum(weights[i] * xt[..., i] for i in range(3)) / total
+        yu = sum(weights[i] * yt[..., i] for i in range(3)) / total
+    return xu, yu
+
+
+def _first(mask, count):
+    """ Column index of the first count True values in each row of mask
+    """
+    return np.argsort(~mask, axis=1, kind='mergesort')[:, :count]
+
+
+def _initial_positions(xt, yt, dist, directions, dist_sd, ang_sd):
+    """ Initial approximation of the unknown station of many setups at once
+
+        Arguments have a row per setup and a column per target, with NaN for missing
+        observations. Two distances give two possible stations, the one that best fits
+        the remaining observations is used. Without two distances, Tienstra's method is
+        used on the first three directions.
+
+        Returns:
+            xu, yu: arrays of initial positions, NaN where a setup has too few observations
+    """
+    nsetups, ntargets = xt.shape
+    setups = np.arange(nsetups)
+    has_dist = ~np.isnan(dist)
+    has_ang = ~np.isnan(directions)
+    xu = np.full(nsetups, np.nan)
+    yu = np.full(nsetups, np.nan)
+
+    two = np.sum(has_dist, axis=1) >= 2
+    if np.any(two):
+        (a, b) = _first(has_dist, 2).T
+        (xa, ya, xb, yb) = (xt[setups, a], yt[setups, a], xt[setups, b], yt[setups, b])
+        (dist_a, dist_b) = (dist[setups, a], dist[setups, b])
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            d2 = (xb - xa) ** 2 + (yb - ya) ** 2
+            d = np.sqrt(d2)
+            s = (dist_a + dist_b + d) / 2
+
+            # circles that do not quite meet are treated as touching
+            K = np.sqrt(np.maximum(s * (s - dist_b) * (s - dist_a) * (s - d), 0.0))
+            mid_x = (xb + xa) / 2 + (xb - xa) * (dist_a ** 2 - dist_b ** 2) / (2 * d2)
+            mid_y = (yb + ya) / 2 + (yb - ya) * (dist_a ** 2 - dist_b ** 2) / (2 * d2)
+            candidate_x = np.array([mid_x + 2 * (yb - ya) * K / d2, mid_x - 2 * (yb - ya) * K / d2])
+            candidate_y = np.array([mid_y - 2 * (xb - xa) * K / d2, mid_y + 2 * (xb - xa) * K / d2])
+
+            # misfit of both candidates to every observation, with the orientation
+            # taken from the first direction of each setup
+            dx = xt - candidate_x[:, :, np.newaxis]
+            dy = yt - candidate_y[:, :, np.newaxis]
+            misfit = np.nansum(((np.hypot(dx, dy) - dist) / dist_sd) ** 2, axis=2)
+            orientation = _wrap(np.arctan2(dx, dy) - directions)
+            reference = orientation[:, setups, _first(has_ang, 1)[:, 0]]
+            misfit += np.nansum((_wrap(orientation - reference[:, :, np.newaxis]) / ang_sd) ** 2, axis=2)
+
+        second = misfit[1] < misfit[0]
+        xu[two] = np.where(second, candidate_x[1], candidate_x[0])[two]
+        yu[two] = np.where(second, candidate_y[1], candidate_y[0])[two]
+
+    three = ~two & (np.sum(has_ang, axis=1) >= 3)
+    if np.any(three):
+        rows = np.arange(np.count_nonzero(three))[:, np.newaxis]
+        columns = _first(has_ang[three], 3)
+        xu[three], yu[three] = _tienstra(xt[three][rows, columns], yt[three][rows, columns],
+                                         directions[three][rows, columns])
+
+    return xu, yu
+
+
+def freestation(data, dist_sd=0.001, ang_sd=5.0, tolerance=0.001, max_iterations=20, codec=None):
+    """ Calculate a freestation(resection) to any number of targets using least squares
+
+        Each target may have a distance, a direction or both; use NaN for a missing
+        observation. Directions are clockwise horizontal circle readings, so an orientation
+        unknown is solved for along with x and y whenever there are directions. The
+        normal equations are solved by Cholesky factorisation and the working arrays
+        are allocated once before iterating.
+
+        Args:
+            data (np.array): matrix with a row of [x, y, horizontal distance, direction(dms)] per target
+            dist_sd (float): distance standard deviation
+            ang_sd (float): direction standard deviation in seconds
+            tolerance (float): the adjustment finishes once the change in x and y is below this
+            max_iterations (int): maximum number of iterations
+            codec: bearing codec for the directions, defaults to Settings['bearing']
+
+        Return:
+            xu: x value of unknown point
+            yu: y value of unknown point
+            v: residuals of the distances followed by the directions (radians)
+            cnt: number of iterations
+            converged: True if the adjustment converged within max_iterations
+            cov: 2x2 a-posteriori covariance matrix of xu, yu
+    """
+    data = np.asarray(data, dtype=np.float64)
+    has_dist = ~np.isnan(data[:, 2])
+    has_ang = ~np.isnan(data[:, 3])
+
+    directions = np.full(len(data), np.nan)
+    directions[has_ang] = bearing_codec(codec).to_radians_array(data[has_ang, 3])
+    ang_sd = math.radians(ang_sd / 3600.0)
+
+    xu, yu = _initial_positions(data[np.newaxis, :, 0], data[np.newaxis, :, 1], data[np.newaxis, :, 2],
+                                directions[np.newaxis], dist_sd, ang_sd)
+    if np.isnan(xu[0]) or np.isnan(yu[0]):
+        raise ValueError("freestation needs at least two distances or three directions")
+    xu = float(xu[0])
+    yu = float(yu[0])
+
+    # Targets ordered as the distance observations followed by the direction observations
+    x_targets = np.concatenate([data[has_dist, 0], data[has_ang, 0]])
+    y_targets = np.concatenate([data[has_dist, 1], data[has_ang, 1]])
+    dist = data[has_dist, 2]
+    directions = directions[has_ang]
+
+    nd = len(dist)
+    na = len(directions)
+    nobs = nd + na
+    nunknowns = 3 if na else 2  # x, y and the orientation of the directions
+
+    # Weights of the observations
+    w = np.empty(nobs)
+    w[:nd] = 1 / (dist_sd * dist_sd)
+    w[nd:] = 1 / (ang_sd * ang_sd)
+
+    # Preallocated working arrays
+    dx = np.empty(nobs)
+    dy = np.empty(nobs)
+    d = np.empty(nobs)
+    j = np.zeros((nobs, nunknowns))
+    k = np.empty(nobs)
+    wj = np.empty((nobs, nunknowns))
+    n = np.empty((nunknowns, nunknowns))
+    b = np.empty(nunknowns)
+    l = np.empty((nunknowns, nunknowns))
+    x = np.empty(nunknowns)
+    z = np.empty(nunknowns)
+    j[nd:, 2:] = -1  # derivative of every direction with respect to the orientation
+
+    orientation = 0.0
+    if na:
+        bearings = np.arctan2(x_targets[nd:] - xu, y_targets[nd:] - yu)
+        orientation = math.atan2(np.sum(np.sin(bearings - directions)), np.sum(np.cos(bearings - directions)))
+
+    def linearise(xu, yu, orientation):
+        # k = observed - computed and the Jacobian J of the computed observations
+        np.subtract(x_targets, xu, out=dx)
+        np.subtract(y_targets, yu, out=dy)
+        np.hypot(dx, dy, out=d)
+
+        # distances
+        np.subtract(dist, d[:nd], out=k[:nd])
+        np.divide(-dx[:nd], d[:nd], out=j[:nd, 0])
+        np.divide(-dy[:nd], d[:nd], out=j[:nd, 1])
+
+        # directions
+        k[nd:] = _wrap(directions - (np.arctan2(dx[nd:], dy[nd:]) - orientation))
+        d2 = d[nd:] * d[nd:]
+        np.divide(-dy[nd:], d2, out=j[nd:, 0])
+        np.divide(dx[nd:], d2, out=j[nd:, 1])
+
+        # Normal equations Jt * W * J * X = Jt * W * K
+        np.multiply(j, w[:, np.newaxis], out=wj)
+        np.dot(wj.T, j, out=n)
+        np.dot(wj.T, k, out=b)
+
+    converged = False
+    cnt = 0
+    for cnt in range(1, max_iterations + 1):
+        linearise(xu, yu, orientation)
+        _cholesky_substitute(_cholesky_factor(n, l), b, x, z)
+
+        xu = xu + x[0]
+        yu = yu + x[1]
+        if na:
+            orientation = orientation + x[2]
+
+        # if the new adjustment is smaller than the tolerance then finish the least squares adjustment
+        if math.fabs(x[0]) < tolerance and math.fabs(x[1]) < tolerance:
+            converged = True
+            break
+
+    # Residuals and covariance at the final position
+    linearise(xu, yu, orientation)
+    v = -k
+    redundancy = nobs - nunknowns
+    variance_factor = np.dot(w * v, v) / redundancy if redundancy > 0 else 1.0
+    cov = variance_factor * _cholesky_inverse(_cholesky_factor(n, l))[:2, :2]
+
+    return xu, yu, v, cnt, converged, cov
+
+
+def freestation_batch(data, dist_sd=0.001, ang_sd=5.0, tolerance=0.001, max_iterations=20, codec=None):
+    """ Calculate freestations for many setups at once using least squares
+
+        Every setup is adjusted simultaneously: the Jacobians of all setups are built
+        with broadcast array operations and the normal equations are solved with a
+        batched Cholesky factorisation. Setups with fewer targets are padded with rows
+        of NaN, and NaN marks any missing distance or direction as in freestation.
+
+        Args:
+            data (np.array): array of shape (setups, targets, 4) where each target row is
+                [x, y, horizontal distance, direction(dms)]
+            dist_sd (float): distance standard deviation
+            ang_sd (float): direction standard deviation in seconds
+            tolerance (float): a setup is finished once its change in x and y is below this
+            max_iterations (int): maximum number of iterations
+            codec: bearing codec for the directions, defaults to Settings['bearing']
+
+        Return:
+            xu: array of x values of the unknown points
+            yu: array of y values of the unknown points
+            cnt: array of the number of iterations of each setup
+            converged: boolean array, True where the setup converged within max_iterations
+            cov: array of shape (setups, 2, 2) of a-posteriori covariance matrices of xu, yu
+    """
+    data = np.asarray(data, dtype=np.float64)
+    nsetups, ntargets = data.shape[:2]
+    ang_sd = math.radians(ang_sd / 3600.0)
+
+    x_targets = data[:, :, 0]
+    y_targets = data[:, :, 1]
+    has_dist = ~np.isnan(data[:, :, 2]) & ~np.isnan(x_targets)
+    has_ang = ~np.isnan(data[:, :, 3]) & ~np.isnan(x_targets)
+    dist = np.where(has_dist, data[:, :, 2], 0.0)
+    directions = np.full(data.shape[:2], np.nan)
+    directions[has_ang] = bearing_codec(codec).to_radians_array(data[:, :, 3][has_ang])
+
+    # Initial approximation of each setup, NaN where a setup has too few observations
+    xu, yu = _initial_positions(x_targets, y_targets, np.where(has_dist, dist, np.nan), directions, dist_sd, ang_sd)
+
+    # Initial orientation of the directions of each setup
+    with np.errstate(invalid='ignore'):
+        offset = np.arctan2(x_targets - xu[:, np.newaxis], y_targets - yu[:, np.newaxis]) - directions
+    orientation = np.arctan2(np.nansum(np.sin(offset), axis=1), np.nansum(np.cos(offset), axis=1))
+    directions = np.where(has_ang, directions, 0.0)
+    x_targets = np.where(has_dist | has_ang, x_targets, 0.0)
+    y_targets = np.where(has_dist | has_ang, y_targets, 0.0)
+
+    # Weights of the observations, zero for missing ones
+    w = np.concatenate([np.where(has_dist, 1 / (dist_sd * dist_sd), 0.0),
+                        np.where(has_ang, 1 / (ang_sd * ang_sd), 0.0)], axis=1)
+
+    # The orientation is fixed in setups that have no directions
+    no_directions = ~np.any(has_ang, axis=1)
+
+    # Preallocated working arrays, filled in place every iteration
+    j = np.zeros((nsetups, 2 * ntargets, 3))
+    k = np.zeros((nsetups, 2 * ntargets))
+    wj = np.empty((nsetups, 2 * ntargets, 3))
+    dx = np.empty((nsetups, ntargets))
+    dy = np.empty((nsetups, ntargets))
+    d = np.empty((nsetups, ntargets))
+    d2 = np.empty((nsetups, ntargets))
+    n = np.empty((nsetups, 3, 3))
+    b = np.empty((nsetups, 3))
+    l = np.empty((nsetups, 3, 3))
+    x = np.empty((nsetups, 3))
+    z = np.empty((nsetups, 3))
+    j[:, ntargets:, 2] = -1  # derivative of every direction with respect to the orientation
+    unused = w == 0
+
+    def linearise(xu, yu, orientation):
+        # k = observed - computed and the Jacobian J of the computed observations
+        with np.errstate(invalid='ignore', divide='ignore'):
+            np.subtract(x_targets, xu[:, np.newaxis], out=dx)
+            np.subtract(y_targets, yu[:, np.newaxis], out=dy)
+            np.hypot(dx, dy, out=d)
+            np.multiply(d, d, out=d2)
+
+            # distances
+            np.subtract(dist, d, out=k[:, :ntargets])
+            np.divide(dx, d, out=j[:, :ntargets, 0])
+            np.divide(dy, d, out=j[:, :ntargets, 1])
+            np.negative(j[:, :ntargets, :2], out=j[:, :ntargets, :2])
+
+            # directions
+            k[:, ntargets:] = _wrap(directions - (np.arctan2(dx, dy) - orientation[:, np.newaxis]))
+            np.divide(dy, d2, out=j[:, ntargets:, 0])
+            np.negative(j[:, ntargets:, 0], out=j[:, ntargets:, 0])
+            np.divide(dx, d2, out=j[:, ntargets:, 1])
+
+        # missing observations have zero weight, make sure they are not NaN
+        k[unused] = 0.0
+        j[unused, :2] = 0.0
+
+        # Normal equations Jt * W * J * X = Jt * W * K for every setup
+        np.multiply(j, w[:, :, np.newaxis], out=wj)
+        np.einsum('sou,sov->suv', wj, j, out=n)
+        np.einsum('sou,so->su', wj, k, out=b)
+        n[no_directions, 2, 2] = 1.0
+
+    active = ~np.isnan(xu)
+    converged = np.zeros(nsetups, dtype=bool)
+    cnt = np.zeros(nsetups, dtype=np.intp)
+    for i in range(max_iterations):
+        if not np.any(active):
+            break
+
+        linearise(xu, yu, orientation)
+        _cholesky_substitute(_cholesky_factor(n, l), b, x, z)
+        x[~active] = 0.0
+
+        xu += x[:, 0]
+        yu += x[:, 1]
+        orientation += x[:, 2]
+        cnt[active] += 1
+
+        # setups whose adjustment is smaller than the tolerance are finished
+        finished = active & (np.abs(x[:, 0]) < tolerance) & (np.abs(x[:, 1]) < tolerance)
+        converged |= finished
+        active &= ~finished
+
+        # setups which have diverged are abandoned
+        active &= np.isfinite(xu) & np.isfinite(yu)
+
+    # Covariance at the final positions
+    linearise(xu, yu, orientation)
+    nobs = np.sum(w > 0, axis=1)
+    redundancy = nobs - np.where(no_directions, 2, 3)
+    variance_factor = np.where(redundancy > 0, np.sum(w * k * k, axis=1) / np.maximum(redundancy, 1), 1.0)
+    cov = variance_factor[:, np.newaxis, np.newaxis] * _cholesky_inverse(_cholesky_factor(n, l))[:, :2, :2]
+
+    return xu, yu, cnt, converged, cov
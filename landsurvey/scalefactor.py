@@ -0,0 +1,166 @@
+import math
+import numpy as np
+from .conversion import bearing_codec, RADIAN
+from .geo import compile_projection, gauss_kruger_inverse_array
+
+# Combined scale factors of setups keyed by station and projection
+_setup_factors = {}
+_SETUP_CACHE_SIZE = 4096
+
+
+def _columns(pnt):
+    x = np.asarray(pnt.x, dtype=np.float64)
+    y = np.asarray(pnt.y, dtype=np.float64)
+    z = getattr(pnt, 'z', None)
+    return x, y, (np.zeros_like(x) if z is None else np.asarray(z, dtype=np.float64))
+
+
+def _inverse(easting, northing, central_meridian, proj, codec):
+    """ Latitude in radians and point scale factor of grid coordinates
+    """
+    central_meridian = bearing_codec(codec).to_radians_array(central_meridian)
+    (latitude, longitude, m, grid_conv) = gauss_kruger_inverse_array(easting, northing, central_meridian, proj,
+                                                                     codec=RADIAN)
+    return latitude, m
+
+
+def _height_factor(latitude, height, proj):
+    """ Ratio of the ellipsoid to the ground using the gaussian mean radius at the latitude
+    """
+    c = compile_projection(proj)
+    w = 1 - c.e2 * np.sin(latitude) ** 2
+    radius = c.a * math.sqrt(1 - c.e2) / w
+    return radius / (radius + height)
+
+
+def point_scale_factor(pnts, central_meridian, proj, codec=None):
+    """ Calculate the point scale factor at grid coordinates
+
+        Args:
+            pnts (Point2d or PointArray class): grid coordinates (x easting, y northing)
+            central_meridian (float): central meridian of the zone
+            proj (Projection or CompiledProjection class): projection definition
+            codec: bearing codec for the central meridian, defaults to Settings['bearing']
+
+        Returns:
+            m: point scale factor of every point
+    """
+    (x, y, z) = _columns(pnts)
+    return _inverse(x, y, central_meridian, proj, codec)[1]
+
+
+def line_scale_factor(pnt1, pnt2, central_meridian, proj, codec=None):
+    """ Calculate the line scale factor of lines between grid coordinates
+
+        Uses Simpson's rule on the point scale factors at both ends and the middle
+        of each line, k = (m1 + 4 * m_mid + m2) / 6.
+
+        Args:
+            pnt1 (Point2d or PointArray class): start of every line
+            pnt2 (Point2d or PointArray class): end of every line
+            central_meridian (float): central meridian of the zone
+            proj (Projection or CompiledProjection class): projection definition
+            codec: bearing codec for the central meridian, defaults to Settings['bearing']
+
+        Returns:
+            k: line scale factor of every line
+    """
+    return combined_scale_factor(pnt1, pnt2, central_meridian, proj, codec=codec)[0]
+
+
+def combined_scale_factor(pnt1, pnt2, central_meridian, proj, geoid_separation=0.0, codec=None):
+    """ Calculate the line, height and combined scale factors of lines between grid coordinates
+
+        The height factor reduces a ground distance at the mean height of the line
+        ends to the ellipsoid, using the gaussian mean radius of curvature. Heights
+        are the z of Point3d/PointArray ends (0 for 2d points) plus the geoid
+        separation. A ground distance times the combined factor is a grid distance.
+
+        Args:
+            pnt1 (Point2d, Point3d or PointArray class): start of every line
+            pnt2 (Point2d, Point3d or PointArray class): end of every line
+            central_meridian (float): central meridian of the zone
+            proj (Projection or CompiledProjection class): projection definition
+            geoid_separation (array like or float): ellipsoid height of the height datum, N
+            codec: bearing codec for the central meridian, defaults to Settings['bearing']
+
+        Returns:
+            k: line scale factor of every line
+            height_factor: height factor of every line
+            combined: combined scale factor (k * height_factor) of every line
+    """
+    (x1, y1, z1) = _columns(pnt1)
+    (x2, y2, z2) = _columns(pnt2)
+    (x1, y1, z1, x2, y2, z2) = np.broadcast_arrays(x1, y1, z1, x2, y2, z2)
+
+    # Point scale factors at the start, middle and end of every line in one call
+    easting = np.concatenate([x1.ravel(), ((x1 + x2) / 2).ravel(), x2.ravel()])
+    northing = np.concatenate([y1.ravel(), ((y1 + y2) / 2).ravel(), y2.ravel()])
+    (latitude, m) = _inverse(easting, northing, central_meridian, proj, codec)
+    (m1, m_mid, m2) = [values.reshape(x1.shape) for values in np.split(m, 3)]
+
+    k = (m1 + 4 * m_mid + m2) / 6
+    height = (z1 + z2) / 2 + geoid_separation
+    height_factor = _height_factor(np.split(latitude, 3)[1].reshape(x1.shape), height, proj)
+    return k, height_factor, k * height_factor
+
+
+def setup_scale_factor(station, central_meridian, proj, geoid_separation=0.0, codec=None):
+    """ Combined scale factor of an instrument setup, cached per station
+
+        The point scale factor and height factor at the station are used for every
+        shot from it, which is within 1 ppm for shots of a few hundred metres. The
+        factor is cached, so every chunk and every shot of a setup reuses it.
+
+        Args:
+            station (Point2d or Point3d class): occupied station in grid coordinates
+            central_meridian (float): central meridian of the zone
+            proj (Projection or CompiledProjection class): projection definition
+            geoid_separation (float): ellipsoid height of the height datum, N
+            codec: bearing codec for the central meridian, defaults to Settings['bearing']
+
+        Returns:
+            combined: combined scale factor of the setup
+    """
+    codec = bearing_codec(codec)
+    c = compile_projection(proj)
+    z = getattr(station, 'z', 0.0)
+    key = (station.x, station.y, z, central_meridian, c.a, c.invf, c.m0, c.false_easting, c.false_northing,
+           geoid_separation, codec)
+
+    combined = _setup_factors.get(key)
+    if combined is None:
+        combined = float(combined_scale_factor(station, station, central_meridian, c, geoid_separation,
+                                               codec)[2])
+        if len(_setup_factors) >= _SETUP_CACHE_SIZE:
+            _setup_factors.clear()
+        _setup_factors[key] = combined
+    return combined
+
+
+def ground_to_grid(distances, factor):
+    """ Convert ground distances to grid distances
+
+        Args:
+            distances (array like): ground distances
+            factor (array like or float): combined scale factor of every distance, from
+                combined_scale_factor or setup_scale_factor
+
+        Returns:
+            grid distances
+    """
+    return np.asarray(distances, dtype=np.float64) * factor
+
+
+def grid_to_ground(distances, factor):
+    """ Convert grid distances to ground distances
+
+        Args:
+            distances (array like): grid distances
+            factor (array like or float): combined scale factor of every distance, from
+                combined_scale_factor or setup_scale_factor
+
+        Returns:
+            ground distances
+    """
+    return np.asarray(distances, dtype=np.float64) / factor
@@ -0,0 +1,248 @@
+import math
+import numpy as np
+
+
+class PointIndex:
+    """ Uniform grid spatial index over the x, y of a collection of points
+
+        Points are bucketed into square cells so nearest, radius and bounding box
+        queries only look at the points in nearby cells instead of scanning every
+        point. Points can be added at any time, e.g. as shots stream in. Queries
+        return indices in the order the points were inserted. Only x and y are
+        indexed, so 3d points are searched in plan.
+
+        Args:
+            points: optional Point2d/Point3d objects or a PointArray to index
+            cell_size (float): width of the grid cells. Defaults to about two points
+                per cell for the bulk of the initial points (see _default_cell_size),
+                or 10 if there are none
+    """
+    def __init__(self, points=None, cell_size=None):
+        x, y = _coordinates(points) if points is not None else (np.empty(0), np.empty(0))
+
+        if cell_size is None:
+            cell_size = _default_cell_size(x, y)
+        self.cell_size = float(cell_size)
+
+        self._x = np.empty(max(len(x), 16))
+        self._y = np.empty(max(len(x), 16))
+        self._count = 0
+        self._cells = {}  # (column, row) -> list of point indices
+        self._extent = None  # (min column, min row, max column, max row) of occupied cells
+
+        self._add(x, y)
+
+    def __len__(self):
+        return self._count
+
+    def insert(self, pnt):
+        """ Add one point to the index
+
+            Returns:
+                index: the index of the new point
+        """
+        self._add(np.array([pnt.x], dtype=np.float64), np.array([pnt.y], dtype=np.float64))
+        return self._count - 1
+
+    def extend(self, points):
+        """ Add Point2d/Point3d objects or a PointArray to the index
+
+            Returns:
+                indices: array of the indices of the new points
+        """
+        x, y = _coordinates(points)
+        start = self._count
+        self._add(x, y)
+        return np.arange(start, self._count)
+
+    def nearest(self, pnt, k=1):
+        """ Find the k nearest points
+
+            Args:
+                pnt (Point2d or Point3d class): the query point
+                k (int): number of points to find
+
+            Returns:
+                indices: array of point indices, nearest first
+                distances: array of distances to the points
+        """
+        if self._count == 0 or k < 1:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        k = min(k, self._count)
+
+        column, row = self._cell(pnt.x, pnt.y)
+        found = []
+
+        # rings closer than the occupied cells are empty, so start at the first one that isn't
+        min_column, min_row, max_column, max_row = self._extent
+        ring = max(0, min_column - column, column - max_column, min_row - row, row - max_row)
+        while True:
+            found.extend(self._ring(column, row, ring))
+
+            # every point outside the rings searched so far is at least ring * cell_size away
+            if len(found) >= k:
+                indices = np.array(found, dtype=np.intp)
+                distances = np.hypot(self._x[indices] - pnt.x, self._y[indices] - pnt.y)
+                if np.partition(distances, k - 1)[k - 1] <= ring * self.cell_size or self._covers(column, row, ring):
+                    order = np.argsort(distances, kind='mergesort')[:k]
+                    return indices[order], distances[order]
+            ring += 1
+
+    def within_radius(self, pnt, radius):
+        """ Find all points within a distance of a point
+
+            Args:
+                pnt (Point2d or Point3d class): the query point
+                radius (float): search distance
+
+            Returns:
+                indices: array of point indices, nearest first
+                distances: array of distances to the points
+        """
+        indices = self._search(pnt.x - radius, pnt.y - radius, pnt.x + radius, pnt.y + radius)
+        distances = np.hypot(self._x[indices] - pnt.x, self._y[indices] - pnt.y)
+        inside = distances <= radius
+        indices = indices[inside]
+        distances = distances[inside]
+
+        order = np.argsort(distances, kind='mergesort')
+        return indices[order], distances[order]
+
+    def within_bbox(self, xmin, ymin, xmax, ymax):
+        """ Find all points inside a bounding box, including its edges
+
+            Returns:
+                indices: sorted array of point indices
+        """
+        indices = self._search(xmin, ymin, xmax, ymax)
+        x = self._x[indices]
+        y = self._y[indices]
+        return np.sort(indices[(x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)])
+
+    def _add(self, x, y):
+        """ Append coordinates to the columns and bucket them into cells
+        """
+        n = len(x)
+        if n == 0:
+            return
+
+        # grow the columns by doubling so inserts are amortised O(1)
+        if self._count + n > len(self._x):
+            capacity = max(2 * len(self._x), self._count + n)
+            self._x = np.concatenate([self._x[:self._count], np.empty(capacity - self._count)])
+            self._y = np.concatenate([self._y[:self._count], np.empty(capacity - self._count)])
+
+        self._x[self._count:self._count + n] = x
+        self._y[self._count:self._count + n] = y
+
+        columns = np.floor(x / self.cell_size).astype(np.int64)
+        rows = np.floor(y / self.cell_size).astype(np.int64)
+        for index, column, row in zip(range(self._count, self._count + n), columns.tolist(), rows.tolist()):
+            cell = self._cells.get((column, row))
+            if cell is None:
+                self._cells[(column, row)] = [index]
+            else:
+                cell.append(index)
+        self._count += n
+
+        extent = (columns.min(), rows.min(), columns.max(), rows.max())
+        if self._extent is not None:
+            extent = (min(extent[0], self._extent[0]), min(extent[1], self._extent[1]),
+                      max(extent[2], self._extent[2]), max(extent[3], self._extent[3]))
+        self._extent = tuple(int(value) for value in extent)
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def _covers(self, column, row, ring):
+        """ True if the rings up to ring around a cell cover every occupied cell
+        """
+        min_column, min_row, max_column, max_row = self._extent
+        return (column - ring <= min_column and column + ring >= max_column and
+                row - ring <= min_row and row + ring >= max_row)
+
+    def _ring(self, column, row, ring):
+        """ Point indices in the cells exactly ring cells away from a cell
+        """
+        if ring == 0:
+            return self._cells.get((column, row), [])
+
+        found = []
+        if 8 * ring > len(self._cells):
+            # cheaper to check every occupied cell than every cell of a large ring
+            for (c, r), indices in self._cells.items():
+                if max(abs(c - column), abs(r - row)) == ring:
+                    found.extend(indices)
+            return found
+
+        for c in range(column - ring, column + ring + 1):
+            found.extend(self._cells.get((c, row - ring), []))
+            found.extend(self._cells.get((c, row + ring), []))
+        for r in range(row - ring + 1, row + ring):
+            found.extend(self._cells.get((column - ring, r), []))
+            found.extend(self._cells.get((column + ring, r), []))
+        return found
+
+    def _search(self, xmin, ymin, xmax, ymax):
+        """ Point indices in every cell overlapping a bounding box
+        """
+        if self._count == 0:
+            return np.empty(0, dtype=np.intp)
+
+        min_column, min_row = self._cell(xmin, ymin)
+        max_column, max_row = self._cell(xmax, ymax)
+
+        # clip the box to the occupied cells
+        min_column = max(min_column, self._extent[0])
+        min_row = max(min_row, self._extent[1])
+        max_column = min(max_column, self._extent[2])
+        max_row = min(max_row, self._extent[3])
+
+        found = []
+        if (max_column - min_column + 1) * (max_row - min_row + 1) > len(self._cells):
+            for (c, r), indices in self._cells.items():
+                if min_column <= c <= max_column and min_row <= r <= max_row:
+                    found.extend(indices)
+        else:
+            for c in range(min_column, max_column + 1):
+                for r in range(min_row, max_row + 1):
+                    found.extend(self._cells.get((c, r), []))
+        return np.array(found, dtype=np.intp)
+
+
+def _default_cell_size(x, y):
+    """ Cell size giving about two points per cell
+
+        The extent is taken between the 5th and 95th percentiles of x and y, so a few
+        outlying points do not make the cells of the rest too large. Points along a
+        north-south or east-west line get about two points per cell along the line, and
+        10 is used when there are not two separate points. The full extent is used when
+        there are too few points for any to lie inside the percentiles.
+    """
+    if len(x) > 1:
+        (xmin, xmax) = np.percentile(x, [5, 95])
+        (ymin, ymax) = np.percentile(y, [5, 95])
+        inside = np.count_nonzero((x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax))
+        if inside == 0:
+            # too few points for the trimmed box to hold any, so use them all
+            (xmin, xmax, ymin, ymax) = (x.min(), x.max(), y.min(), y.max())
+            inside = len(x)
+        area = (xmax - xmin) * (ymax - ymin)
+        if area > 0:
+            return math.sqrt(2 * area / inside)
+        length = max(xmax - xmin, ymax - ymin)
+        if length > 0:
+            return 2 * length / inside
+    return 10.0
+
+
+def _coordinates(points):
+    """ x and y arrays of Point2d/Point3d objects or a PointArray
+    """
+    if isinstance(getattr(points, 'x', None), np.ndarray):
+        return np.asarray(points.x, dtype=np.float64), np.asarray(points.y, dtype=np.float64)
+
+    points = list(points)
+    x = np.fromiter((pnt.x for pnt in points), dtype=np.float64, count=len(points))
+    y = np.fromiter((pnt.y for pnt in points), dtype=np.float64, count=len(points))
+    return x, y
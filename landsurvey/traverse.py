@@ -0,0 +1,112 @@
+import math
+import numpy as np
+from .conversion import bearing_codec
+
+
+def adjust_traverses(starts, bearings, distances, offsets, ends=None, method='bowditch', codec=None):
+    """ Compute misclose and adjust a batch of independent traverses in one call
+
+        The legs of every traverse are stored one after the other in bearings and
+        distances, and offsets gives the index of the first leg of each traverse.
+        Corrections are distributed with the Bowditch (compass) rule in proportion to
+        leg length, or with the Transit rule in proportion to the leg's change in
+        x and y.
+
+        Args:
+            starts (Point2d or PointArray class): start point of each traverse
+            bearings (array like): bearing of every leg in degrees, minutes, seconds (dd.mmss)
+            distances (array like): horizontal distance of every leg
+            offsets (array like): index of the first leg of each traverse
+            ends (Point2d or PointArray class): known end point of each traverse, or None
+                for traverses which close back on their start point
+            method (str): 'bowditch' or 'transit'
+            codec: bearing codec, defaults to Settings['bearing']
+
+        Returns:
+            x: adjusted x at the end of every leg
+            y: adjusted y at the end of every leg
+            misclose: linear misclose of each traverse
+            misclose_bearing: bearing of the misclose vector of each traverse
+            precision: precision ratio (traverse length / misclose) of each traverse
+    """
+    if method not in ('bowditch', 'transit'):
+        raise ValueError("method must be 'bowditch' or 'transit'")
+    if ends is None:
+        ends = starts
+
+    codec = bearing_codec(codec)
+    radians = codec.to_radians_array(bearings)
+    distances = np.asarray(distances, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    ntraverses = len(offsets)
+
+    # Number of legs in each traverse
+    counts = np.diff(np.append(offsets, len(distances)))
+    if np.any(counts < 1):
+        raise ValueError("every traverse must have at least one leg")
+
+    start_x = np.broadcast_to(np.asarray(starts.x, dtype=np.float64), (ntraverses,))
+    start_y = np.broadcast_to(np.asarray(starts.y, dtype=np.float64), (ntraverses,))
+    end_x = np.broadcast_to(np.asarray(ends.x, dtype=np.float64), (ntraverses,))
+    end_y = np.broadcast_to(np.asarray(ends.y, dtype=np.float64), (ntraverses,))
+
+    # Change in x and y along every leg
+    delta_x = distances * np.sin(radians)
+    delta_y = distances * np.cos(radians)
+
+    # Misclose of each traverse
+    misclose_x = start_x + np.add.reduceat(delta_x, offsets) - end_x
+    misclose_y = start_y + np.add.reduceat(delta_y, offsets) - end_y
+    misclose = np.hypot(misclose_x, misclose_y)
+    misclose_bearing = codec.from_radians_array(np.arctan2(misclose_x, misclose_y) % (2 * math.pi))
+
+    length = np.add.reduceat(distances, offsets)
+    with np.errstate(divide='ignore'):
+        precision = length / misclose
+
+    # Distribute the misclose over the legs
+    if method == 'bowditch':
+        weight_x = distances / np.repeat(length, counts)
+        weight_y = weight_x
+    else:
+        abs_x = np.abs(delta_x)
+        abs_y = np.abs(delta_y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight_x = np.nan_to_num(abs_x / np.repeat(np.add.reduceat(abs_x, offsets), counts))
+            weight_y = np.nan_to_num(abs_y / np.repeat(np.add.reduceat(abs_y, offsets), counts))
+
+    delta_x = delta_x - weight_x * np.repeat(misclose_x, counts)
+    delta_y = delta_y - weight_y * np.repeat(misclose_y, counts)
+
+    # Accumulate the adjusted legs within each traverse
+    x = np.cumsum(delta_x)
+    y = np.cumsum(delta_y)
+    before_x = np.concatenate(([0.0], x))[offsets]
+    before_y = np.concatenate(([0.0], y))[offsets]
+    x += np.repeat(start_x - before_x, counts)
+    y += np.repeat(start_y - before_y, counts)
+
+    return x, y, misclose, misclose_bearing, precision
+
+
+def adjust_traverse(start, bearings, distances, end=None, method='bowditch', codec=None):
+    """ Compute misclose and adjust a single traverse
+
+        Args:
+            start (Point2d class): start point
+            bearings (array like): bearing of every leg in degrees, minutes, seconds (dd.mmss)
+            distances (array like): horizontal distance of every leg
+            end (Point2d class): known end point, or None if the traverse closes on its start
+            method (str): 'bowditch' or 'transit'
+            codec: bearing codec, defaults to Settings['bearing']
+
+        Returns:
+            x: adjusted x at the end of every leg
+            y: adjusted y at the end of every leg
+            misclose: linear misclose
+            misclose_bearing: bearing of the misclose vector
+            precision: precision ratio (traverse length / misclose)
+    """
+    x, y, misclose, misclose_bearing, precision = adjust_traverses(start, bearings, distances, [0], end,
+                                                                   method, codec)
+    return x, y, misclose[0], misclose_bearing[0], precision[0]
@@ -8,4 +8,5 @@ setup(name='landsurvey',
       author_email='sumedho@gmail.com',
       license='MIT',
       packages=['landsurvey'],
+      entry_points={'console_scripts': ['landsurvey = landsurvey.landsurvey:main']},
       zip_safe=False)
\ No newline at end of file
@@ -5,11 +5,18 @@ Created on Thu Mar 31 14:32:32 2016
 @author: derek.carter
 """
 
+import threading
 import unittest
+import warnings
 import landsurvey as ls
 
 import numpy as np
 
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
 
 class TestDmsConversions(unittest.TestCase):
     """
@@ -234,6 +241,10 @@ class TestTwoLineIntersection(unittest.TestCase):
         (x, y) = ls.two_line_intersection(pnt_a, pnt_b, pnt_c, pnt_d)
         #print(x, y)
 
+        # line a-c with line b-d
+        self.assertAlmostEqual(x, 1202.4624, places=4)
+        self.assertAlmostEqual(y, 1106.7508, places=4)
+
     def test2(self):
         pnt_a = ls.Point2d(74184.946, 5404.450)
         pnt_b = ls.Point2d(74204.945, 5404.450)
@@ -298,10 +309,15 @@ class TestGaussKruger(unittest.TestCase):
         expected_e = 273741.297
         expected_n = 5796489.777
         expected_k = 1.00023056 # point scale factor
+        expected_gc = -ls.dms2dec(1.350365) # grid convergence -1 35 03.65
 
         self.assertAlmostEquals(e, expected_e, places=3)
         self.assertAlmostEquals(n, expected_n, places=3)
         self.assertAlmostEquals(k, expected_k, places=3)
+        self.assertAlmostEquals(gc, expected_gc, places=5)
+
+        (e, n, k, gc) = ls.gauss_kruger_array([lat], [lon], cm, p)
+        self.assertAlmostEquals(gc[0], expected_gc, places=5)
         
     def test_bunninyong_peak(self):
         """
@@ -411,6 +427,566 @@ class TestGaussKruger(unittest.TestCase):
         self.assertAlmostEquals(n, expected_n, places=3)
         self.assertAlmostEquals(k, expected_k, places=3)
         
-    
+
+
+class TestGaussKrugerArray(unittest.TestCase):
+    """
+     Vectorised Gauss Kruger Tests
+    """
+    def setUp(self):
+        # Map Grid Australia Projection
+        self.p = ls.Projection(6378137.0, 298.257222101, 0.9996, 500000, 10000000)
+
+    def test_matches_scalar(self):
+        """
+            Array results should match the scalar function to the millimetre
+            for the GDA Technical Manual test points
+        """
+        lat = np.array([-37.570372030, -37.391015611, -37.174973137, -38.090522718, -38.211312687])
+        lon = np.array([144.252952442, 143.553538393, 143.590316717, 144.364367715, 144.570255485])
+        (e, n, k, gc) = ls.gauss_kruger_array(lat, lon, 147, self.p)
+
+        for i in range(len(lat)):
+            (se, sn, sk, sgc) = ls.gauss_kruger(lat[i], lon[i], 147, self.p)
+            self.assertAlmostEqual(e[i], se, places=3)
+            self.assertAlmostEqual(n[i], sn, places=3)
+            self.assertAlmostEqual(k[i], sk, places=8)
+            self.assertAlmostEqual(gc[i], sgc, places=8)
+
+    def test_central_meridian_array(self):
+        """
+            Each point can carry its own central meridian
+        """
+        lat = np.array([-37.570372030, -31.570372030])
+        lon = np.array([144.252952442, 116.252952442])
+        cm = np.array([147, 117])
+        (e, n, k, gc) = ls.gauss_kruger_array(lat, lon, cm, self.p)
+
+        for i in range(len(lat)):
+            (se, sn, sk, sgc) = ls.gauss_kruger(lat[i], lon[i], cm[i], self.p)
+            self.assertAlmostEqual(e[i], se, places=3)
+            self.assertAlmostEqual(n[i], sn, places=3)
+
+
+class TestCompiledProjection(unittest.TestCase):
+    """
+     Compiled projection registry tests
+    """
+    def test_registry_reuse(self):
+        """
+            Equal projection definitions share one compiled projection
+        """
+        p1 = ls.Projection(6378137.0, 298.257222101, 0.9996, 500000, 10000000)
+        p2 = ls.Projection(6378137.0, 298.257222101, 0.9996, 500000, 10000000)
+        c = ls.compile_projection(p1)
+
+        self.assertIs(c, ls.compile_projection(p2))
+        self.assertIs(c, ls.compile_projection(c))
+        self.assertIsNot(c, ls.compile_projection(ls.Projection(6378137.0, 298.257222101, 0.9996, 500000, 0)))
+
+    def test_compiled_gauss_kruger(self):
+        """
+            Projecting with a compiled projection gives the same coordinates
+        """
+        p = ls.Projection(6378137.0, 298.257222101, 0.9996, 500000, 10000000)
+        c = ls.compile_projection(p)
+        (e, n, k, gc) = ls.gauss_kruger(-37.570372030, 144.252952442, 147, c)
+
+        self.assertAlmostEqual(e, 273741.297, places=3)
+        self.assertAlmostEqual(n, 5796489.777, places=3)
+        self.assertAlmostEqual(k, 1.00023056, places=8)
+
+
+class TestGaussKrugerInverseArray(unittest.TestCase):
+    """
+     Inverse Gauss Kruger Tests
+    """
+    def setUp(self):
+        # Map Grid Australia Projection
+        self.p = ls.Projection(6378137.0, 298.257222101, 0.9996, 500000, 10000000)
+
+    def test_flinders_peak(self):
+        """
+            Convert the MGA coordinates of Flinders Peak back to lat, long
+        """
+        (lat, lon, k, gc) = ls.gauss_kruger_inverse_array(273741.297, 5796489.777, 147, self.p)
+
+        self.assertAlmostEqual(lat, -37.570372030, places=8)
+        self.assertAlmostEqual(lon, 144.252952442, places=8)
+        self.assertAlmostEqual(k, 1.00023056, places=8)
+        self.assertAlmostEqual(gc, -ls.dms2dec(1.350365), places=5)
+
+    def test_grid_convergence(self):
+        """
+            Grid convergence is the grid bearing of the meridian, checked by
+            projecting points a little north and south of each point
+        """
+        e = np.array([273741.297, 228854.052, 720000.0, 300000.0, 650000.0])
+        n = np.array([5796489.777, 5828259.038, 6100000.0, 8500000.0, 1200000.0])
+        cm = np.radians(147)
+        (lat, lon, k, gc) = ls.gauss_kruger_inverse_array(e, n, cm, self.p, codec=ls.RADIAN)
+
+        step = 1e-7
+        (e1, n1, k1, gc1) = ls.gauss_kruger_array(lat - step, lon, cm, self.p, codec=ls.RADIAN)
+        (e2, n2, k2, gc2) = ls.gauss_kruger_array(lat + step, lon, cm, self.p, codec=ls.RADIAN)
+        np.testing.assert_allclose(gc, np.degrees(np.arctan2(e2 - e1, n2 - n1)), atol=1e-7)
+
+    def test_round_trip(self):
+        """
+            Forward then inverse projection returns the original lat, long,
+            scale factor and grid convergence
+        """
+        lat = np.array([-37.570372030, -37.391015611, -37.174973137, -38.090522718, -38.211312687, 12.3045])
+        lon = np.array([144.252952442, 143.553538393, 143.590316717, 144.364367715, 144.570255485, 149.5959])
+        (e, n, k, gc) = ls.gauss_kruger_array(lat, lon, 147, self.p)
+        (lat2, lon2, k2, gc2) = ls.gauss_kruger_inverse_array(e, n, 147, self.p)
+
+        for i in range(len(lat)):
+            self.assertAlmostEqual(lat[i], lat2[i], places=9)
+            self.assertAlmostEqual(lon[i], lon2[i], places=9)
+            self.assertAlmostEqual(k[i], k2[i], places=10)
+            self.assertAlmostEqual(gc[i], gc2[i], places=10)
+
+
+class TestPointArray(unittest.TestCase):
+    """
+        Columnar point store tests
+    """
+    def setUp(self):
+        self.points = [ls.Point3d(255.751, 176.286, 42.623, "STN"),
+                       ls.Point3d(301.245, 299.215, 35.214),
+                       ls.Point3d(177.413, 446.111, 12.0, "TOE")]
+        self.array = ls.PointArray.from_points(self.points)
+
+    def test_round_trip(self):
+        self.assertEqual(len(self.array), 3)
+        points = self.array.to_points()
+        for point, expected in zip(points, self.points):
+            self.assertEqual(point.x, expected.x)
+            self.assertEqual(point.y, expected.y)
+            self.assertEqual(point.z, expected.z)
+        self.assertEqual(points[0].code, "STN")
+        self.assertEqual(points[1].code, None)
+
+    def test_2d_without_codes(self):
+        array = ls.PointArray.from_points([ls.Point2d(1, 2), ls.Point2d(3, 4)])
+        self.assertIsNone(array.z)
+        self.assertIsNone(array.code)
+        self.assertEqual(array.x.dtype, np.float64)
+        self.assertIsInstance(array[1], ls.Point2d)
+
+    def test_slicing_and_masking(self):
+        sliced = self.array[1:]
+        self.assertEqual(len(sliced), 2)
+        self.assertEqual(sliced[0].x, 301.245)
+
+        masked = self.array[self.array.z > 40]
+        self.assertEqual(len(masked), 1)
+        self.assertEqual(masked[0].code, "STN")
+
+    def test_mismatched_columns(self):
+        self.assertRaises(ValueError, ls.PointArray, [1, 2], [1, 2, 3])
+
+    def test_calc_functions(self):
+        """
+            calc functions give the same answer for a PointArray as for each Point
+        """
+        origin = ls.PointArray.from_points([ls.Point3d(0, 0, 0)] * 3)
+        (dist, bearing) = ls.join2d(origin, self.array)
+        (x, y, z) = ls.rad3d(origin, bearing, dist, 90, 0, 0)
+
+        for i, point in enumerate(self.points):
+            (sdist, sbearing) = ls.join2d(ls.Point3d(0, 0, 0), point)
+            self.assertAlmostEqual(dist[i], sdist, places=9)
+            self.assertAlmostEqual(bearing[i], sbearing, places=9)
+            self.assertAlmostEqual(x[i], point.x, places=3)
+            self.assertAlmostEqual(y[i], point.y, places=3)
+
+    def test_two_line_intersection(self):
+        pnt_a = ls.PointArray([74184.946, 1101.61], [5404.450, 1113.14])
+        pnt_b = ls.PointArray([74185.176, 1134.86], [5399.176, 1061.14])
+        pnt_c = ls.PointArray([74204.945, 1334.91], [5404.450, 1098.36])
+        pnt_d = ls.PointArray([74205.176, 1358.31], [5399.176, 1211.90])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            (x, y) = ls.two_line_intersection(pnt_a, pnt_b, pnt_c, pnt_d)
+        (sx, sy) = ls.two_line_intersection(pnt_a[1], pnt_b[1], pnt_c[1], pnt_d[1])
+
+        self.assertTrue(np.isnan(x[0]) and np.isnan(y[0]))
+        self.assertAlmostEqual(x[1], sx, places=6)
+        self.assertAlmostEqual(y[1], sy, places=6)
+
+
+class _DictPoint3d:
+    """
+        Dict backed point matching the original Point3d, used as the memory baseline
+    """
+    def __init__(self, x, y, z, code=None):
+        self.x = x
+        self.y = y
+        self.z = z
+        if code is not None:
+            self.code = code
+
+
+class TestPoints(unittest.TestCase):
+    """
+        Point class tests
+    """
+    def test_code_always_present(self):
+        self.assertIsNone(ls.Point2d(10, 10).code)
+        self.assertIsNone(ls.Point3d(20, 20, 20).code)
+        self.assertEqual(ls.Point3d(20, 20, 20, "TOE").code, "TOE")
+
+    def test_unpacking(self):
+        (x, y) = ls.Point2d(10, 11, "STN")
+        self.assertEqual((x, y), (10, 11))
+        (x, y, z) = ls.Point3d(20, 21, 22, "TOE")
+        self.assertEqual((x, y, z), (20, 21, 22))
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(ls.Point2d(10, 10), '__dict__'))
+        self.assertFalse(hasattr(ls.Point3d(20, 20, 20), '__dict__'))
+
+    @unittest.skipIf(tracemalloc is None, "tracemalloc needs python 3.4 or later")
+    def test_memory_one_million_points(self):
+        """
+            One million Point3d objects take less memory with __slots__ than the
+            dict backed Point3d they replaced
+        """
+        def peak(cls):
+            tracemalloc.start()
+            try:
+                points = [cls(255.751, 176.286, 42.623, "TOE") for i in range(1000000)]
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        before = peak(_DictPoint3d)
+        after = peak(ls.Point3d)
+        self.assertLess(after, before)
+
+
+class TestArrayConversions(unittest.TestCase):
+    """
+        Array conversions must give identical results to the scalar functions
+    """
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.dms = np.array([ls.dec2dms(d) for d in rng.uniform(-360, 360, 500)] +
+                            [20.3040, 342.2630, 180.0101, -359.5959, -2.1524, 0.0, 90.0])
+        self.radians = np.radians(rng.uniform(0, 360, 500))
+
+    def tearDown(self):
+        ls.Settings['bearing'] = 1
+
+    def test_dms2dec_array(self):
+        expected = [ls.dms2dec(d) for d in self.dms]
+        self.assertEqual(list(ls.dms2dec_array(self.dms)), expected)
+
+    def test_dec2dms_array(self):
+        dec = ls.dms2dec_array(self.dms)
+        expected = [ls.dec2dms(d) for d in dec]
+        self.assertEqual(list(ls.dec2dms_array(dec)), expected)
+
+    def test_bearings_dms(self):
+        expected = [ls.bearing_to_radians(d) for d in self.dms]
+        self.assertEqual(list(ls.bearing_to_radians_array(self.dms)), expected)
+        expected = [ls.radians_to_bearing(r) for r in self.radians]
+        self.assertEqual(list(ls.radians_to_bearing_array(self.radians)), expected)
+
+    def test_bearings_quadrants(self):
+        ls.Settings['bearing'] = 2
+        bearings = [ls.radians_to_bearing(r) for r in self.radians]
+        self.assertEqual(list(ls.radians_to_bearing_array(self.radians)), bearings)
+
+        expected = [ls.bearing_to_radians(b) for b in bearings]
+        self.assertEqual(list(ls.bearing_to_radians_array(bearings)), expected)
+
+    def test_bearings_gradians(self):
+        ls.Settings['bearing'] = 3
+        gradians = ls.radians_to_bearing_array(self.radians)
+        self.assertEqual(list(gradians), [ls.radians_to_bearing(r) for r in self.radians])
+        self.assertEqual(list(ls.bearing_to_radians_array(gradians)), [ls.bearing_to_radians(g) for g in gradians])
+
+
+class TestRadBatch(unittest.TestCase):
+    """
+        Batch radiation tests
+    """
+    def test_rad3d_batch(self):
+        point = ls.Point3d(255.751, 176.286, 42.623)
+        bearings = np.array([240.2520, 160.2520, 12.3015])
+        slope_distances = np.array([11.682, 15.162, 6.235])
+        zenith_angles = np.array([93.2230, 101.4430, 88.5959])
+        heights_target = np.array([1.690, 1.690, 0.0])
+        (x, y, z) = ls.rad3d_batch(point, bearings, slope_distances, zenith_angles, 1.565, heights_target)
+
+        for i in range(len(bearings)):
+            (sx, sy, sz) = ls.rad3d(point, bearings[i], slope_distances[i], zenith_angles[i], 1.565,
+                                    heights_target[i])
+            self.assertAlmostEqual(x[i], sx, places=9)
+            self.assertAlmostEqual(y[i], sy, places=9)
+            self.assertAlmostEqual(z[i], sz, places=9)
+
+        self.assertAlmostEqual(x[0], 245.609, places=3)
+        self.assertAlmostEqual(y[0], 170.530, places=3)
+        self.assertAlmostEqual(z[0], 41.810, places=3)
+
+    def test_rad2d_batch(self):
+        point = ls.Point2d(177413.0, 446111.0)
+        bearings = [12.3015, 212.3015]
+        distances = [6235.42, 100.0]
+        (x, y) = ls.rad2d_batch(point, bearings, distances)
+
+        self.assertAlmostEqual(x[0], 178763.03, places=2)
+        self.assertAlmostEqual(y[0], 452198.52, places=2)
+        (sx, sy) = ls.rad2d(point, bearings[1], distances[1])
+        self.assertAlmostEqual(x[1], sx, places=9)
+        self.assertAlmostEqual(y[1], sy, places=9)
+
+
+class TestBearingCodecs(unittest.TestCase):
+    """
+        Per call and per thread bearing conventions
+    """
+    def tearDown(self):
+        ls.Settings['bearing'] = 1
+        ls.use_bearing_codec(None)
+
+    def test_codec_matches_settings(self):
+        for number, codec in ((1, ls.DMS), (2, ls.QUADRANT), (3, ls.GRADIAN)):
+            ls.Settings['bearing'] = number
+            bearing = ls.radians_to_bearing(2.5)
+            ls.Settings['bearing'] = 1
+            self.assertEqual(ls.radians_to_bearing(2.5, codec), bearing)
+            self.assertEqual(ls.bearing_to_radians(bearing, codec), ls.bearing_to_radians(bearing, number))
+
+    def test_explicit_codec(self):
+        point1 = ls.Point2d(32255.751, 49076.286)
+        point2 = ls.Point2d(12231.864, 36939.667)
+        (dist, bearing) = ls.join2d(point1, point2, ls.QUADRANT)
+        self.assertEqual(bearing[0] + bearing[-1], "SW")
+
+        (x, y) = ls.rad2d(point1, bearing, dist, ls.QUADRANT)
+        self.assertAlmostEqual(x, point2.x, places=3)
+        self.assertAlmostEqual(y, point2.y, places=3)
+
+        (dist, bearing) = ls.join2d(point1, point2, ls.RADIAN)
+        self.assertAlmostEqual(bearing, ls.bearing_to_radians(238.4647), places=5)
+
+    def test_quadrant_text(self):
+        self.assertAlmostEqual(ls.QUADRANT.to_radians('S45.0000W'), np.radians(225.0))
+        for text in ('45.0000', 'N45.0000', 'E45.0000N', 'X45.0000W'):
+            self.assertRaises(ValueError, ls.QUADRANT.to_radians, text)
+            self.assertRaises(ValueError, ls.QUADRANT.to_radians_array, ['N10.0000E', text])
+
+    def test_thread_codecs(self):
+        """
+            Threads bound to different codecs do not affect each other
+        """
+        point1 = ls.Point2d(32255.751, 49076.286)
+        point2 = ls.Point2d(12231.864, 36939.667)
+        results = {}
+        barrier = threading.Event()
+
+        def work(codec):
+            ls.use_bearing_codec(codec)
+            barrier.wait()
+            results[codec] = [ls.join2d(point1, point2)[1] for i in range(200)]
+
+        threads = [threading.Thread(target=work, args=(codec,)) for codec in (ls.DMS, ls.QUADRANT, ls.GRADIAN)]
+        for thread in threads:
+            thread.start()
+        barrier.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(set(results[ls.DMS]), set([ls.join2d(point1, point2, ls.DMS)[1]]))
+        self.assertEqual(set(results[ls.QUADRANT]), set([ls.join2d(point1, point2, ls.QUADRANT)[1]]))
+        self.assertEqual(set(results[ls.GRADIAN]), set([ls.join2d(point1, point2, ls.GRADIAN)[1]]))
+
+        # the main thread still follows Settings
+        self.assertAlmostEqual(ls.join2d(point1, point2)[1], 238.4647, places=3)
+
+
+class TestSegmentIntersections(unittest.TestCase):
+    """
+        Sweep line segment intersection tests
+    """
+    def test_against_all_pairs(self):
+        rng = np.random.RandomState(3)
+        x = rng.uniform(0.0, 1000.0, 300)
+        y = rng.uniform(0.0, 1000.0, 300)
+        angle = rng.uniform(0.0, 2 * np.pi, 300)
+        length = rng.uniform(5.0, 80.0, 300)
+        starts = ls.PointArray(x, y)
+        ends = ls.PointArray(x + length * np.sin(angle), y + length * np.cos(angle))
+
+        (x, y, first, second) = ls.segment_intersections(starts, ends, block_size=50)
+
+        expected = []
+        for i in range(len(starts)):
+            for j in range(i + 1, len(starts)):
+                (rx, ry) = (ends.x[i] - starts.x[i], ends.y[i] - starts.y[i])
+                (sx, sy) = (ends.x[j] - starts.x[j], ends.y[j] - starts.y[j])
+                (qx, qy) = (starts.x[j] - starts.x[i], starts.y[j] - starts.y[i])
+                denominator = rx * sy - ry * sx
+                if round(denominator, 3) == 0:
+                    continue
+                t = (qx * sy - qy * sx) / denominator
+                u = (qx * ry - qy * rx) / denominator
+                if 0 <= t <= 1 and 0 <= u <= 1:
+                    expected.append((i, j, starts.x[i] + t * rx, starts.y[i] + t * ry))
+
+        self.assertTrue(len(expected) > 0)
+        self.assertEqual(list(zip(first.tolist(), second.tolist())), [(i, j) for (i, j, ix, iy) in expected])
+        np.testing.assert_allclose(x, [ix for (i, j, ix, iy) in expected], atol=1e-6)
+        np.testing.assert_allclose(y, [iy for (i, j, ix, iy) in expected], atol=1e-6)
+
+    def test_touching(self):
+        # three sides of a lot and a line crossing it
+        starts = ls.PointArray([0.0, 20.0, 20.0, 10.0], [0.0, 0.0, 30.0, -5.0])
+        ends = ls.PointArray([20.0, 20.0, 0.0, 10.0], [0.0, 30.0, 30.0, 40.0])
+
+        (x, y, first, second) = ls.segment_intersections(starts, ends)
+        self.assertEqual(list(zip(first.tolist(), second.tolist())), [(0, 1), (0, 3), (1, 2), (2, 3)])
+
+        (x, y, first, second) = ls.segment_intersections(starts, ends, touching=False)
+        self.assertEqual(list(zip(first.tolist(), second.tolist())), [(0, 3), (2, 3)])
+        np.testing.assert_allclose(x, [10.0, 10.0])
+        np.testing.assert_allclose(y, [0.0, 30.0])
+
+    def test_parallel(self):
+        starts = ls.PointArray([74184.946, 74185.176], [5404.450, 5399.176])
+        ends = ls.PointArray([74204.945, 74205.176], [5404.450, 5399.176])
+        (x, y, first, second) = ls.segment_intersections(starts, ends)
+        self.assertEqual(len(x), 0)
+
+    def test_collinear(self):
+        # overlapping, reversed, contained, end to end and separate segments along one line
+        starts = ls.PointArray([0.0, 15.0, 30.0, 45.0, 60.0, 80.0], [0.0, 0.0, 30.0, 45.0, 60.0, 80.0])
+        ends = ls.PointArray([10.0, 5.0, 50.0, 40.0, 70.0, 90.0], [0.0, 0.0, 50.0, 40.0, 70.0, 90.0])
+
+        (x, y, first, second) = ls.segment_intersections(starts, ends)
+        self.assertEqual(list(zip(first.tolist(), second.tolist())), [(0, 1), (0, 1), (2, 3), (2, 3)])
+        np.testing.assert_allclose(x, [5.0, 10.0, 40.0, 45.0])
+        np.testing.assert_allclose(y, [0.0, 0.0, 40.0, 45.0])
+
+        starts = ls.PointArray([0.0, 10.0, 0.0], [0.0, 0.0, 0.0])
+        ends = ls.PointArray([10.0, 20.0, 5.0], [0.0, 0.0, 0.0])
+        (x, y, first, second) = ls.segment_intersections(starts, ends)
+        self.assertEqual(list(zip(first.tolist(), second.tolist())), [(0, 1), (0, 2), (0, 2)])
+        np.testing.assert_allclose(x, [10.0, 0.0, 5.0])
+
+        (x, y, first, second) = ls.segment_intersections(starts, ends, touching=False)
+        self.assertEqual(list(zip(first.tolist(), second.tolist())), [(0, 2), (0, 2)])
+
+    def test_stacked(self):
+        # long segments stacked across x and crossed by a few long segments across y
+        y = np.arange(4000.0)
+        starts = ls.PointArray(np.append(np.zeros(4000), [100.5, 200.5]), np.append(y, [-1.0, -1.0]))
+        ends = ls.PointArray(np.append(np.full(4000, 1000.0), [100.5, 200.5]), np.append(y, [4000.0, 4000.0]))
+
+        (x, y, first, second) = ls.segment_intersections(starts, ends, block_size=1000)
+        self.assertEqual(len(x), 8000)
+        np.testing.assert_array_equal(second, np.tile([4000, 4001], 4000))
+        np.testing.assert_array_equal(first, np.repeat(np.arange(4000), 2))
+        np.testing.assert_allclose(x, np.tile([100.5, 200.5], 4000))
+
+
+class TestIntersectionArrays(unittest.TestCase):
+    """
+        Array intersection tests with validity masks
+    """
+    def test_two_line(self):
+        # lines a-c and b-d
+        pnt_a = ls.PointArray([0.0, 74184.946, 1101.61], [0.0, 5404.450, 1113.14])
+        pnt_b = ls.PointArray([5.0, 74185.176, 1134.86], [-5.0, 5399.176, 1061.14])
+        pnt_c = ls.PointArray([10.0, 74204.945, 1334.91], [0.0, 5404.450, 1098.36])
+        pnt_d = ls.PointArray([5.0, 74205.176, 1358.31], [5.0, 5399.176, 1211.90])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            (x, y, valid) = ls.two_line_intersection_array(pnt_a, pnt_b, pnt_c, pnt_d)
+
+        np.testing.assert_array_equal(valid, [True, False, True])
+        self.assertAlmostEqual(x[0], 5.0, places=9)
+        self.assertAlmostEqual(y[0], 0.0, places=9)
+        self.assertTrue(np.isnan(x[1]) and np.isnan(y[1]))
+        (sx, sy) = ls.two_line_intersection(pnt_a[2], pnt_b[2], pnt_c[2], pnt_d[2])
+        self.assertAlmostEqual(x[2], sx, places=6)
+        self.assertAlmostEqual(y[2], sy, places=6)
+
+    def test_bearing_bearing(self):
+        pnt_a = ls.Point2d(1000.0, 1000.0)
+        pnt_b = ls.PointArray([1100.0, 1100.0, 1100.0], [1000.0, 1000.0, 1100.0])
+        (x, y, valid) = ls.bearing_bearing_intersection_array(pnt_a, pnt_b, [45.0, 90.0, 45.0],
+                                                              [315.0, 0.0, 225.0])
+
+        np.testing.assert_array_equal(valid, [True, True, False])
+        self.assertAlmostEqual(x[0], 1050.0, places=6)
+        self.assertAlmostEqual(y[0], 1050.0, places=6)
+        # due east bearing where tan() is unbounded
+        self.assertAlmostEqual(x[1], 1100.0, places=6)
+        self.assertAlmostEqual(y[1], 1000.0, places=6)
+        self.assertTrue(np.isnan(x[2]) and np.isnan(y[2]))
+
+        (sx, sy) = ls.bearing_bearing_intersection(pnt_a, pnt_b[0], 45.0, 315.0)
+        self.assertAlmostEqual(x[0], sx, places=6)
+        self.assertAlmostEqual(y[0], sy, places=6)
+
+    def test_distance_distance(self):
+        pnt_a = ls.PointArray([0.0, 0.0, 0.0], [0.0, 0.0, 0.0])
+        pnt_b = ls.PointArray([6.0, 6.0, 0.0], [0.0, 0.0, 0.0])
+        (x1, y1, x2, y2, valid) = ls.distance_distance_intersection_array(pnt_a, pnt_b, [5.0, 2.0, 5.0],
+                                                                          [5.0, 2.0, 5.0])
+
+        np.testing.assert_array_equal(valid, [True, False, False])
+        self.assertAlmostEqual(x1[0], 3.0, places=9)
+        self.assertAlmostEqual(y1[0], -4.0, places=9)
+        self.assertAlmostEqual(x2[0], 3.0, places=9)
+        self.assertAlmostEqual(y2[0], 4.0, places=9)
+        self.assertTrue(np.all(np.isnan([x1[1:], y1[1:], x2[1:], y2[1:]])))
+
+        (sx1, sy1, sx2, sy2) = ls.distance_distance_intersection(pnt_a[0], pnt_b[0], 5.0, 5.0)
+        np.testing.assert_allclose([x1[0], y1[0], x2[0], y2[0]], [sx1, sy1, sx2, sy2])
+
+
+class TestKrugerSeriesOrder(unittest.TestCase):
+    """
+        Clenshaw summed Kruger series of order 4, 6 and 8
+    """
+    def setUp(self):
+        self.proj = ls.Projection(6378137.0, 298.257222101, 0.9996, 500000.0, 10000000.0)
+        rng = np.random.RandomState(2)
+        self.latitude = ls.dec2dms_array(rng.uniform(-80.0, 80.0, 5000))
+        self.longitude = ls.dec2dms_array(rng.uniform(144.0, 150.0, 5000))
+
+    def test_orders(self):
+        (easting, northing, m, grid_conv) = ls.gauss_kruger_array(self.latitude, self.longitude, 147.0, self.proj)
+        for order, tolerance in ((4, 1e-7), (6, 1e-8)):
+            result = ls.gauss_kruger_array(self.latitude, self.longitude, 147.0, self.proj, order=order)
+            self.assertTrue(np.abs(result[0] - easting).max() < tolerance)
+            self.assertTrue(np.abs(result[1] - northing).max() < tolerance)
+
+            (e, n, m, gc) = ls.gauss_kruger(self.latitude[0], self.longitude[0], 147.0, self.proj, order=order)
+            self.assertAlmostEqual(e, result[0][0], places=6)
+            self.assertAlmostEqual(n, result[1][0], places=6)
+
+    def test_inverse_orders(self):
+        (easting, northing, m, grid_conv) = ls.gauss_kruger_array(self.latitude, self.longitude, 147.0, self.proj)
+        for order in (4, 6, 8):
+            (latitude, longitude, m, grid_conv) = ls.gauss_kruger_inverse_array(easting, northing, 147.0, self.proj,
+                                                                                order=order)
+            self.assertTrue(np.abs(ls.dms2dec_array(latitude) - ls.dms2dec_array(self.latitude)).max() < 1e-11)
+            self.assertTrue(np.abs(ls.dms2dec_array(longitude) - ls.dms2dec_array(self.longitude)).max() < 1e-11)
+
+    def test_invalid_order(self):
+        with self.assertRaises(ValueError):
+            ls.gauss_kruger(-37.0, 147.0, 147.0, self.proj, order=5)
+        with self.assertRaises(ValueError):
+            ls.gauss_kruger_array(self.latitude, self.longitude, 147.0, self.proj, order=10)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,32 @@
+import unittest
+
+from benchmarks import bench
+
+
+class TestBenchmarks(unittest.TestCase):
+    """
+        Benchmark suite coverage and regression check tests
+    """
+    def test_every_public_function_has_a_case(self):
+        self.assertEqual(bench.missing_cases(), [])
+
+    def test_cases_run(self):
+        data = bench.Dataset(100)
+        for name in ['gauss_kruger', 'gauss_kruger_array', 'freestation_batch', 'PointIndex.nearest']:
+            (throughput, peak_memory) = bench.measure(bench.CASES[name], data, 100, min_time=0, repeat=1)
+            self.assertTrue(throughput > 0)
+
+    def test_import_time(self):
+        self.assertTrue(bench.measure_import(bench.IMPORTS['import[dms2dec]'], repeat=1) > 0)
+
+    def test_compare(self):
+        baseline = {'throughput': 1000.0, 'peak_memory': 10 * 1024 * 1024}
+        self.assertEqual(bench.compare('f', 1000, {'throughput': 800.0, 'peak_memory': None}, baseline, 0.25), [])
+        self.assertEqual(len(bench.compare('f', 1000, {'throughput': 700.0, 'peak_memory': None}, baseline, 0.25)), 1)
+        self.assertEqual(len(bench.compare('f', 1000, {'throughput': 700.0, 'peak_memory': None}, baseline, 0.5)), 0)
+        self.assertEqual(len(bench.compare('f', 1000, {'throughput': 1000.0, 'peak_memory': 20 * 1024 * 1024},
+                                           baseline, 0.25)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+import landsurvey as ls
+
+
+FIELD_FILE = """# test job
+STN,STN1,255.751,176.286,42.623,1.565
+OBS,TOE,240.2520,11.682,93.2230,1.690
+OBS,CREST,160.2520,15.162,101.4430,1.690
+OBS,PEG,12.3015,20.0,90.0000,1.690
+
+STN,STN2,301.245,299.215,35.214,1.565
+BS,STN1,255.751,176.286,0.0000
+OBS,TOE,10.0000,11.682,93.2230,1.690
+"""
+
+
+class TestReadFieldFile(unittest.TestCase):
+    """
+        Field file reader tests
+    """
+    def test_chunks(self):
+        chunks = list(ls.read_field_file(FIELD_FILE.splitlines(), chunk_size=2))
+
+        self.assertEqual([len(chunk) for setup, chunk in chunks], [2, 1, 1])
+        self.assertIs(chunks[0][0], chunks[1][0])
+        self.assertEqual(chunks[0][0].station.code, "STN1")
+        self.assertEqual(chunks[2][0].backsight.code, "STN1")
+        self.assertEqual(list(chunks[0][1].codes), ["TOE", "CREST"])
+
+    def test_read_path(self):
+        handle, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(handle, 'w') as f:
+                f.write(FIELD_FILE)
+            self.assertEqual(sum(len(chunk) for setup, chunk in ls.read_field_file(path)), 4)
+        finally:
+            os.remove(path)
+
+    def test_bad_record(self):
+        lines = ["STN,STN1,255.751,176.286,42.623,1.565", "OBS,TOE,240.2520"]
+        self.assertRaises(ValueError, list, ls.read_field_file(lines))
+        self.assertRaises(ValueError, list, ls.read_field_file(["OBS,TOE,240.2520,11.682,93.2230,1.690"]))
+
+
+class TestReduceFieldFile(unittest.TestCase):
+    """
+        Streaming reduction tests
+    """
+    def test_reduce(self):
+        reduced = list(ls.reduce_field_file(FIELD_FILE.splitlines(), chunk_size=2))
+        points = reduced[0][1]
+
+        # same results as reducing the first shot with rad3d
+        self.assertAlmostEqual(points.x[0], 245.609, places=3)
+        self.assertAlmostEqual(points.y[0], 170.530, places=3)
+        self.assertAlmostEqual(points.z[0], 41.810, places=3)
+        self.assertEqual(points.code[0], "TOE")
+
+    def test_backsight_orientation(self):
+        """
+            A circle reading of 0 to the backsight orients the setup to the bearing of the backsight
+        """
+        setup, points = list(ls.reduce_field_file(FIELD_FILE.splitlines()))[-1]
+        (distance, bearing) = ls.join2d(setup.station, setup.backsight)
+        oriented = ls.radians_to_bearing(ls.bearing_to_radians(bearing) + ls.bearing_to_radians(10.0))
+        (x, y, z) = ls.rad3d(setup.station, oriented, 11.682, 93.2230, 1.565, 1.690)
+
+        self.assertAlmostEqual(points.x[0], x, places=6)
+        self.assertAlmostEqual(points.y[0], y, places=6)
+        self.assertAlmostEqual(points.z[0], z, places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import unittest
+import landsurvey as ls
+
+
+def run(statement):
+    """ Output of a script run in a new interpreter
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+    return subprocess.check_output([sys.executable, '-c', statement], env=env).decode('ascii').split()
+
+
+class TestLazyImport(unittest.TestCase):
+    """
+        Lazy submodule and numpy loading tests
+    """
+    def test_scalar_functions_do_not_import_numpy(self):
+        loaded = run("import sys, landsurvey as ls; ls.dms2dec(10.3); ls.join2d(ls.Point2d(0, 0), ls.Point2d(1, 1)); "
+                     "print(' '.join(sorted(name for name in sys.modules if sys.modules[name] is not None)))")
+        self.assertNotIn('numpy', loaded)
+        self.assertIn('landsurvey.calc', loaded)
+        self.assertNotIn('landsurvey.resection', loaded)
+        self.assertNotIn('landsurvey.geo', loaded)
+
+        loaded = run("import sys, landsurvey as ls; ls.dms2dec_array([10.3]); "
+                     "print(' '.join(sorted(name for name in sys.modules if sys.modules[name] is not None)))")
+        self.assertIn('numpy', loaded)
+
+    def test_public_names(self):
+        names = dir(ls)
+        for name in ['dms2dec', 'gauss_kruger', 'freestation_batch', 'PointIndex', 'calc', 'geo']:
+            self.assertIn(name, names)
+        self.assertNotIn('importlib', names)
+        self.assertEqual(ls.__all__, sorted(ls.__all__))
+        for name in ls.__all__:
+            self.assertTrue(getattr(ls, name) is not None)
+
+        from landsurvey import gauss_kruger, calc
+        self.assertIs(gauss_kruger, ls.geo.gauss_kruger)
+        self.assertIs(calc.join2d, ls.join2d)
+        with self.assertRaises(AttributeError):
+            ls.no_such_function
+        with self.assertRaises(ImportError):
+            from landsurvey import no_such_function
+
+    def test_star_import(self):
+        self.assertEqual(run("from landsurvey import *; print('%.1f %s' % (dms2dec(10.3), PointArray.__name__))"),
+                         ['10.5', 'PointArray'])
+
+
+if __name__ == '__main__':
+    unittest.main()
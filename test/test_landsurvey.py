@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import unittest
+import landsurvey as ls
+from landsurvey.landsurvey import main
+
+import numpy as np
+
+from test.test_fieldfile import FIELD_FILE
+
+
+class TestCommand(unittest.TestCase):
+    """
+        landsurvey command line batch processor tests
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, 'out.csv')
+        self.proj = ls.Projection(6378137.0, 298.257222101, 0.9996, 500000.0, 10000000.0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, rows):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write('\n'.join(rows) + '\n')
+        return path
+
+    def run_command(self, *argv):
+        self.assertEqual(main(list(argv) + ['--quiet']), 0)
+        with open(self.output) as f:
+            return [line.rstrip('\n').split(',') for line in f]
+
+    def column(self, rows, i):
+        return np.array([float(row[i]) for row in rows])
+
+    def test_project(self):
+        rng = np.random.RandomState(3)
+        longitude = ls.dec2dms_array(rng.uniform(144, 150, 25))
+        latitude = ls.dec2dms_array(rng.uniform(-38, -30, 25))
+        path = self.write('geo.csv', ['code,longitude,latitude'] +
+                          ['P%d,%.12f,%.12f' % (i, x, y) for i, (x, y) in enumerate(zip(longitude, latitude))])
+
+        rows = self.run_command('project', path, self.output, '--central-meridian', '147', '--header',
+                                '--chunk-size', '4')
+        (easting, northing, m, grid_conv) = ls.gauss_kruger_array(latitude, longitude, 147.0, self.proj)
+        self.assertEqual([row[0] for row in rows], ['P%d' % i for i in range(25)])
+        np.testing.assert_allclose(self.column(rows, 1), easting, atol=1e-4)
+        np.testing.assert_allclose(self.column(rows, 2), northing, atol=1e-4)
+        np.testing.assert_allclose(self.column(rows, 3), m, atol=1e-10)
+
+        # the same points from a point file, with heights
+        points = os.path.join(self.directory, 'geo.lspt')
+        ls.write_point_file(points, ls.PointArray(longitude, latitude, np.arange(25.0),
+                                                  ['P%d' % i for i in range(25)]))
+        rows3d = self.run_command('project', points, self.output, '--central-meridian', '147', '--chunk-size', '7')
+        self.assertEqual([row[:3] for row in rows3d], [row[:3] for row in rows])
+        np.testing.assert_allclose(self.column(rows3d, 3), np.arange(25.0))
+
+    def test_join(self):
+        x = [100.0, 110.0, 110.0, 90.0, 95.5]
+        y = [200.0, 210.0, 190.0, 190.0, 215.25]
+        path = self.write('points.csv', ['P%d,%.12f,%.12f' % (i, x[i], y[i]) for i in range(5)])
+
+        # from the previous point, across chunk boundaries
+        rows = self.run_command('join', path, self.output, '--chunk-size', '2')
+        (distance, bearing) = ls.join2d(ls.PointArray(x[:-1], y[:-1]), ls.PointArray(x[1:], y[1:]))
+        self.assertEqual([row[0] for row in rows], ['P1', 'P2', 'P3', 'P4'])
+        np.testing.assert_allclose(self.column(rows, 1), bearing, atol=1e-8)
+        np.testing.assert_allclose(self.column(rows, 2), distance, atol=1e-4)
+
+        # from a station, in quadrant bearings
+        rows = self.run_command('join', path, self.output, '--station', '100,200', '--bearing', '2')
+        (distance, bearing) = ls.join2d(ls.Point2d(100.0, 200.0), ls.PointArray(x, y), ls.QUADRANT)
+        self.assertEqual([row[1] for row in rows[1:]], list(bearing[1:]))
+        np.testing.assert_allclose(self.column(rows, 2), distance, atol=1e-4)
+
+    def test_radiate(self):
+        observations = [(240.2520, 11.682, 93.2230, 1.690), (160.2520, 15.162, 101.4430, 1.690),
+                        (12.3015, 20.0, 90.0000, 1.5)]
+        path = self.write('obs.csv', ['P%d,%.12f,%.12f,%.12f,%.12f' % ((i,) + obs)
+                                      for i, obs in enumerate(observations)])
+        rows = self.run_command('radiate', path, self.output, '--station', '255.751,176.286,42.623', '--hi', '1.565',
+                                '--chunk-size', '2')
+
+        (bearings, slope_distances, zenith_angles, heights_target) = zip(*observations)
+        (x, y, z) = ls.rad3d_batch(ls.Point3d(255.751, 176.286, 42.623), bearings, slope_distances, zenith_angles,
+                                   1.565, heights_target)
+        np.testing.assert_allclose(self.column(rows, 1), x, atol=1e-4)
+        np.testing.assert_allclose(self.column(rows, 3), z, atol=1e-4)
+
+        # a field file
+        path = self.write('job.txt', FIELD_FILE.splitlines())
+        rows = self.run_command('radiate', path, self.output, '--field-file', '--chunk-size', '2')
+        points = [points for setup, points in ls.reduce_field_file(path)]
+        self.assertEqual([row[0] for row in rows], [code for pnts in points for code in pnts.code])
+        np.testing.assert_allclose(self.column(rows, 2), np.concatenate([pnts.y for pnts in points]), atol=1e-4)
+
+    def test_reduce_levels(self):
+        rng = np.random.RandomState(11)
+        n = 23
+        hi = rng.uniform(1.4, 1.7, n)
+        sd = rng.uniform(20, 150, n)
+        za = ls.dec2dms_array(rng.uniform(85, 95, n))
+        ht = rng.uniform(1.4, 1.7, n)
+        path = self.write('legs.csv', ['L%d,%.12f,%.12f,%.12f,%.12f' % (i, hi[i], sd[i], za[i], ht[i])
+                                       for i in range(n)])
+
+        for method in ('distance', 'setups'):
+            rows = self.run_command('reduce-levels', path, self.output, '--start-level', '100', '--end-level',
+                                    '101.25', '--method', method, '--chunk-size', '5')
+            (levels, misclose, length) = ls.reduce_level_run(100.0, hi, sd, za, ht, 101.25, method)
+            self.assertEqual(len(rows), n)
+            np.testing.assert_allclose(self.column(rows, 1), levels, atol=1e-4)
+            self.assertAlmostEqual(float(rows[-1][1]), 101.25, places=4)
+
+    def test_errors(self):
+        path = self.write('bad.csv', ['P1,1.0,2.0', 'P2,1.0,2.0,3.0'])
+        self.assertEqual(main(['join', path, self.output, '--quiet']), 1)
+        self.assertFalse(os.path.exists(self.output))
+        self.assertEqual(main(['join', os.path.join(self.directory, 'missing.csv'), self.output, '--quiet']), 1)
+        self.assertFalse(os.path.exists(self.output))
+        self.assertEqual(main(['join', path, os.path.join(self.directory, 'missing', 'out.csv'), '--quiet']), 1)
+        self.assertEqual(main(['reduce-levels', '-', self.output, '--start-level', '100', '--quiet']), 1)
+        self.assertEqual(main(['radiate', path, self.output, '--quiet']), 1)
+
+        # numeric bearings are not quadrant bearings
+        path = self.write('obs.csv', ['P1,45.0000,10.0,90.0000,1.5'])
+        self.assertEqual(main(['radiate', path, self.output, '--station', '0,0,0', '--hi', '1.5', '--bearing', '2',
+                               '--quiet']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
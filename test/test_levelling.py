@@ -0,0 +1,84 @@
+import unittest
+import landsurvey as ls
+
+import numpy as np
+
+
+class TestLevelling(unittest.TestCase):
+    """
+        Levelling run reduction tests
+    """
+    def setUp(self):
+        self.hi = [1.550, 1.602, 1.498, 1.575]
+        self.sd = [120.415, 98.207, 143.881, 110.362]
+        self.za = [88.1520, 91.0430, 90.3015, 89.4510]
+        self.ht = [1.700, 1.650, 1.500, 1.600]
+
+    def test_unadjusted_levels_match_rad3d(self):
+        # a run closing on a level equal to the computed one is not adjusted
+        rl = 100.0
+        expected = []
+        for hi, sd, za, ht in zip(self.hi, self.sd, self.za, self.ht):
+            (x, y, rl) = ls.rad3d(ls.Point3d(0.0, 0.0, rl), 0.0, sd, za, hi, ht)
+            expected.append(rl)
+
+        (levels, misclose, length) = ls.reduce_level_run(100.0, self.hi, self.sd, self.za, self.ht,
+                                                         end_level=expected[-1])
+        np.testing.assert_allclose(levels, expected, rtol=0, atol=1e-9)
+        self.assertAlmostEqual(misclose, 0.0, places=9)
+
+        # reduced_level reduces each station back from its forward observation
+        for i in range(1, len(levels)):
+            rl = ls.reduced_level(levels[i], self.hi[i], self.sd[i], self.za[i], self.ht[i])
+            self.assertAlmostEqual(rl, levels[i - 1], places=9)
+
+    def test_closed_loop_by_distance(self):
+        (levels, misclose, length) = ls.reduce_level_run(100.0, self.hi, self.sd, self.za, self.ht)
+
+        horizontal = np.array(self.sd) * np.sin(np.radians(ls.dms2dec_array(self.za)))
+        self.assertAlmostEqual(length, horizontal.sum(), places=9)
+        self.assertAlmostEqual(levels[-1], 100.0, places=9)
+
+        unadjusted = 100.0 + np.cumsum(np.array(self.hi) + np.array(self.sd) *
+                                       np.cos(np.radians(ls.dms2dec_array(self.za))) - np.array(self.ht))
+        self.assertAlmostEqual(misclose, unadjusted[-1] - 100.0, places=9)
+        np.testing.assert_allclose(levels, unadjusted - misclose * np.cumsum(horizontal) / length, atol=1e-9)
+
+    def test_closed_loop_by_setups(self):
+        (levels, misclose, length) = ls.reduce_level_run(100.0, self.hi, self.sd, self.za, self.ht,
+                                                         end_level=100.5, method='setups')
+        unadjusted = levels + misclose * np.arange(1, 5) / 4.0
+        self.assertAlmostEqual(levels[-1], 100.5, places=9)
+        self.assertAlmostEqual(misclose, unadjusted[-1] - 100.5, places=9)
+        np.testing.assert_allclose(np.diff(unadjusted - levels), misclose / 4.0, atol=1e-9)
+
+    def test_batch_matches_single_runs(self):
+        # three runs of 4, 1 and 3 legs
+        hi = self.hi + [1.5] + self.hi[:3]
+        sd = self.sd + [75.0] + self.sd[:3]
+        za = self.za + [87.3000] + self.za[:3]
+        ht = self.ht + [1.6] + self.ht[:3]
+        offsets = [0, 4, 5]
+        starts = [100.0, 50.0, 20.0]
+        ends = [100.02, 53.1, 19.0]
+
+        for method in ('distance', 'setups'):
+            (levels, misclose, length) = ls.reduce_level_runs(starts, hi, sd, za, ht, offsets, ends, method)
+            self.assertEqual(levels.shape, (8,))
+            for i, (start, stop) in enumerate(zip(offsets, offsets[1:] + [8])):
+                (lv, mc, ln) = ls.reduce_level_run(starts[i], hi[start:stop], sd[start:stop], za[start:stop],
+                                                   ht[start:stop], ends[i], method)
+                np.testing.assert_allclose(levels[start:stop], lv, atol=1e-9)
+                self.assertAlmostEqual(misclose[i], mc, places=9)
+                self.assertAlmostEqual(length[i], ln, places=9)
+                self.assertAlmostEqual(levels[stop - 1], ends[i], places=9)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            ls.reduce_level_run(100.0, self.hi, self.sd, self.za, self.ht, method='angles')
+        with self.assertRaises(ValueError):
+            ls.reduce_level_runs(100.0, self.hi, self.sd, self.za, self.ht, [0, 2, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
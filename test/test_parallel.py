@@ -0,0 +1,60 @@
+import unittest
+import landsurvey as ls
+
+import numpy as np
+
+
+class TestGaussKrugerParallel(unittest.TestCase):
+    """
+        Parallel projection must match gauss_kruger_array bit for bit
+    """
+    def setUp(self):
+        self.proj = ls.Projection(6378137.0, 298.257222101, 0.9996, 500000.0, 10000000.0)
+        rng = np.random.RandomState(11)
+        self.latitude = ls.dec2dms_array(rng.uniform(-38.0, -30.0, 10001))
+        self.longitude = ls.dec2dms_array(rng.uniform(144.0, 150.0, 10001))
+        self.central_meridian = np.where(rng.uniform(0, 1, 10001) > 0.5, 147.0, 141.0)
+
+    def assertIdentical(self, expected, result):
+        self.assertEqual(len(expected), len(result))
+        for a, b in zip(expected, result):
+            self.assertTrue(np.array_equal(a, b))
+
+    def test_matches_single_process(self):
+        expected = ls.gauss_kruger_array(self.latitude, self.longitude, 147.0, self.proj)
+        result = ls.gauss_kruger_parallel(self.latitude, self.longitude, 147.0, self.proj, workers=2,
+                                          chunk_size=997)
+        self.assertIdentical(expected, result)
+
+    def test_central_meridian_array(self):
+        expected = ls.gauss_kruger_array(self.latitude, self.longitude, self.central_meridian, self.proj)
+        result = ls.gauss_kruger_parallel(self.latitude, self.longitude, self.central_meridian, self.proj,
+                                          workers=3, chunk_size=2500)
+        self.assertIdentical(expected, result)
+
+    def test_codec(self):
+        latitude = ls.dms2dec_array(self.latitude)
+        longitude = ls.dms2dec_array(self.longitude)
+        codec = ls.bearing_codec(3)
+        expected = ls.gauss_kruger_array(latitude * 400 / 360.0, longitude * 400 / 360.0, 163.333333333, self.proj,
+                                         codec)
+        ls.use_bearing_codec(codec)
+        try:
+            result = ls.gauss_kruger_parallel(latitude * 400 / 360.0, longitude * 400 / 360.0, 163.333333333,
+                                              self.proj, workers=2, chunk_size=4000)
+        finally:
+            ls.use_bearing_codec(None)
+        self.assertIdentical(expected, result)
+
+    def test_single_worker(self):
+        expected = ls.gauss_kruger_array(self.latitude, self.longitude, 147.0, self.proj)
+        result = ls.gauss_kruger_parallel(self.latitude, self.longitude, 147.0, self.proj, workers=1)
+        self.assertIdentical(expected, result)
+
+    def test_chunk_size(self):
+        with self.assertRaises(ValueError):
+            ls.gauss_kruger_parallel(self.latitude, self.longitude, 147.0, self.proj, chunk_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
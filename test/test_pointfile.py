@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import unittest
+import landsurvey as ls
+
+import numpy as np
+
+
+class TestPointFile(unittest.TestCase):
+    """
+        Memory mapped point file tests
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'job.lspt')
+        self.proj = ls.Projection(6378137.0, 298.257222101, 0.9996, 500000.0, 10000000.0)
+        rng = np.random.RandomState(5)
+        self.points = ls.PointArray(rng.uniform(500000, 510000, 1000), rng.uniform(7000000, 7010000, 1000),
+                                    rng.uniform(10, 50, 1000), ['P%d' % i for i in range(1000)])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        ls.write_point_file(self.path, self.points, self.proj, codec=2)
+        points = ls.open_point_file(self.path)
+
+        self.assertEqual(len(points), 1000)
+        self.assertTrue(isinstance(points.x, np.memmap))
+        np.testing.assert_array_equal(points.x, self.points.x)
+        np.testing.assert_array_equal(points.y, self.points.y)
+        np.testing.assert_array_equal(points.z, self.points.z)
+        self.assertEqual(list(points.code), list(self.points.code))
+        self.assertIs(points.codec, ls.QUADRANT)
+        self.assertEqual(points.projection.a, self.proj.a)
+        self.assertEqual(points.projection.false_northing, self.proj.false_northing)
+
+    def test_indexing(self):
+        ls.write_point_file(self.path, self.points)
+        points = ls.open_point_file(self.path)
+
+        pnt = points[-1]
+        self.assertTrue(isinstance(pnt, ls.Point3d))
+        self.assertEqual((pnt.x, pnt.y, pnt.z, pnt.code),
+                         (self.points.x[-1], self.points.y[-1], self.points.z[-1], 'P999'))
+
+        subset = points[10:20]
+        self.assertTrue(isinstance(subset, ls.PointArray))
+        np.testing.assert_array_equal(subset.x, self.points.x[10:20])
+        self.assertEqual(list(subset.code), ['P%d' % i for i in range(10, 20)])
+        self.assertIsNone(points.projection)
+
+    def test_calc(self):
+        ls.write_point_file(self.path, self.points)
+        points = ls.open_point_file(self.path)
+
+        (distance, bearing) = ls.join2d(points[:-1], points[1:])
+        (expected_distance, expected_bearing) = ls.join2d(self.points[:-1], self.points[1:])
+        np.testing.assert_array_equal(distance, expected_distance)
+        np.testing.assert_array_equal(bearing, expected_bearing)
+
+        index = ls.PointIndex(points)
+        self.assertEqual(index.nearest(self.points[3])[0][0], 3)
+
+    def test_2d_points_without_codes(self):
+        ls.write_point_file(self.path, [ls.Point2d(1.0, 2.0), ls.Point2d(3.0, 4.0)])
+        points = ls.open_point_file(self.path)
+
+        self.assertIsNone(points.z)
+        self.assertIsNone(points.code)
+        self.assertEqual([tuple(pnt) for pnt in points], [(1.0, 2.0), (3.0, 4.0)])
+
+    def test_empty_and_missing_codes(self):
+        ls.write_point_file(self.path, [ls.Point2d(1.0, 2.0, 'CP1'), ls.Point2d(3.0, 4.0)])
+        self.assertEqual(list(ls.open_point_file(self.path).code), ['CP1', None])
+
+        ls.write_point_file(self.path, [])
+        self.assertEqual(len(ls.open_point_file(self.path)), 0)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            ls.write_point_file(self.path, self.points, code_width=2)
+        with open(self.path, 'wb') as f:
+            f.write(b'x,y,z\n1,2,3\n')
+        with self.assertRaises(ValueError):
+            ls.open_point_file(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import landsurvey as ls
+
+import numpy as np
+
+
+class TestPolygons(unittest.TestCase):
+    """
+        Polygon area, perimeter, centroid and closing line tests
+    """
+    def setUp(self):
+        # a 20 x 10 rectangle (clockwise) and a right triangle (anticlockwise) at MGA coordinates
+        self.rings = [[(500000.0, 7000000.0), (500000.0, 7000010.0), (500020.0, 7000010.0), (500020.0, 7000000.0)],
+                      [(600000.0, 6000000.0), (600030.0, 6000000.0), (600000.0, 6000040.0)]]
+        self.polygons = ls.PolygonArray.from_rings(self.rings, ['LOT1', 'LOT2'])
+
+    def test_storage(self):
+        self.assertEqual(len(self.polygons), 2)
+        self.assertEqual(list(self.polygons.offsets), [0, 4])
+        self.assertEqual(len(self.polygons.x), 7)
+        ring = self.polygons[1]
+        self.assertEqual(list(ring.x), [600000.0, 600030.0, 600000.0])
+        self.assertEqual(len(list(self.polygons)), 2)
+
+        points = ls.PointArray([0.0, 1.0, 1.0], [0.0, 0.0, 1.0])
+        polygons = ls.PolygonArray.from_rings([points, [ls.Point2d(0.0, 0.0), ls.Point2d(2.0, 0.0),
+                                                        ls.Point2d(0.0, 2.0)]])
+        np.testing.assert_allclose(ls.polygon_area(polygons), [0.5, 2.0])
+
+        with self.assertRaises(ValueError):
+            ls.PolygonArray([0.0, 1.0, 1.0, 0.0], [0.0, 0.0, 1.0, 1.0], [0, 2])
+        with self.assertRaises(ValueError):
+            ls.PolygonArray([0.0, 1.0, 1.0], [0.0, 0.0, 1.0], [0], ['A', 'B'])
+
+    def test_area_perimeter_centroid(self):
+        np.testing.assert_allclose(ls.polygon_area(self.polygons), [200.0, 600.0], rtol=0, atol=1e-9)
+        np.testing.assert_allclose(ls.polygon_area(self.polygons, signed=True), [-200.0, 600.0], rtol=0, atol=1e-9)
+        np.testing.assert_allclose(ls.polygon_perimeter(self.polygons), [60.0, 120.0], rtol=0, atol=1e-9)
+
+        (x, y) = ls.polygon_centroid(self.polygons)
+        np.testing.assert_allclose(x, [500010.0, 600010.0], rtol=0, atol=1e-9)
+        np.testing.assert_allclose(y, [7000005.0, 6000040.0 / 3 + 4000000.0], rtol=0, atol=1e-9)
+
+    def test_closing(self):
+        (distance, bearing) = ls.polygon_closing(self.polygons)
+        for i, ring in enumerate(self.rings):
+            (d, b) = ls.join2d(ls.Point2d(*ring[-1]), ls.Point2d(*ring[0]))
+            self.assertAlmostEqual(distance[i], d, places=9)
+            self.assertAlmostEqual(bearing[i], b, places=9)
+
+        (distance, bearing) = ls.polygon_closing(self.polygons, ls.QUADRANT)
+        self.assertEqual(bearing[0], ls.join2d(ls.Point2d(*self.rings[0][-1]), ls.Point2d(*self.rings[0][0]),
+                                               ls.QUADRANT)[1])
+
+    def test_matches_per_ring_loop(self):
+        rng = np.random.RandomState(7)
+        counts = rng.randint(3, 12, 200)
+        rings = []
+        for count in counts:
+            # star shaped rings around a random centre, so they do not self intersect
+            angles = np.sort(rng.uniform(0, 2 * np.pi, count))
+            radii = rng.uniform(5, 50, count)
+            rings.append(ls.PointArray(rng.uniform(500000, 510000) + radii * np.sin(angles),
+                                       rng.uniform(7000000, 7010000) + radii * np.cos(angles)))
+        polygons = ls.PolygonArray.from_rings(rings)
+
+        area = ls.polygon_area(polygons)
+        perimeter = ls.polygon_perimeter(polygons)
+        for i, ring in enumerate(rings):
+            x = ring.x - ring.x[0]
+            y = ring.y - ring.y[0]
+            self.assertAlmostEqual(area[i], abs(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)) / 2, places=6)
+            legs = [ls.join2d(ring[j], ring[(j + 1) % len(ring)])[0] for j in range(len(ring))]
+            self.assertAlmostEqual(perimeter[i], sum(legs), places=6)
+
+    def test_empty(self):
+        polygons = ls.PolygonArray([], [], [])
+        self.assertEqual(len(ls.polygon_area(polygons)), 0)
+        self.assertEqual(len(ls.polygon_closing(polygons)[0]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import landsurvey as ls
+from landsurvey import calc, conversion
+
+import numpy as np
+
+
+class TestProfiling(unittest.TestCase):
+    """
+        Opt-in profiling tests
+    """
+    def setUp(self):
+        ls.reset_profile()
+        self.proj = ls.Projection(6378137.0, 298.257222101, 0.9996, 500000.0, 10000000.0)
+
+    def tearDown(self):
+        ls.disable_profiling()
+        ls.reset_profile()
+
+    def test_disabled_leaves_functions_unwrapped(self):
+        functions = (ls.gauss_kruger, calc.bearing_codec, conversion.QuadrantCodec.__dict__['to_radians'])
+        ls.enable_profiling()
+        self.assertTrue(ls.profiling_enabled())
+        self.assertIsNot(ls.gauss_kruger, functions[0])
+        self.assertIsNot(calc.bearing_codec, functions[1])
+        ls.disable_profiling()
+
+        self.assertFalse(ls.profiling_enabled())
+        self.assertIs(ls.gauss_kruger, functions[0])
+        self.assertIs(calc.bearing_codec, functions[1])
+        self.assertIs(conversion.QuadrantCodec.__dict__['to_radians'], functions[2])
+
+        ls.gauss_kruger(-37.391015, 143.553622, 141.0, self.proj)
+        self.assertEqual(ls.profile_stats(), {})
+
+    def test_calls_and_sizes(self):
+        latitudes = ls.dec2dms_array(np.linspace(-38.0, -30.0, 250))
+        longitudes = ls.dec2dms_array(np.linspace(144.0, 150.0, 250))
+        with ls.profiled():
+            ls.gauss_kruger_array(latitudes, longitudes, 147.0, self.proj)
+            ls.gauss_kruger_array(latitudes[:50], longitudes[:50], 147.0, self.proj)
+            ls.bearing_to_radians('N45.3000E', codec=ls.QUADRANT)
+        self.assertFalse(ls.profiling_enabled())
+
+        stats = ls.profile_stats()
+        self.assertEqual(stats['gauss_kruger_array']['calls'], 2)
+        self.assertEqual(stats['gauss_kruger_array']['items'], 300)
+        self.assertGreater(stats['gauss_kruger_array']['time'], 0.0)
+
+        # calls made inside the library and codec methods are recorded too
+        self.assertGreaterEqual(stats['bearing_codec']['calls'], 3)
+        self.assertEqual(stats['QuadrantCodec.to_radians']['calls'], 1)
+        self.assertNotIn('iterations', stats['gauss_kruger_array'])
+
+    def test_resection_iterations(self):
+        data = np.vstack([[11813.150, 54078.732, 18.147, 188.2100],
+                          [11834.832, 54079.154, 4.334, 329.1659]])
+        ls.enable_profiling()
+        (xu, yu, v, cnt) = ls.freestation_2point(data)
+        ls.freestation_2point(data)
+
+        stats = ls.profile_stats()['freestation_2point']
+        self.assertEqual(stats['calls'], 2)
+        self.assertEqual(stats['items'], 4)
+        self.assertEqual(stats['iterations'], 2 * cnt)
+
+        report = ls.profile_report()
+        self.assertIn('freestation_2point', report)
+        self.assertEqual(report.splitlines()[0].split()[0], 'function')
+
+        ls.reset_profile()
+        self.assertEqual(ls.profile_stats(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
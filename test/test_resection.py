@@ -0,0 +1,156 @@
+import math
+import unittest
+import landsurvey as ls
+
+import numpy as np
+
+
+def _observe(station, targets, orientation, rng=None):
+    """
+        Distances and direction readings (dd.mmss) from a station to targets
+    """
+    dx = targets[:, 0] - station[0]
+    dy = targets[:, 1] - station[1]
+    dist = np.hypot(dx, dy)
+    directions = np.arctan2(dx, dy) - orientation
+    if rng is not None:
+        dist = dist + rng.normal(0, 0.001, len(dist))
+        directions = directions + rng.normal(0, math.radians(2 / 3600.0), len(dist))
+    return np.column_stack([targets, dist, ls.radians_to_bearing_array(directions % (2 * math.pi))])
+
+
+class TestFreestation(unittest.TestCase):
+    """
+        N target least squares freestation tests
+    """
+    def setUp(self):
+        self.station = np.array([11831.105, 54081.366])
+        self.orientation = math.radians(123.4)
+        rng = np.random.RandomState(7)
+        self.targets = self.station + rng.uniform(-150, 150, (8, 2))
+        self.rng = rng
+
+    def test_exact_observations(self):
+        data = _observe(self.station, self.targets, self.orientation)
+        (xu, yu, v, cnt, converged, cov) = ls.freestation(data)
+
+        self.assertTrue(converged)
+        self.assertAlmostEqual(xu, self.station[0], places=6)
+        self.assertAlmostEqual(yu, self.station[1], places=6)
+        self.assertEqual(len(v), 16)
+        self.assertEqual(cov.shape, (2, 2))
+
+    def test_noisy_observations(self):
+        data = _observe(self.station, self.targets, self.orientation, self.rng)
+        (xu, yu, v, cnt, converged, cov) = ls.freestation(data)
+
+        self.assertTrue(converged)
+        self.assertAlmostEqual(xu, self.station[0], places=2)
+        self.assertAlmostEqual(yu, self.station[1], places=2)
+
+        # standard errors are millimetre level for 1mm distances and 2 second directions
+        self.assertTrue(np.all(np.sqrt(np.diag(cov)) < 0.005))
+
+    def test_directions_only(self):
+        data = _observe(self.station, self.targets[:4], self.orientation)
+        data[:, 2] = np.nan
+        (xu, yu, v, cnt, converged, cov) = ls.freestation(data)
+
+        self.assertTrue(converged)
+        self.assertAlmostEqual(xu, self.station[0], places=6)
+        self.assertAlmostEqual(yu, self.station[1], places=6)
+
+    def test_distances_only(self):
+        data = _observe(self.station, self.targets[:3], self.orientation)
+        data[:, 3] = np.nan
+        (xu, yu, v, cnt, converged, cov) = ls.freestation(data)
+
+        self.assertAlmostEqual(xu, self.station[0], places=6)
+        self.assertAlmostEqual(yu, self.station[1], places=6)
+
+    def test_not_converged(self):
+        data = _observe(self.station, self.targets, self.orientation, self.rng)
+        (xu, yu, v, cnt, converged, cov) = ls.freestation(data, tolerance=0.0, max_iterations=3)
+
+        self.assertFalse(converged)
+        self.assertEqual(cnt, 3)
+
+    def test_too_few_observations(self):
+        data = _observe(self.station, self.targets[:2], self.orientation)
+        data[:, 2] = np.nan
+        self.assertRaises(ValueError, ls.freestation, data)
+
+    def test_two_point(self):
+        # freestation_2point fixes the station from the distances, freestation also
+        # uses the angle between the targets, which these readings only fit clockwise
+        # from the mirror station
+        data = np.array([[11813.150, 54078.732, 18.147, 188.2100],
+                         [11834.832, 54079.154, 4.334, 329.1659]])
+        (xu, yu, v, cnt, converged, cov) = ls.freestation(data)
+        self.assertTrue(converged)
+        self.assertAlmostEqual(xu, 11831.194, places=3)
+        self.assertAlmostEqual(yu, 54076.797, places=3)
+
+        # read anticlockwise, the same angle fits the station of freestation_2point
+        data[:, 3] = ls.radians_to_bearing_array(-ls.bearing_to_radians_array(data[:, 3]) % (2 * math.pi))
+        (xu, yu, v, cnt, converged, cov) = ls.freestation(data)
+        (xu2, yu2, v2, cnt2) = ls.freestation_2point(data)
+        self.assertAlmostEqual(xu, 11831.105, places=2)
+        self.assertAlmostEqual(yu, 54081.366, places=2)
+        self.assertAlmostEqual(xu, xu2, places=2)
+        self.assertAlmostEqual(yu, yu2, places=2)
+
+
+class TestFreestationBatch(unittest.TestCase):
+    """
+        Batch freestation tests
+    """
+    def setUp(self):
+        rng = np.random.RandomState(11)
+        self.stations = rng.uniform(0, 1000, (5, 2))
+        self.data = np.full((5, 6, 4), np.nan)
+        for i, station in enumerate(self.stations):
+            ntargets = 3 + i % 4
+            targets = station + rng.uniform(-150, 150, (ntargets, 2))
+            self.data[i, :ntargets] = _observe(station, targets, rng.uniform(0, 2 * math.pi), rng)
+
+        # one setup with distances only and one without enough observations
+        self.data[3, :, 3] = np.nan
+        self.data[4, 1:] = np.nan
+
+    def test_matches_freestation(self):
+        (xu, yu, cnt, converged, cov) = ls.freestation_batch(self.data)
+
+        for i in range(4):
+            targets = self.data[i][~np.isnan(self.data[i, :, 0])]
+            (sxu, syu, v, scnt, sconverged, scov) = ls.freestation(targets)
+            self.assertAlmostEqual(xu[i], sxu, places=6)
+            self.assertAlmostEqual(yu[i], syu, places=6)
+            self.assertEqual(cnt[i], scnt)
+            self.assertEqual(converged[i], sconverged)
+            self.assertTrue(np.allclose(cov[i], scov))
+
+    def test_too_few_observations(self):
+        (xu, yu, cnt, converged, cov) = ls.freestation_batch(self.data)
+
+        self.assertTrue(np.all(converged[:4]))
+        self.assertFalse(converged[4])
+        self.assertTrue(np.isnan(xu[4]))
+        self.assertEqual(cnt[4], 0)
+
+    def test_directions_only(self):
+        data = self.data[:3].copy()
+        data[:, :, 2] = np.nan
+        (xu, yu, cnt, converged, cov) = ls.freestation_batch(data)
+
+        self.assertTrue(np.all(converged))
+        for i in range(3):
+            targets = data[i][~np.isnan(data[i, :, 0])]
+            (sxu, syu, v, scnt, sconverged, scov) = ls.freestation(targets)
+            self.assertAlmostEqual(xu[i], sxu, places=6)
+            self.assertAlmostEqual(yu[i], syu, places=6)
+            self.assertAlmostEqual(xu[i], self.stations[i, 0], places=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import landsurvey as ls
+
+import numpy as np
+
+
+class TestScaleFactors(unittest.TestCase):
+    """
+        Line, height and combined scale factor tests
+    """
+    def setUp(self):
+        self.proj = ls.Projection(6378137.0, 298.257222101, 0.9996, 500000.0, 10000000.0)
+
+    def test_point_scale_factor(self):
+        pnts = ls.PointArray([500000.0, 700000.0], [6000000.0, 6000000.0])
+        m = ls.point_scale_factor(pnts, 147.0, self.proj)
+        self.assertAlmostEqual(m[0], 0.9996, places=12)
+
+        # matches the forward projection
+        (lat, lon, mi, gc) = ls.gauss_kruger_inverse_array(pnts.x, pnts.y, 147.0, self.proj)
+        (e, n, mf, gc) = ls.gauss_kruger(lat[1], lon[1], 147.0, self.proj)
+        self.assertAlmostEqual(m[1], mf, places=12)
+
+    def test_line_scale_factor(self):
+        pnt1 = ls.PointArray([650000.0, 500000.0], [6000000.0, 6000000.0])
+        pnt2 = ls.PointArray([660000.0, 500000.0], [6005000.0, 6010000.0])
+        k = ls.line_scale_factor(pnt1, pnt2, 147.0, self.proj)
+
+        # Simpson's rule agrees with the mean point scale factor along the line
+        t = np.linspace(0, 1, 1001)
+        along = ls.PointArray(650000.0 + t * 10000.0, 6000000.0 + t * 5000.0)
+        self.assertAlmostEqual(k[0], ls.point_scale_factor(along, 147.0, self.proj).mean(), places=9)
+        self.assertAlmostEqual(k[1], 0.9996, places=12)
+
+    def test_combined_scale_factor(self):
+        pnt1 = ls.Point3d(650000.0, 6000000.0, 950.0)
+        pnt2 = ls.Point3d(651000.0, 6000500.0, 1030.0)
+        (k, height_factor, combined) = ls.combined_scale_factor(pnt1, pnt2, 147.0, self.proj, geoid_separation=20.0)
+
+        self.assertAlmostEqual(height_factor, 6.37e6 / (6.37e6 + 1010.0), places=6)
+        self.assertAlmostEqual(combined, k * height_factor, places=15)
+
+        ground = np.array([100.0, 250.0])
+        grid = ls.ground_to_grid(ground, combined)
+        np.testing.assert_allclose(grid, ground * combined)
+        np.testing.assert_allclose(ls.grid_to_ground(grid, combined), ground)
+
+    def test_setup_scale_factor(self):
+        station = ls.Point3d(650000.0, 6000000.0, 1000.0)
+        combined = ls.setup_scale_factor(station, 147.0, self.proj)
+        (k, height_factor, expected) = ls.combined_scale_factor(station, station, 147.0, self.proj)
+        self.assertEqual(combined, float(expected))
+
+        # shots from the same station reuse the cached factor
+        key_count = len(ls.scalefactor._setup_factors)
+        self.assertEqual(ls.setup_scale_factor(ls.Point3d(650000.0, 6000000.0, 1000.0), 147.0, self.proj), combined)
+        self.assertEqual(len(ls.scalefactor._setup_factors), key_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
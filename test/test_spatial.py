@@ -0,0 +1,98 @@
+import unittest
+import landsurvey as ls
+
+import numpy as np
+
+
+class TestPointIndex(unittest.TestCase):
+    """
+        Spatial index tests against a brute force search
+    """
+    def setUp(self):
+        rng = np.random.RandomState(7)
+        self.x = rng.uniform(500000.0, 501000.0, 2000)
+        self.y = rng.uniform(7000000.0, 7000500.0, 2000)
+        self.points = ls.PointArray(self.x, self.y)
+        self.index = ls.PointIndex(self.points)
+
+    def brute_force(self, pnt):
+        return np.hypot(self.x - pnt.x, self.y - pnt.y)
+
+    def test_nearest(self):
+        for pnt in [ls.Point2d(500500.0, 7000250.0), ls.Point2d(500000.0, 7000000.0),
+                    ls.Point2d(510000.0, 6990000.0)]:
+            (indices, distances) = self.index.nearest(pnt, k=5)
+            expected = np.argsort(self.brute_force(pnt))[:5]
+            np.testing.assert_array_equal(indices, expected)
+            np.testing.assert_allclose(distances, self.brute_force(pnt)[expected])
+
+    def test_nearest_more_than_points(self):
+        index = ls.PointIndex([ls.Point2d(0.0, 0.0), ls.Point2d(3.0, 4.0)])
+        (indices, distances) = index.nearest(ls.Point2d(0.0, 0.0), k=5)
+        np.testing.assert_array_equal(indices, [0, 1])
+        np.testing.assert_allclose(distances, [0.0, 5.0])
+
+    def test_within_radius(self):
+        pnt = ls.Point3d(500250.0, 7000100.0, 50.0)
+        (indices, distances) = self.index.within_radius(pnt, 40.0)
+        distance = self.brute_force(pnt)
+        self.assertEqual(sorted(indices.tolist()), np.nonzero(distance <= 40.0)[0].tolist())
+        self.assertTrue(np.all(np.diff(distances) >= 0))
+
+    def test_within_bbox(self):
+        indices = self.index.within_bbox(500100.0, 7000200.0, 500300.0, 7000260.0)
+        expected = np.nonzero((self.x >= 500100.0) & (self.x <= 500300.0) &
+                              (self.y >= 7000200.0) & (self.y <= 7000260.0))[0]
+        np.testing.assert_array_equal(indices, expected)
+
+    def test_insert(self):
+        index = ls.PointIndex(cell_size=5.0)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(len(index.nearest(ls.Point2d(0.0, 0.0))[0]), 0)
+
+        for i in range(100):
+            self.assertEqual(index.insert(ls.Point2d(i * 1.5, i * -0.5)), i)
+        np.testing.assert_array_equal(index.extend(self.points[:10]), np.arange(100, 110))
+        self.assertEqual(len(index), 110)
+
+        (indices, distances) = index.nearest(ls.Point2d(30.1, -10.0))
+        self.assertEqual(indices[0], 20)
+        (indices, distances) = index.nearest(ls.Point2d(self.x[3], self.y[3]))
+        self.assertEqual(indices[0], 103)
+
+    def test_duplicate_shots(self):
+        index = ls.PointIndex([ls.Point3d(10.0, 20.0, 1.0), ls.Point3d(50.0, 20.0, 1.0)])
+        self.assertEqual(len(index.within_radius(ls.Point2d(10.001, 20.0), 0.005)[0]), 1)
+        self.assertEqual(len(index.within_radius(ls.Point2d(30.0, 20.0), 0.005)[0]), 0)
+
+    def test_default_cell_size(self):
+        # about two points per cell, whether or not there is a point 100km away
+        expected = np.sqrt(2 * 1000.0 * 500.0 / 2000)
+        self.assertTrue(0.5 * expected < self.index.cell_size < 1.5 * expected)
+
+        x = np.append(self.x[:1999], 600000.0)
+        y = np.append(self.y[:1999], 7100000.0)
+        index = ls.PointIndex(ls.PointArray(x, y))
+        self.assertTrue(0.5 * expected < index.cell_size < 1.5 * expected)
+        self.assertEqual(index.nearest(ls.Point2d(610000.0, 7100000.0))[0][0], 1999)
+        (indices, distances) = index.within_radius(ls.Point2d(x[5], y[5]), 30.0)
+        np.testing.assert_array_equal(np.sort(indices), np.flatnonzero(np.hypot(x - x[5], y - y[5]) <= 30.0))
+
+        # points along a line of sight
+        index = ls.PointIndex(ls.PointArray(np.zeros(101), np.arange(101.0)))
+        self.assertAlmostEqual(index.cell_size, 2 * 90.0 / 91)
+
+    def test_streamed_inserts(self):
+        # two seed points then shots streaming in
+        index = ls.PointIndex([ls.Point2d(0.0, 0.0), ls.Point2d(3.0, 4.0)])
+        self.assertTrue(np.isfinite(index.cell_size))
+
+        rng = np.random.RandomState(5)
+        for x, y in rng.uniform(0.0, 100.0, (1000, 2)):
+            index.insert(ls.Point2d(x, y))
+        self.assertTrue(len(index._cells) > 1)
+        self.assertEqual(len(index), 1002)
+
+
+if __name__ == '__main__':
+    unittest.main()
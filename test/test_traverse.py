@@ -0,0 +1,75 @@
+import unittest
+import landsurvey as ls
+
+import numpy as np
+
+
+class TestAdjustTraverse(unittest.TestCase):
+    """
+        Traverse misclose and adjustment tests
+    """
+    def setUp(self):
+        # 100m square traverse with the last leg measured 0.03m long
+        self.start = ls.Point2d(1000.0, 5000.0)
+        self.bearings = np.array([0.0, 90.0, 180.0, 270.0])
+        self.distances = np.array([100.0, 100.0, 100.0, 100.03])
+
+    def test_misclose(self):
+        (x, y, misclose, misclose_bearing, precision) = ls.adjust_traverse(self.start, self.bearings,
+                                                                           self.distances)
+        self.assertAlmostEqual(misclose, 0.03, places=9)
+        self.assertAlmostEqual(misclose_bearing, 270.0, places=6)
+        self.assertAlmostEqual(precision, 400.03 / 0.03, places=3)
+
+    def test_bowditch(self):
+        (x, y, misclose, misclose_bearing, precision) = ls.adjust_traverse(self.start, self.bearings,
+                                                                           self.distances)
+        # adjusted traverse closes on the start point
+        self.assertAlmostEqual(x[-1], self.start.x, places=9)
+        self.assertAlmostEqual(y[-1], self.start.y, places=9)
+
+        # corrections are proportional to the cumulative distance
+        self.assertAlmostEqual(x[0], 1000.0 + 0.03 * 100.0 / 400.03, places=9)
+        self.assertAlmostEqual(x[1], 1100.0 + 0.03 * 200.0 / 400.03, places=9)
+
+    def test_transit(self):
+        (x, y, misclose, misclose_bearing, precision) = ls.adjust_traverse(self.start, self.bearings,
+                                                                           self.distances, method='transit')
+        self.assertAlmostEqual(x[-1], self.start.x, places=9)
+        self.assertAlmostEqual(y[-1], self.start.y, places=9)
+
+        # the north-south legs take none of the east-west correction
+        self.assertAlmostEqual(x[0], 1000.0, places=9)
+        self.assertAlmostEqual(x[1], 1100.0 + 0.03 * 100.0 / 200.03, places=9)
+
+    def test_open_traverse(self):
+        end = ls.Point2d(1100.0, 5100.0)
+        (x, y, misclose, misclose_bearing, precision) = ls.adjust_traverse(self.start, [0.0, 90.0],
+                                                                           [100.02, 100.0], end)
+        self.assertAlmostEqual(misclose, 0.02, places=9)
+        self.assertAlmostEqual(x[-1], end.x, places=9)
+        self.assertAlmostEqual(y[-1], end.y, places=9)
+
+    def test_batch(self):
+        """
+            A batch of traverses gives the same results as adjusting each one
+        """
+        starts = ls.PointArray([1000.0, 0.0], [5000.0, 0.0])
+        bearings = np.concatenate([self.bearings, [45.0, 225.0005]])
+        distances = np.concatenate([self.distances, [50.0, 50.0]])
+        (x, y, misclose, misclose_bearing, precision) = ls.adjust_traverses(starts, bearings, distances, [0, 4])
+
+        (sx, sy, smisclose, sbearing, sprecision) = ls.adjust_traverse(starts[1], bearings[4:], distances[4:])
+        self.assertTrue(np.allclose(x[4:], sx))
+        self.assertTrue(np.allclose(y[4:], sy))
+        self.assertAlmostEqual(misclose[1], smisclose, places=9)
+        self.assertAlmostEqual(misclose[0], 0.03, places=9)
+        self.assertAlmostEqual(x[3], 1000.0, places=9)
+
+    def test_bad_method(self):
+        self.assertRaises(ValueError, ls.adjust_traverse, self.start, self.bearings, self.distances,
+                          None, 'crandall')
+
+
+if __name__ == '__main__':
+    unittest.main()